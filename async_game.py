@@ -0,0 +1,253 @@
+"""Asyncio adapter around game.Manager with a non-blocking event bus.
+
+game.Manager notifies its listeners synchronously from inside proceed() and
+act(), so one slow listener (disk logging, a network broadcast) stalls the
+whole game. AsyncManager instead gives every listener its own bounded
+asyncio.Queue and a task that feeds the queue to the listener, so the game
+only pays for putting the event on the queue.
+
+Because listeners see events some time after they happen, the caveat in the
+game.Event documentation matters even more here: the objects referred to by
+an event may have changed by the time the listener gets it.
+"""
+
+import asyncio
+import collections
+import enum
+
+import game
+
+
+@enum.unique
+class Backpressure(enum.Enum):
+    """What to do when a listener's queue is full."""
+    # Throw away the new event.
+    DROP = 0
+    # If the new event supersedes a queued one (see SUPERSEDING_EVENT_TYPES),
+    # remove the queued one and add the new one at the end. Else throw away
+    # the new event, as with DROP.
+    COALESCE = 1
+    # Wait for the listener to make room. Game progression then depends on the
+    # listener again, so only use this for listeners that must see everything.
+    BLOCK = 2
+
+
+# Event types where a new event makes a queued one of the same type out of
+# date, so that COALESCE may replace it. Other events (an ACTION, a
+# HAND_STARTED) say something that later ones don't, and are never replaced.
+SUPERSEDING_EVENT_TYPES = frozenset([
+    game.EventType.ACTION_ON,
+    game.EventType.WAITING_FOR_START,
+])
+
+
+class _ListenerQueue:
+    """Holds the queue and delivery task for one listener.
+
+    This is registered as the listener on the wrapped game.Manager. The Manager
+    notifies synchronously, so notify() only collects the events; they are put
+    on the queue by AsyncManager once the Manager call has returned.
+
+    The queue is a deque guarded by an asyncio.Condition, rather than an
+    asyncio.Queue, so that COALESCE can replace a queued event.
+    """
+
+    def __init__(self, listener, maxsize, backpressure, run_in_executor):
+        self.listener = listener
+        self.maxsize = maxsize
+        self.backpressure = backpressure
+        self.run_in_executor = run_in_executor
+        self.events = collections.deque()
+        # Number of events queued or being delivered
+        self.unfinished = 0
+        self.changed = asyncio.Condition()
+        self.pending = []
+        self.dropped = 0
+        # Set once the delivery task has ended
+        self.stopped = False
+        self.task = asyncio.get_running_loop().create_task(self._deliver())
+
+    def notify(self, event):
+        self.pending.append(event)
+
+    def full(self):
+        return len(self.events) >= self.maxsize
+
+    async def publish(self):
+        events = self.pending
+        self.pending = []
+        changed = self.changed
+        async with changed:
+            for idx, event in enumerate(events):
+                if self.backpressure == Backpressure.BLOCK and self.full():
+                    await changed.wait_for(lambda: not self.full() or self.stopped)
+                if self.stopped:
+                    # The listener raised and nothing takes events off the
+                    # queue any more. drain() raises its exception.
+                    self.dropped += len(events) - idx
+                    break
+                if not self.full():
+                    self.events.append(event)
+                    self.unfinished += 1
+                    changed.notify_all()
+                else:
+                    if self.backpressure == Backpressure.COALESCE:
+                        self._coalesce(event)
+                    self.dropped += 1
+
+    def _coalesce(self, event):
+        event_type = event.event_type
+        if event_type not in SUPERSEDING_EVENT_TYPES:
+            return
+        events = self.events
+        for idx, queued in enumerate(events):
+            if queued.event_type == event_type:
+                del events[idx]
+                events.append(event)
+                return
+
+    async def _deliver(self):
+        try:
+            await self._deliver_events()
+        finally:
+            # Wakes up publish() and drain() if they wait for room or for the
+            # queue to empty, which won't happen any more
+            self.stopped = True
+            async with self.changed:
+                self.changed.notify_all()
+
+    async def _deliver_events(self):
+        loop = asyncio.get_running_loop()
+        changed = self.changed
+        while True:
+            async with changed:
+                await changed.wait_for(lambda: self.events)
+                event = self.events.popleft()
+                changed.notify_all()
+            try:
+                if self.run_in_executor:
+                    await loop.run_in_executor(None, self.listener.notify, event)
+                else:
+                    result = self.listener.notify(event)
+                    if asyncio.iscoroutine(result):
+                        await result
+            finally:
+                self.unfinished -= 1
+            async with changed:
+                changed.notify_all()
+
+    async def drain(self):
+        async with self.changed:
+            await self.changed.wait_for(lambda: not self.unfinished or self.stopped)
+        if self.stopped:
+            await asyncio.wait([self.task])
+            # Raises the listener's exception, if there was one.
+            self.task.result()
+
+
+class AsyncManager:
+    """Runs a game.Manager and delivers its events through per-listener queues.
+
+    The game methods (start_game, proceed, act) call through to the wrapped
+    Manager and then hand the resulting events to each interested listener's
+    queue. Unless a listener uses Backpressure.BLOCK, that never waits on the
+    listener.
+
+    Must be created while an event loop is running.
+
+    Attributes:
+      manager: the wrapped game.Manager. Its state can be read directly, but
+        listeners should be added through AsyncManager.add_listener.
+    """
+
+    DEFAULT_MAXSIZE = 1024
+
+    def __init__(self, config=None, manager=None):
+        """Initializes AsyncManager.
+
+        Args:
+          config: game.Configuration for a new game.Manager
+          manager: an existing game.Manager to wrap instead
+        """
+        if (config is None) == (manager is None):
+            raise ValueError("Exactly one of config and manager must be given")
+        if manager is None:
+            manager = game.Manager(config)
+        self.manager = manager
+        self._queues = []
+
+    def add_listener(self, listener, event_types=None,
+                     maxsize=DEFAULT_MAXSIZE, backpressure=Backpressure.DROP,
+                     run_in_executor=False):
+        """Adds an Event listener with its own queue.
+
+        Args:
+          listener: object with a notify method that accepts one positional
+            Event argument. notify may be a coroutine function.
+          event_types: iterable of game.EventType to subscribe to, or None for
+            all of them (see game.Manager.add_listener)
+          maxsize: maximum number of queued events for this listener
+          backpressure: Backpressure for when the queue is full
+          run_in_executor: if True, a (non-coroutine) notify is called in the
+            loop's default executor so that blocking I/O in it doesn't hold
+            up the event loop.
+
+        If notify raises, the listener gets no more events and drain() raises
+        the exception.
+        """
+        listener_queue = _ListenerQueue(listener, maxsize, backpressure,
+                                        run_in_executor)
+        self._queues.append(listener_queue)
+        self.manager.add_listener(listener_queue, event_types)
+
+    def dropped(self, listener):
+        """Returns how many events were dropped or coalesced for listener.
+
+        This includes the events published after the listener failed.
+        """
+        for listener_queue in self._queues:
+            if listener_queue.listener is listener:
+                return listener_queue.dropped
+        raise ValueError("Unknown listener {}".format(listener))
+
+    def add_player(self, player):
+        """See game.Manager.add_player. Events are published on the next await."""
+        return self.manager.add_player(player)
+
+    def remove_player(self, player_idx):
+        """See game.Manager.remove_player. Events are published on the next await."""
+        return self.manager.remove_player(player_idx)
+
+    async def start_game(self):
+        self.manager.start_game()
+        await self._publish()
+
+    async def proceed(self):
+        self.manager.proceed()
+        await self._publish()
+
+    async def act(self, action):
+        self.manager.act(action)
+        await self._publish()
+
+    async def _publish(self):
+        for listener_queue in self._queues:
+            if listener_queue.pending:
+                await listener_queue.publish()
+
+    async def drain(self):
+        """Waits until every listener has processed all of its queued events.
+
+        Raises the exception of any listener that failed.
+        """
+        await self._publish()
+        for listener_queue in self._queues:
+            await listener_queue.drain()
+
+    async def close(self):
+        """Stops delivering events. Queued events that weren't delivered are lost."""
+        for listener_queue in self._queues:
+            listener_queue.task.cancel()
+        await asyncio.gather(*(q.task for q in self._queues),
+                             return_exceptions=True)
+        self._queues.clear()
@@ -0,0 +1,677 @@
+"""Simple throughput benchmarks for the game engine.
+
+Run with the names of the benchmarks to run (or none to run them all):
+
+  python benchmark.py ten_seat
+"""
+
+import asyncio
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import cards
+import cluster
+import deck
+import game
+import hand_store
+import history
+import loadgen
+import mcts
+import metrics
+import replay
+import server
+import snapshot
+import stats
+import table_host
+import tracing
+import views
+import wire
+
+
+def limit_manager(num_players, rng, stack=10**9):
+    """Creates a started LIMIT Manager with num_players seated."""
+    manager = game.Manager(game.Configuration(
+        max_players=num_players, game_type=game.GameType.LIMIT,
+        limits=(10, 20), blinds=(5, 10)))
+    manager._deck_factory = deck.shuffled_deck_factory(rng)
+    for idx in range(num_players):
+        manager.add_player(game.Player("name{}".format(idx), stack))
+    manager.button_pos = num_players - 1
+    return manager
+
+
+def choose_action(allowed, rng, raise_prob=0.15):
+    """Picks a plausible action out of allowed.
+
+    Mostly checks and calls, with some raising and folding so that the
+    betting rounds look like real ones.
+    """
+    r = rng.random()
+    if r < raise_prob:
+        for action_type in [game.ActionType.RAISE, game.ActionType.BET]:
+            if allowed.is_action_type_allowed(action_type):
+                amount = allowed.range_for_action(action_type)[0]
+                return game.Action(allowed.player_idx, action_type, amount)
+    if r < raise_prob + 0.2 and not allowed.is_action_type_allowed(game.ActionType.CHECK):
+        return game.Action(allowed.player_idx, game.ActionType.FOLD)
+    if allowed.is_action_type_allowed(game.ActionType.CHECK):
+        return game.Action(allowed.player_idx, game.ActionType.CHECK)
+    return game.Action(allowed.player_idx, game.ActionType.CALL)
+
+
+def play_hands(manager, num_hands, rng):
+    """Plays num_hands hands to completion on a started manager."""
+    hands = 0
+    while hands < num_hands:
+        hand = manager.current_hand
+        if hand is not None and hand.is_betting_active():
+            manager.act(choose_action(hand.allowed_action(), rng))
+            continue
+        manager.proceed()
+        if manager.state == game.GameState.PAYING_OUT:
+            hands += 1
+
+
+def play_betting(hand, rng, raise_prob=0.15):
+    """Runs every betting round of hand without going to showdown."""
+    for deal in [hand.deal_hole_cards, hand.deal_flop, hand.deal_turn,
+                 hand.deal_river]:
+        deal()
+        while hand.is_betting_active():
+            hand.act(choose_action(hand.allowed_action(), rng, raise_prob))
+        if hand.num_live_players() == 1:
+            return
+
+
+def _report(name, num_hands, elapsed):
+    print("{:<24} {:>8} hands {:>8.3f} s {:>10.0f} hands/sec".format(
+        name, num_hands, elapsed, num_hands / elapsed))
+
+
+def bench_ten_seat(num_hands=5000):
+    """Limit hold'em with all ten seats full and no listeners."""
+    rng = random.Random(1234)
+    manager = limit_manager(10, rng)
+    manager.start_game()
+    start = time.perf_counter()
+    play_hands(manager, num_hands, rng)
+    _report("ten_seat", num_hands, time.perf_counter() - start)
+
+
+def bench_listeners(num_hands=5000):
+    """Three seat limit hands with no listeners and with a RecordingListener."""
+    for name, listener in [("no_listener", None),
+                           ("recording_listener", game.RecordingListener())]:
+        rng = random.Random(1234)
+        manager = limit_manager(3, rng)
+        if listener is not None:
+            manager.add_listener(listener)
+        manager.start_game()
+        start = time.perf_counter()
+        play_hands(manager, num_hands, rng)
+        _report(name, num_hands, time.perf_counter() - start)
+
+
+def bench_player_stats(num_hands=5000):
+    """Three seat limit hands with no listeners and with a PlayerStats."""
+    for name, listener in [("no_listener", None),
+                           ("player_stats", stats.PlayerStats(3))]:
+        rng = random.Random(1234)
+        manager = limit_manager(3, rng)
+        if listener is not None:
+            manager.add_listener(listener, event_types=stats.PlayerStats.EVENT_TYPES)
+        manager.start_game()
+        start = time.perf_counter()
+        play_hands(manager, num_hands, rng)
+        _report(name, num_hands, time.perf_counter() - start)
+
+
+def bench_metrics(num_hands=5000):
+    """Ten seat limit hands with and without metrics.instrument()."""
+    for name, registry in [("uninstrumented", None),
+                           ("instrumented", metrics.Registry())]:
+        rng = random.Random(1234)
+        manager = limit_manager(10, rng)
+        if registry is not None:
+            metrics.instrument(manager, registry)
+        manager.start_game()
+        start = time.perf_counter()
+        play_hands(manager, num_hands, rng)
+        _report(name, num_hands, time.perf_counter() - start)
+
+
+def bench_tracing(num_hands=5000):
+    """Ten seat limit hands untraced, traced with the Tracer disabled and
+    traced."""
+    for name, enabled in [("untraced", None), ("tracing_disabled", False),
+                          ("tracing_enabled", True)]:
+        rng = random.Random(1234)
+        manager = limit_manager(10, rng)
+        tracer = tracing.Tracer()
+        if enabled is not None:
+            tracer.enabled = enabled
+            tracing.trace(manager, tracer)
+        manager.start_game()
+        start = time.perf_counter()
+        play_hands(manager, num_hands, rng)
+        _report(name, num_hands, time.perf_counter() - start)
+
+
+def bench_server(num_tables=200, duration=5.0):
+    """Six seat tables on a GameServer played by simulated TCP clients in
+    the same process."""
+    result = asyncio.run(loadgen.run_load_test(num_tables, 6, duration, seed=1))
+    _report("server", result["hands"], duration)
+    print("{:<24} {:>8} conns {:>10.0f} events/sec {} slow".format(
+        "", result["connections"], result["events_per_sec"],
+        result["slow_disconnects"]))
+
+
+def bench_views(num_hands=200, watchers=20):
+    """Fanout of the events of ten seat limit hands to the players and some
+    spectators, serializing per recipient and with views.EventViews."""
+    rng = random.Random(1234)
+    manager = limit_manager(10, rng)
+    recorder = game.RecordingListener()
+    manager.add_listener(recorder)
+    manager.start_game()
+    play_hands(manager, num_hands, rng)
+    events = recorder.events
+    recipients = list(range(10)) + [None] * watchers
+
+    def encode(event, seat):
+        return server.encode_message(server.event_to_json(event, seat))
+
+    sent = []
+    start = time.perf_counter()
+    for event in events:
+        for seat in recipients:
+            sent.append(encode(event, seat))
+    _report("per_recipient", num_hands, time.perf_counter() - start)
+    sent.clear()
+    start = time.perf_counter()
+    for event in events:
+        event_views = views.EventViews(event, encode)
+        for seat in recipients:
+            sent.append(event_views.for_seat(seat))
+    _report("event_views", num_hands, time.perf_counter() - start)
+
+
+def bench_wire(num_hands=1000):
+    """Encoding and decoding the events of ten seat limit hands (from seat 0)
+    with the wire module, against server.event_to_json and str(event)."""
+    rng = random.Random(1234)
+    manager = limit_manager(10, rng)
+    recorder = game.RecordingListener()
+    manager.add_listener(recorder)
+    manager.start_game()
+    play_hands(manager, num_hands, rng)
+    events = recorder.events
+
+    start = time.perf_counter()
+    for event in events:
+        str(event)
+    _report("str", num_hands, time.perf_counter() - start)
+    start = time.perf_counter()
+    for event in events:
+        server.encode_message(server.event_to_json(event, 0))
+    _report("event_to_json", num_hands, time.perf_counter() - start)
+
+    for name, encode, decode in [
+            ("binary", wire.encode_event, lambda data: wire.decode_event(data)[0]),
+            ("json", wire.encode_event_json, wire.decode_event_json)]:
+        start = time.perf_counter()
+        encoded = [encode(event, 0) for event in events]
+        _report(name + "_encode", num_hands, time.perf_counter() - start)
+        start = time.perf_counter()
+        for data in encoded:
+            decode(data)
+        _report(name + "_decode", num_hands, time.perf_counter() - start)
+        print("{:<24} {:>8.1f} bytes/hand".format(
+            "", sum(len(data) for data in encoded) / num_hands))
+
+
+def bench_ten_seat_betting(num_hands=20000):
+    """Only the betting rounds of ten seat limit hands, driving Hand directly."""
+    rng = random.Random(1234)
+    manager = limit_manager(10, rng)
+    start = time.perf_counter()
+    for button_pos in range(num_hands):
+        hand = game.Hand(manager.config, manager.players, button_pos % 10,
+                         manager._deck_factory)
+        play_betting(hand, rng)
+    _report("ten_seat_betting", num_hands, time.perf_counter() - start)
+
+
+def bench_ten_seat_raising(num_hands=2000):
+    """Ten seat betting rounds where most actions are raises.
+
+    The engine has no cap on the number of raises, so these rounds are long
+    and stress the per action bookkeeping.
+    """
+    rng = random.Random(1234)
+    manager = limit_manager(10, rng)
+    start = time.perf_counter()
+    for button_pos in range(num_hands):
+        hand = game.Hand(manager.config, manager.players, button_pos % 10,
+                         manager._deck_factory)
+        play_betting(hand, rng, raise_prob=0.7)
+    _report("ten_seat_raising", num_hands, time.perf_counter() - start)
+
+
+def _event_bytes(event):
+    size = sys.getsizeof(event)
+    if hasattr(event, "__dict__"):
+        size += sys.getsizeof(event.__dict__)
+    return size
+
+
+def bench_recorded_events(num_hands=100000):
+    """Three seat limit hands recorded by a RecordingListener.
+
+    Reports the throughput and the memory held by the Event objects
+    themselves (not the objects they refer to).
+    """
+    rng = random.Random(1234)
+    manager = limit_manager(3, rng)
+    recorder = game.RecordingListener()
+    manager.add_listener(recorder)
+    manager.start_game()
+    start = time.perf_counter()
+    play_hands(manager, num_hands, rng)
+    _report("recorded_events", num_hands, time.perf_counter() - start)
+    event_bytes = sum(_event_bytes(e) for e in recorder.events)
+    print("{:<24} {:>8} events {:>8.1f} MB {:>10.1f} bytes/event".format(
+        "", len(recorder.events), event_bytes / 1e6,
+        event_bytes / len(recorder.events)))
+
+
+def bench_event_construction(num_events=1000000):
+    """Constructs ACTION events like the Manager does."""
+    action = game.Action(0, game.ActionType.CALL)
+    start = time.perf_counter()
+    for _ in range(num_events):
+        game.ActionEvent(action=action)
+    elapsed = time.perf_counter() - start
+    print("{:<24} {:>8} events {:>8.3f} s {:>10.0f} ns/event".format(
+        "event_construction", num_events, elapsed, elapsed / num_events * 1e9))
+
+
+class _HostBot:
+    """ACTION_ON listener which plays for every seat at a TableHost table."""
+    def __init__(self, host, table_id, rng):
+        self.host = host
+        self.table_id = table_id
+        self.rng = rng
+
+    def notify(self, event):
+        self.host.submit_action(self.table_id,
+                                choose_action(event.allowed, self.rng))
+
+
+def bench_table_host(num_tables=10000, seconds=10):
+    """Many three seat limit tables in one TableHost, played by bots."""
+    rng = random.Random(1234)
+    host = table_host.TableHost()
+    config = game.Configuration(
+        max_players=3, game_type=game.GameType.LIMIT,
+        limits=(10, 20), blinds=(5, 10))
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for table_id in range(num_tables):
+        table = host.add_table(table_id, config, deck.shuffled_deck_factory(rng))
+        for idx in range(3):
+            table.manager.add_player(game.Player("name{}".format(idx), 10**9))
+    idle_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print("{:<24} {:>8} tables {:>8.1f} MB {:>10.0f} bytes/idle table".format(
+        "table_host", num_tables, idle_bytes / 1e6, idle_bytes / num_tables))
+
+    async def run():
+        for table_id, table in host.tables.items():
+            table.manager.add_listener(_HostBot(host, table_id, rng),
+                                       event_types=[game.EventType.ACTION_ON])
+            host.start_table(table_id)
+        run_task = asyncio.ensure_future(host.run())
+        await asyncio.sleep(seconds)
+        host.stop()
+        await run_task
+
+    asyncio.run(run())
+    stats = host.stats()
+    _report("table_host", stats["hands"], seconds)
+    per_table = sorted(stats["per_table"].values())
+    print("{:<24} per table hands/sec min {:.2f} median {:.2f} max {:.2f}".format(
+        "", per_table[0], per_table[len(per_table) // 2], per_table[-1]))
+
+
+class _ClusterBot:
+    """Cluster listener which plays for every seat at every table."""
+    def __init__(self, cluster, rng):
+        self.cluster = cluster
+        self.rng = rng
+
+    def notify(self, table_id, event):
+        self.cluster.submit_action(table_id,
+                                   choose_action(event.allowed, self.rng))
+
+
+def bench_cluster(num_tables=1000, seconds=10):
+    """Load test of ShardedCluster with 1, 2, ... up to os.cpu_count() workers.
+
+    The bots run in the router process, so every action makes the round trip
+    through the router. Near linear scaling needs that many free cores.
+    """
+    max_workers = os.cpu_count()
+    num_workers = 1
+    while True:
+        _run_cluster(num_workers, num_tables, seconds)
+        if num_workers >= max_workers:
+            break
+        num_workers = min(num_workers * 2, max_workers)
+
+
+def _run_cluster(num_workers, num_tables, seconds):
+    config = game.Configuration(
+        max_players=3, game_type=game.GameType.LIMIT,
+        limits=(10, 20), blinds=(5, 10))
+
+    async def run():
+        sharded = cluster.ShardedCluster(num_workers)
+        await sharded.start()
+        sharded.add_listener(_ClusterBot(sharded, random.Random(1234)))
+        for table_id in range(num_tables):
+            await sharded.add_table(
+                table_id, config,
+                [game.Player("name{}".format(idx), 10**9) for idx in range(3)],
+                deck_seed=table_id, event_types=[game.EventType.ACTION_ON])
+        await asyncio.gather(*(sharded.start_table(table_id)
+                               for table_id in range(num_tables)))
+        await asyncio.sleep(seconds)
+        stats = await sharded.stats()
+        await sharded.close()
+        return stats
+
+    stats = asyncio.run(run())
+    _report("cluster_{}_workers".format(num_workers), stats["hands"], seconds)
+
+
+def recorded_hands(num_hands, num_players=6):
+    """Plays num_hands and returns (config, list of history.HandRecord)."""
+    rng = random.Random(1234)
+    manager = limit_manager(num_players, rng)
+    f = io.BytesIO()
+    writer = history.HandHistoryWriter(manager, f)
+    manager.add_listener(writer, event_types=history.HandHistoryWriter.EVENT_TYPES)
+    manager.start_game()
+    play_hands(manager, num_hands, rng)
+    writer.flush()
+    config, records = history.read_hand_histories(f.getvalue())
+    return config, list(records)
+
+
+def bench_hand_history(num_hands=100000):
+    """Encoding and appending six seat limit hands to a hand history file."""
+    config, records = recorded_hands(1000)
+    manager = game.Manager(config)
+    with tempfile.TemporaryFile() as f:
+        writer = history.HandHistoryWriter(manager, f)
+        start = time.perf_counter()
+        for idx in range(num_hands):
+            writer.write(records[idx % len(records)])
+        writer.flush()
+        elapsed = time.perf_counter() - start
+        size = f.tell()
+        _report("hand_history_write", num_hands, elapsed)
+        print("{:<24} {:>8.1f} bytes/hand".format("", size / num_hands))
+
+        f.seek(0)
+        start = time.perf_counter()
+        _, decoded = history.read_hand_histories(f)
+        num_decoded = sum(1 for _ in decoded)
+        _report("hand_history_read", num_decoded, time.perf_counter() - start)
+
+
+class _AddHandRecorder:
+    """Stands in for a HandStore, keeping the arguments of add_hand."""
+
+    def __init__(self):
+        self.hands = []
+
+    def add_hand(self, *args):
+        self.hands.append(args)
+
+
+def bench_hand_store(num_hands=100000, num_queries=200):
+    """Writing six seat limit hands to a HandStore database, and the latency
+    of its queries on the result."""
+    rng = random.Random(1234)
+    manager = limit_manager(6, rng)
+    recorder = _AddHandRecorder()
+    writer = hand_store.HandStoreWriter(manager, recorder)
+    manager.add_listener(writer, event_types=writer.EVENT_TYPES)
+    manager.start_game()
+    play_hands(manager, 1000, rng)
+    hands = recorder.hands
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = hand_store.HandStore(os.path.join(tmp, "hands.db"))
+        start = time.perf_counter()
+        for idx in range(num_hands):
+            record, names, net_profit, ranks, _, _ = hands[idx % len(hands)]
+            store.add_hand(record, names, net_profit, ranks, float(idx))
+        store.flush()
+        _report("hand_store_write", num_hands, time.perf_counter() - start)
+
+        names = hands[0][1]
+        queries = [
+            ("showdowns_flush", lambda i: store.showdowns(
+                names[i % 6], min_rank=cards.HandRank.FLUSH)),
+            ("find_by_date", lambda i: store.find_hands(
+                since=i * 100, until=i * 100 + 1000)),
+            ("find_by_pot", lambda i: store.find_hands(min_pot=300 + i)),
+            ("find_by_player", lambda i: store.find_hands(
+                player=names[i % 6], since=i * 100, limit=100)),
+            ("hand", lambda i: store.hand(1 + i * 97)),
+        ]
+        for name, query in queries:
+            start = time.perf_counter()
+            for i in range(num_queries):
+                rows = query(i)
+            elapsed = time.perf_counter() - start
+            print("{:<24} {:>8.3f} ms/query {:>8} rows".format(
+                name, elapsed / num_queries * 1000,
+                len(rows) if isinstance(rows, list) else 1))
+        store.close()
+
+
+def _pocket_pair_profit_records(records):
+    total = hands = 0
+    for record in records:
+        net_profit = history.net_profit(record)
+        for seat, hole in enumerate(record.hole_cards):
+            if hole is not None and hole[0] % 13 == hole[1] % 13:
+                total += net_profit[seat]
+                hands += 1
+    return total / hands
+
+
+def _pocket_pair_profit_columns(reader):
+    total = hands = 0
+    for _, chunk in reader.chunks(["hole_cards", "net_profit"]):
+        hole = chunk["hole_cards"]
+        pairs = (hole[:, :, 0] >= 0) & (hole[:, :, 0] % 13 == hole[:, :, 1] % 13)
+        total += int(chunk["net_profit"][pairs].sum())
+        hands += int(pairs.sum())
+    return total / hands
+
+
+def bench_columnar(num_hands=200000):
+    """Exporting six seat limit hands from a hand history file to columns,
+    and a study (mean net profit of pocket pairs) over the columns and over
+    the decoded records (needs numpy)."""
+    import columnar
+    config, records = recorded_hands(2000)
+    with tempfile.TemporaryDirectory() as tmp:
+        history_path = os.path.join(tmp, "hands.mphh")
+        with open(history_path, "wb") as f:
+            writer = history.HandHistoryWriter(game.Manager(config), f)
+            for idx in range(num_hands):
+                writer.write(records[idx % len(records)])
+            writer.flush()
+
+        path = os.path.join(tmp, "columns")
+        start = time.perf_counter()
+        columnar.export_history(history_path, path, chunk_size=1 << 16)
+        _report("columnar_export", num_hands, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with open(history_path, "rb") as f:
+            _, decoded = history.read_hand_histories(f)
+            by_records = _pocket_pair_profit_records(decoded)
+        _report("study_records", num_hands, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        by_columns = _pocket_pair_profit_columns(columnar.ColumnReader(path))
+        _report("study_columns", num_hands, time.perf_counter() - start)
+        if by_records != by_columns:
+            print("results differ: {} {}".format(by_records, by_columns))
+
+
+def bench_replay(num_hands=20000):
+    """Replaying and checking recorded six seat limit hands."""
+    config, records = recorded_hands(num_hands)
+    result = replay.ReplayResult(None)
+    start = time.perf_counter()
+    replay.replay_records(config, records, result)
+    _report("replay", result.hands, time.perf_counter() - start)
+    if not result.ok():
+        print("{} mismatches".format(result.num_mismatches))
+
+
+def bench_snapshot(num_hands=1000):
+    """Snapshotting and restoring a six seat limit table after every step."""
+    rng = random.Random(1234)
+    manager = limit_manager(6, rng)
+    manager.start_game()
+    snapshots = []
+    hands = 0
+    while hands < num_hands:
+        hand = manager.current_hand
+        if hand is not None and hand.is_betting_active():
+            manager.act(choose_action(hand.allowed_action(), rng))
+        else:
+            manager.proceed()
+            if manager.state == game.GameState.PAYING_OUT:
+                hands += 1
+        snapshots.append(snapshot.snapshot(manager))
+
+    start = time.perf_counter()
+    for data in snapshots:
+        snapshot.restore(data)
+    restore_elapsed = time.perf_counter() - start
+    managers = [snapshot.restore(data) for data in snapshots]
+    start = time.perf_counter()
+    for m in managers:
+        snapshot.snapshot(m)
+    snapshot_elapsed = time.perf_counter() - start
+    print("{:<24} {:>8} states {:>8.1f} us/snapshot {:>8.1f} us/restore".format(
+        "snapshot", len(snapshots), snapshot_elapsed / len(snapshots) * 1e6,
+        restore_elapsed / len(snapshots) * 1e6))
+    print("{:<24} {:>8.1f} bytes/snapshot".format(
+        "", sum(len(data) for data in snapshots) / len(snapshots)))
+
+
+def bench_fork(num_forks=100000):
+    """Forking a six seat limit hand pre-flop and making one action on the fork."""
+    rng = random.Random(1234)
+    manager = limit_manager(6, rng)
+    manager.start_game()
+    manager.proceed()
+    hand = manager.current_hand
+    allowed = hand.allowed_action()
+    action = game.Action(allowed.player_idx, game.ActionType.CALL)
+    start = time.perf_counter()
+    for _ in range(num_forks):
+        hand.fork()
+    fork_elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(num_forks):
+        hand.fork().act(action)
+    act_elapsed = time.perf_counter() - start
+    print("{:<24} {:>8} forks {:>8.2f} us/fork {:>8.2f} us/fork+act".format(
+        "fork", num_forks, fork_elapsed / num_forks * 1e6,
+        act_elapsed / num_forks * 1e6))
+
+
+def bench_mcts(seconds=5):
+    """MCTS decisions for the first player to act in six seat limit hands."""
+    rng = random.Random(1234)
+    for processes in [1, None]:
+        manager = limit_manager(6, rng)
+        manager.start_game()
+        manager.proceed()
+        with mcts.MCTSBot(time_budget=seconds, processes=processes,
+                          seed=1) as bot:
+            start = time.perf_counter()
+            bot.search(manager.current_hand)
+            elapsed = time.perf_counter() - start
+        print("{:<24} {:>8} iterations {:>8.1f} s {:>10.0f} iterations/sec".format(
+            "mcts_{}_processes".format(bot.processes), bot.last_iterations,
+            elapsed, bot.last_iterations / elapsed))
+
+
+def bench_vec_env(num_tables=256, num_steps=200):
+    """Stepping six seat limit tables in a VecEnv with random actions (needs numpy)."""
+    import numpy as np
+    import vec_env
+    env = vec_env.VecEnv(num_tables, seed=1)
+    env.reset()
+    rng = np.random.default_rng(1)
+    actions = [rng.choice(vec_env.NUM_ACTIONS, size=num_tables, p=[0.1, 0.7, 0.2])
+               for _ in range(num_steps)]
+    start = time.perf_counter()
+    for step_actions in actions:
+        env.step(step_actions)
+    elapsed = time.perf_counter() - start
+    num = num_tables * num_steps
+    print("{:<24} {:>8} steps {:>8.3f} s {:>10.0f} steps/sec".format(
+        "vec_env", num, elapsed, num / elapsed))
+
+
+BENCHMARKS = {
+    "ten_seat": bench_ten_seat,
+    "listeners": bench_listeners,
+    "recorded_events": bench_recorded_events,
+    "event_construction": bench_event_construction,
+    "table_host": bench_table_host,
+    "cluster": bench_cluster,
+    "hand_history": bench_hand_history,
+    "hand_store": bench_hand_store,
+    "columnar": bench_columnar,
+    "replay": bench_replay,
+    "snapshot": bench_snapshot,
+    "fork": bench_fork,
+    "mcts": bench_mcts,
+    "vec_env": bench_vec_env,
+    "player_stats": bench_player_stats,
+    "metrics": bench_metrics,
+    "tracing": bench_tracing,
+    "server": bench_server,
+    "views": bench_views,
+    "wire": bench_wire,
+    "ten_seat_betting": bench_ten_seat_betting,
+    "ten_seat_raising": bench_ten_seat_raising,
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
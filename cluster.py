@@ -0,0 +1,330 @@
+"""Tables sharded over worker processes, for using more than one core.
+
+A single process can only give one core's worth of game.Manager throughput.
+ShardedCluster starts a number of worker processes, each running a
+table_host.TableHost, and acts as the router between them and the rest of
+the program: table ids are hashed to a worker, commands and actions are
+forwarded to that worker over a local pipe, and the events of every table are
+sent back over the same pipe and fanned out to the cluster's listeners.
+
+Messages in both directions are batched: everything sent during one turn of
+the event loop goes out as one pickled list.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import random
+import zlib
+
+import deck
+import game
+import table_host
+
+
+def shard_of(table_id, num_shards):
+    """Returns the shard for table_id.
+
+    This has to be the same in every process, so it can't use hash() (which is
+    randomized for strings).
+    """
+    return zlib.crc32(repr(table_id).encode()) % num_shards
+
+
+class _Channel:
+    """Batched, non-blocking reading and writing of messages on a Connection."""
+
+    def __init__(self, conn, on_message):
+        self.conn = conn
+        self.on_message = on_message
+        self.closed = False
+        self._outbox = []
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(conn.fileno(), self._on_readable)
+
+    def send(self, message):
+        self._outbox.append(message)
+        if len(self._outbox) == 1:
+            self._loop.call_soon(self.flush)
+
+    def flush(self):
+        outbox = self._outbox
+        self._outbox = []
+        if outbox and not self.closed:
+            try:
+                self.conn.send(outbox)
+            except OSError:
+                self._lost()
+
+    def _on_readable(self):
+        while not self.closed and self.conn.poll():
+            try:
+                messages = self.conn.recv()
+            except (EOFError, OSError):
+                self._lost()
+                return
+            for message in messages:
+                self.on_message(message)
+
+    def _lost(self):
+        """Handles the other end going away."""
+        self.close()
+        self.on_message(("closed",))
+
+    def close(self):
+        if not self.closed:
+            self.flush()
+            self.closed = True
+            self._loop.remove_reader(self.conn.fileno())
+
+
+class _EventForwarder:
+    """Listener in a worker which sends a table's events to the router."""
+
+    def __init__(self, channel, table_id):
+        self.channel = channel
+        self.table_id = table_id
+
+    def notify(self, event):
+        self.channel.send(("event", self.table_id, event))
+
+
+class _Worker:
+    """The TableHost side of a worker process."""
+
+    def __init__(self, conn):
+        self.host = table_host.TableHost()
+        self.channel = _Channel(conn, self._handle)
+        self.stopped = asyncio.get_running_loop().create_future()
+
+    async def run(self):
+        host_task = asyncio.ensure_future(self.host.run())
+        await self.stopped
+        self.host.stop()
+        await host_task
+        self.channel.close()
+
+    def _handle(self, message):
+        kind = message[0]
+        if kind in ["stop", "closed"]:
+            if not self.stopped.done():
+                self.stopped.set_result(None)
+            return
+        request_id = message[1]
+        if kind == "act":
+            _, _, table_id, action = message
+            try:
+                future = self.host.submit_action(table_id, action)
+            except Exception as e:
+                self._reply(request_id, e, None)
+                return
+            future.add_done_callback(
+                lambda f: self._reply(request_id, f.exception(), None))
+            return
+        try:
+            result = getattr(self, "_" + kind)(*message[2:])
+        except Exception as e:
+            self._reply(request_id, e, None)
+        else:
+            self._reply(request_id, None, result)
+
+    def _reply(self, request_id, error, result):
+        self.channel.send(("result", request_id, error, result))
+
+    def _add_table(self, table_id, config, players, deck_seed, event_types):
+        table = self.host.add_table(
+            table_id, config, deck.shuffled_deck_factory(random.Random(deck_seed)))
+        for player in players:
+            table.manager.add_player(player)
+        table.manager.add_listener(_EventForwarder(self.channel, table_id),
+                                   event_types)
+
+    def _start_table(self, table_id):
+        self.host.start_table(table_id)
+
+    def _remove_table(self, table_id):
+        self.host.remove_table(table_id)
+
+    def _stats(self):
+        return self.host.stats()
+
+
+def _worker_main(conn):
+    async def main():
+        await _Worker(conn).run()
+    asyncio.run(main())
+
+
+class ShardedCluster:
+    """Router for tables spread over worker processes.
+
+    Use as:
+      cluster = ShardedCluster(num_workers=4)
+      await cluster.start()
+      cluster.add_listener(listener)
+      await cluster.add_table("t1", config, players)
+      await cluster.start_table("t1")
+      ...
+      await cluster.close()
+
+    Listeners receive every forwarded event as listener.notify(table_id, event).
+    The events were pickled in the worker, so unlike with a local
+    game.Manager they are copies and won't change after the fact.
+    """
+
+    def __init__(self, num_workers=None):
+        """Initializes ShardedCluster.
+
+        Args:
+          num_workers: number of worker processes, default os.cpu_count()
+        """
+        self.num_workers = num_workers or os.cpu_count()
+        self._shards = []
+        self._listeners = []
+        self._pending = {}
+        self._next_request_id = 0
+        self._table_shards = {}
+        self._closing = False
+
+    async def start(self):
+        """Starts the worker processes."""
+        context = multiprocessing.get_context("spawn")
+        for _ in range(self.num_workers):
+            router_conn, worker_conn = context.Pipe()
+            process = context.Process(target=_worker_main, args=(worker_conn,),
+                                      daemon=True)
+            process.start()
+            worker_conn.close()
+            self._shards.append(
+                (process, _Channel(router_conn, self._handle)))
+
+    async def close(self):
+        """Stops the worker processes. Their tables are lost.
+
+        Requests that haven't been answered yet are cancelled.
+        """
+        self._closing = True
+        for _, channel in self._shards:
+            channel.send(("stop",))
+            channel.flush()
+        loop = asyncio.get_running_loop()
+        for process, channel in self._shards:
+            await loop.run_in_executor(None, process.join)
+            channel.close()
+            channel.conn.close()
+        self._shards = []
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+
+    def add_listener(self, listener):
+        """Adds a listener, which must have a notify(table_id, event) method."""
+        self._listeners.append(listener)
+
+    def shard_of(self, table_id):
+        return shard_of(table_id, self.num_workers)
+
+    async def add_table(self, table_id, config, players, deck_seed=None,
+                        event_types=None):
+        """Creates a table on its worker.
+
+        Args:
+          table_id: hashable, picklable id, unique in the cluster
+          config: game.Configuration
+          players: list of game.Player to seat
+          deck_seed: seed for shuffling the table's decks, None for random
+          event_types: iterable of game.EventType to forward to the listeners
+            (see game.Manager.add_listener), None for all of them
+        """
+        if table_id in self._table_shards:
+            raise ValueError("Table {} already exists".format(table_id))
+        shard = self.shard_of(table_id)
+        self._table_shards[table_id] = shard
+        if event_types is not None:
+            event_types = list(event_types)
+        try:
+            await self._request(shard, "add_table", table_id, config,
+                                list(players), deck_seed, event_types)
+        except Exception:
+            del self._table_shards[table_id]
+            raise
+
+    async def start_table(self, table_id):
+        await self._request(self._shard_for_table(table_id), "start_table",
+                            table_id)
+
+    async def remove_table(self, table_id):
+        shard = self._shard_for_table(table_id)
+        del self._table_shards[table_id]
+        await self._request(shard, "remove_table", table_id)
+
+    def submit_action(self, table_id, action):
+        """Forwards an action to the table's worker without waiting.
+
+        Returns:
+          asyncio.Future that is done once the worker has applied the action,
+          with the exception if it failed.
+        """
+        return self._send_request(self._shard_for_table(table_id), "act",
+                                  table_id, action)
+
+    async def act(self, table_id, action):
+        await self.submit_action(table_id, action)
+
+    async def stats(self):
+        """Returns combined throughput numbers (see TableHost.stats).
+
+        The aggregate hands_per_sec is the sum over the workers.
+        """
+        worker_stats = await asyncio.gather(*(
+            self._request(shard, "stats") for shard in range(self.num_workers)))
+        per_table = {}
+        for s in worker_stats:
+            per_table.update(s["per_table"])
+        return {
+            "tables": sum(s["tables"] for s in worker_stats),
+            "hands": sum(s["hands"] for s in worker_stats),
+            "hands_per_sec": sum(s["hands_per_sec"] for s in worker_stats),
+            "per_table": per_table,
+            "per_worker": [s["hands_per_sec"] for s in worker_stats],
+        }
+
+    def _shard_for_table(self, table_id):
+        try:
+            return self._table_shards[table_id]
+        except KeyError:
+            raise table_host.UnknownTableError(table_id)
+
+    def _send_request(self, shard, kind, *args):
+        request_id = self._next_request_id
+        self._next_request_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self._shards[shard][1].send((kind, request_id) + args)
+        return future
+
+    async def _request(self, shard, kind, *args):
+        return await self._send_request(shard, kind, *args)
+
+    def _handle(self, message):
+        kind = message[0]
+        if kind == "event":
+            _, table_id, event = message
+            for listener in self._listeners:
+                listener.notify(table_id, event)
+        elif kind == "result":
+            _, request_id, error, result = message
+            future = self._pending.pop(request_id)
+            if future.done():
+                return
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        elif kind == "closed":
+            if self._closing:
+                return
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Worker exited"))
+            self._pending.clear()
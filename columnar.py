@@ -0,0 +1,401 @@
+"""Columnar numpy exports of hand histories for bulk analysis.
+
+A hand history file (see the history module) has one record per hand,
+which is the right shape for writing and replaying but slow to analyse:
+every question means decoding every record into Python objects. An export
+instead holds each field as a numpy array over all the hands, in chunks of
+chunk_size hands, each column of a chunk in its own .npy file so that it
+can be memory mapped and only the columns (and chunks) a study uses are
+read from disk:
+
+  export_history("hands.mphh", "hands_columns")
+  reader = ColumnReader("hands_columns")
+  for start, chunk in reader.chunks(["hole_cards", "net_profit"]):
+      ...
+
+Layout of the export directory:
+  manifest.json: {"version", "max_players", "config" (hex of the
+    history.encode_config header), "chunks": [{"name", "hands",
+    "actions"}, ...]}
+  <chunk name>/<column>.npy for every column
+
+Columns, for a chunk of N hands with P = max_players seats:
+  button_pos     int8   [N]
+  seat_mask      uint16 [N]      bit i set if seat i had a player
+  ante           int64  [N]
+  stacks         int64  [N, P]   initial stacks, 0 for empty seats
+  hole_cards     int8   [N, P, 2] card indices (see deck.Card), -1 for empty
+                                 seats
+  board          int8   [N, 5]   card indices, -1 for cards not dealt
+  showdown       bool   [N]
+  winner_mask    uint16 [N]      bit i set if seat i won part of the pot
+  pot_winnings   int64  [N, P]
+  net_profit     int64  [N, P]   see history.net_profit
+  action_offsets int64  [N + 1]  the actions of hand i are
+                                 action_offsets[i]:action_offsets[i + 1] of
+                                 the action columns
+  action_codes   uint8  [A]      action_type << 4 | player_idx
+  action_amounts int64  [A]      amount of BET, RAISE and BLIND_BET, else 0
+
+This module needs numpy.
+"""
+
+import json
+import mmap
+import os
+
+import numpy as np
+
+import history
+
+VERSION = 1
+MANIFEST = "manifest.json"
+
+HAND_COLUMNS = ("button_pos", "seat_mask", "ante", "stacks", "hole_cards",
+                "board", "showdown", "winner_mask", "pot_winnings",
+                "net_profit")
+ACTION_COLUMNS = ("action_codes", "action_amounts")
+COLUMNS = HAND_COLUMNS + ("action_offsets",) + ACTION_COLUMNS
+
+# dtype and shape after the first axis of every column, None standing for
+# max_players
+_COLUMN_TYPES = {
+    "button_pos": (np.int8, ()),
+    "seat_mask": (np.uint16, ()),
+    "ante": (np.int64, ()),
+    "stacks": (np.int64, (None,)),
+    "hole_cards": (np.int8, (None, 2)),
+    "board": (np.int8, (5,)),
+    "showdown": (np.bool_, ()),
+    "winner_mask": (np.uint16, ()),
+    "pot_winnings": (np.int64, (None,)),
+    "net_profit": (np.int64, (None,)),
+    "action_offsets": (np.int64, ()),
+    "action_codes": (np.uint8, ()),
+    "action_amounts": (np.int64, ()),
+    # Only in the results of ColumnReader.filter
+    "hand_idx": (np.int64, ()),
+}
+
+
+def _column_array(name, values, max_players):
+    """Returns values (a flat sequence) as the array of column name."""
+    dtype, shape = _COLUMN_TYPES[name]
+    shape = tuple(max_players if d is None else d for d in shape)
+    return np.array(values, dtype).reshape((-1,) + shape)
+
+
+class ColumnFormatError(Exception):
+    pass
+
+
+class ColumnWriter:
+    """Appends history.HandRecords to a columnar export.
+
+    Records are collected in lists and turned into arrays once per chunk.
+    The manifest is rewritten after every chunk, so an export that was cut
+    short can still be read up to its last complete chunk.
+    """
+
+    def __init__(self, path, config, chunk_size=1 << 20):
+        """Creates the export directory.
+
+        Args:
+          path: directory to write, which must not exist or be empty
+          config: game.Configuration of the hands
+          chunk_size: number of hands per chunk
+        """
+        os.makedirs(path, exist_ok=True)
+        if os.listdir(path):
+            raise ValueError("Export directory {} is not empty".format(path))
+        self.path = path
+        self.max_players = config.max_players
+        self.chunk_size = chunk_size
+        self.hands_written = 0
+        self._manifest = {
+            "version": VERSION,
+            "max_players": config.max_players,
+            "config": history.encode_config(config).hex(),
+            "chunks": [],
+        }
+        self._write_manifest()
+        self._reset()
+
+    def _reset(self):
+        self._button_pos = []
+        self._seat_mask = []
+        self._ante = []
+        self._stacks = []
+        self._hole_cards = []
+        self._board = []
+        self._showdown = []
+        self._winner_mask = []
+        self._pot_winnings = []
+        self._net_profit = []
+        self._action_offsets = [0]
+        self._action_codes = bytearray()
+        self._action_amounts = []
+
+    def write(self, record):
+        """Appends a HandRecord."""
+        self._button_pos.append(record.button_pos)
+        self._ante.append(record.ante)
+        seat_mask = 0
+        for idx, stack in enumerate(record.stacks):
+            if stack is not None:
+                seat_mask |= 1 << idx
+                self._stacks.append(stack)
+                self._hole_cards.extend(record.hole_cards[idx])
+                self._pot_winnings.append(record.pot_winnings[idx])
+            else:
+                self._stacks.append(0)
+                self._hole_cards.extend((-1, -1))
+                self._pot_winnings.append(0)
+        self._seat_mask.append(seat_mask)
+        board = record.board
+        self._board.extend(board)
+        self._board.extend((-1,) * (5 - len(board)))
+        self._showdown.append(record.showdown)
+        winner_mask = 0
+        for idx in record.winners:
+            winner_mask |= 1 << idx
+        self._winner_mask.append(winner_mask)
+        self._net_profit.extend(0 if net is None else net
+                                for net in history.net_profit(record))
+
+        codes = self._action_codes
+        amounts = self._action_amounts
+        for action in record.actions:
+            code = history.action_code(action)
+            codes.append(code)
+            amounts.append(action.amount if history.code_has_amount(code) else 0)
+        self._action_offsets.append(len(codes))
+
+        self.hands_written += 1
+        if len(self._button_pos) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the hands collected so far as a chunk."""
+        num_hands = len(self._button_pos)
+        if not num_hands:
+            return
+        values = {
+            "button_pos": self._button_pos,
+            "seat_mask": self._seat_mask,
+            "ante": self._ante,
+            "stacks": self._stacks,
+            "hole_cards": self._hole_cards,
+            "board": self._board,
+            "showdown": self._showdown,
+            "winner_mask": self._winner_mask,
+            "pot_winnings": self._pot_winnings,
+            "net_profit": self._net_profit,
+            "action_offsets": self._action_offsets,
+            "action_codes": self._action_codes,
+            "action_amounts": self._action_amounts,
+        }
+        columns = {name: _column_array(name, column_values, self.max_players)
+                   for name, column_values in values.items()}
+        chunk = {"name": "{:05d}".format(len(self._manifest["chunks"])),
+                 "hands": num_hands, "actions": len(self._action_codes)}
+        chunk_path = os.path.join(self.path, chunk["name"])
+        os.mkdir(chunk_path)
+        for name, array in columns.items():
+            np.save(os.path.join(chunk_path, name + ".npy"), array)
+        self._manifest["chunks"].append(chunk)
+        self._write_manifest()
+        self._reset()
+
+    def _write_manifest(self):
+        # Written to a temporary file and renamed, so a reader never sees a
+        # manifest listing a chunk that isn't all there
+        manifest_path = os.path.join(self.path, MANIFEST)
+        with open(manifest_path + ".tmp", "w") as f:
+            json.dump(self._manifest, f)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def export_history(history_path, path, chunk_size=1 << 20):
+    """Exports a hand history file to a new columnar export at path.
+
+    The file is memory mapped and decoded a record at a time, so it isn't
+    read into memory all at once.
+
+    Returns:
+      number of hands exported
+    """
+    with open(history_path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            view = memoryview(data)
+            try:
+                config, records = history.read_hand_histories(view)
+                with ColumnWriter(path, config, chunk_size) as writer:
+                    for record in records:
+                        writer.write(record)
+                return writer.hands_written
+            finally:
+                view.release()
+
+
+class ColumnReader:
+    """Reads a columnar export, memory mapping the columns it is asked for.
+
+    Attributes:
+      config: game.Configuration of the hands
+      max_players: number of seats
+      num_hands: number of hands in the export
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(os.path.join(path, MANIFEST)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ColumnFormatError("Can't read manifest: {}".format(e))
+        if manifest.get("version") != VERSION:
+            raise ColumnFormatError("Unsupported version {}".format(
+                manifest.get("version")))
+        self.max_players = manifest["max_players"]
+        self.config = history.decode_config(bytes.fromhex(manifest["config"]))[0]
+        self._chunks = manifest["chunks"]
+        # Index of the first hand of each chunk, and of the end
+        self._starts = np.cumsum([0] + [c["hands"] for c in self._chunks])
+        self.num_hands = int(self._starts[-1])
+
+    def __len__(self):
+        return self.num_hands
+
+    def _load(self, chunk_idx, name):
+        return np.load(os.path.join(self.path, self._chunks[chunk_idx]["name"],
+                                    name + ".npy"), mmap_mode="r")
+
+    def _chunk(self, chunk_idx, columns):
+        return {name: self._load(chunk_idx, name) for name in columns}
+
+    def _columns(self, columns):
+        if columns is None:
+            return COLUMNS
+        for name in columns:
+            if name not in COLUMNS:
+                raise ValueError("Unknown column {}".format(name))
+        if any(name in ACTION_COLUMNS for name in columns):
+            # The offsets are needed to slice the actions
+            columns = tuple(columns) + ("action_offsets",)
+        return columns
+
+    def chunks(self, columns=None):
+        """Yields (index of the first hand, dict of column name to array) for
+        every chunk.
+
+        The arrays are read only memory maps, so only what is used of them is
+        read from disk.
+        """
+        columns = self._columns(columns)
+        for chunk_idx in range(len(self._chunks)):
+            yield int(self._starts[chunk_idx]), self._chunk(chunk_idx, columns)
+
+    def read(self, columns=None, start=0, stop=None):
+        """Returns dict of column name to array for hands start:stop.
+
+        Only the chunks holding those hands are touched. The action_offsets
+        of the result start at 0.
+        """
+        columns = self._columns(columns)
+        stop = self.num_hands if stop is None else max(min(stop, self.num_hands), 0)
+        start = min(max(start, 0), stop)
+        parts = {name: [] for name in columns}
+        first = int(np.searchsorted(self._starts, start, side="right")) - 1
+        for chunk_idx in range(max(first, 0), len(self._chunks)):
+            chunk_start = int(self._starts[chunk_idx])
+            if chunk_start >= stop:
+                break
+            begin = max(start - chunk_start, 0)
+            end = min(stop - chunk_start, self._chunks[chunk_idx]["hands"])
+            chunk = self._chunk(chunk_idx, columns)
+            _slice_chunk(chunk, parts, begin, end, None)
+        return _concatenate(parts, self.max_players)
+
+    def filter(self, predicate, columns=None):
+        """Returns the columns of the hands for which predicate is true.
+
+        Args:
+          predicate: function from a chunk (dict of column name to array, as
+            yielded by chunks()) to a boolean array over its hands. It is
+            given every column, memory mapped, so it only reads what it uses.
+          columns: names of the columns to return, default all
+
+        Returns:
+          dict of column name to array, plus "hand_idx", the index of each
+          selected hand in the export
+        """
+        columns = self._columns(columns)
+        parts = {name: [] for name in columns}
+        parts["hand_idx"] = []
+        for start, chunk in self.chunks():
+            mask = np.asarray(predicate(chunk), dtype=np.bool_)
+            if mask.shape != (len(chunk["button_pos"]),):
+                raise ValueError("predicate returned shape {}".format(mask.shape))
+            _slice_chunk(chunk, parts, 0, len(mask), mask)
+            parts["hand_idx"].append(start + np.flatnonzero(mask))
+        return _concatenate(parts, self.max_players)
+
+    def actions(self, columns, idx):
+        """Returns the list of game.Action of hand idx of a read() or
+        filter() result (or chunk)."""
+        offsets = columns["action_offsets"]
+        begin, end = int(offsets[idx]), int(offsets[idx + 1])
+        return [history.code_to_action(
+                    code, amount if history.code_has_amount(code) else None)
+                for code, amount in zip(columns["action_codes"][begin:end].tolist(),
+                                        columns["action_amounts"][begin:end].tolist())]
+
+
+def _slice_chunk(chunk, parts, begin, end, mask):
+    """Adds hands begin:end of chunk, those of them in mask if it isn't None,
+    to the lists of parts."""
+    offsets = None
+    if "action_offsets" in parts:
+        offsets = np.asarray(chunk["action_offsets"][begin:end + 1])
+        lengths = np.diff(offsets)
+        if mask is not None:
+            action_mask = np.repeat(mask, lengths)
+            lengths = lengths[mask]
+        parts["action_offsets"].append(lengths)
+    for name in parts:
+        if name == "action_offsets" or name == "hand_idx":
+            continue
+        if name in ACTION_COLUMNS:
+            array = chunk[name][offsets[0]:offsets[-1]]
+            if mask is not None:
+                array = array[action_mask]
+        else:
+            array = chunk[name][begin:end]
+            if mask is not None:
+                array = array[mask]
+        parts[name].append(np.asarray(array))
+
+
+def _concatenate(parts, max_players):
+    result = {}
+    for name, arrays in parts.items():
+        if name == "action_offsets":
+            lengths = np.concatenate(arrays) if arrays else np.zeros(0, np.int64)
+            offsets = np.zeros(len(lengths) + 1, np.int64)
+            np.cumsum(lengths, out=offsets[1:])
+            result[name] = offsets
+        elif arrays:
+            result[name] = np.concatenate(arrays)
+        else:
+            result[name] = _column_array(name, [], max_players)
+    return result
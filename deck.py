@@ -63,6 +63,17 @@ class Deck:
                 order.append(i)
         return Deck(order=order)
         
+    def fork(self):
+        """Returns a deck at the same position which shares this one's order.
+
+        Dealing from either deck doesn't affect the other, but the order must
+        not be changed (e.g. by shuffle) while both are in use.
+        """
+        other = Deck.__new__(Deck)
+        other.our_deck = self.our_deck
+        other.next_card_idx = self.next_card_idx
+        return other
+
     def shuffle(self):
         random.shuffle(self.our_deck)
         self.next_card_idx = 0
@@ -74,3 +85,12 @@ class Deck:
     def deal_one(self):
         return self.deal(1)[0]
 
+
+def shuffled_deck_factory(rng):
+    """Returns a deck factory (see game.Hand) whose decks are shuffled with
+    rng, a random.Random, so that the deals can be repeated from its seed."""
+    def factory():
+        d = Deck()
+        rng.shuffle(d.our_deck)
+        return d
+    return factory
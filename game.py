@@ -1,5 +1,6 @@
 """Game manages the poker game and the state of the players."""
 
+import array
 import enum
 import random
 
@@ -109,35 +110,38 @@ class Player:
 
 @enum.unique
 class EventType(enum.Enum):
-    # Expected args: player(of type Player)
+    # Each type has its own Event subclass below (see EVENT_CLASSES) with
+    # these attributes.
+    #
+    # PlayerAddedEvent: player(of type Player)
     PLAYER_ADDED = 0
-    # Expected args: player(of type Player)
+    # PlayerRemovedEvent: player(of type Player)
     PLAYER_REMOVED = 1
-    # Expected args: None
+    # WaitingForStartEvent: None
     WAITING_FOR_START = 2
-    # Expected args: players (array of HandPlayer)
+    # HandStartedEvent: players (array of HandPlayer)
     HAND_STARTED = 3
-    # Expected args: player_indices (array of int)
+    # AnteEvent: amount (int), player_indices (array of int)
     ANTE = 4
-    # Expected args: cards (array of cards.PlayerCards)
+    # HoleCardsDealtEvent: cards (array of cards.PlayerCards)
     HOLE_CARDS_DEALT = 5
-    # Expected args: cards (cards.PlayerCards)
+    # FlopDealtEvent: cards (cards.PlayerCards)
     FLOP_DEALT = 6
-    # Expected args: card (deck.Card)
+    # TurnDealtEvent: card (deck.Card)
     TURN_DEALT = 7
-    # Expected args: card (deck.Card)
+    # RiverDealtEvent: card (deck.Card)
     RIVER_DEALT = 8
-    # Expected args:
+    # ShowdownEvent:
     #     ranks (array of array (as returned by cards.PlayerCards.hand_rank))
     #     winners (array of int)
     SHOWDOWN = 9
-    # Expected args:
+    # PayingOutEvent:
     #     pot_winnings (array of int (config.max_players size))
     #     net_profit (array of int (config.max_players size))
     PAYING_OUT = 10
-    # Expected args: action (Action)
+    # ActionEvent: action (Action)
     ACTION = 11
-    # Expected args:
+    # ActionOnEvent:
     #     hand_player (HandPlayer)
     #     allowed (AllowedAction)
     ACTION_ON = 12
@@ -148,32 +152,147 @@ class Event:
     In order to keep a clean interface between the Manager and the
     parts of the system that need to respond to changes in the game,
     objects can subscribe as listeners in a Manager and be passed
-    Event objects telling them when things happen in the game.
+    Event objects telling them when things happen in the game. Listeners
+    can subscribe to only some EventTypes (see Manager.add_listener).
 
     If the listener is going to keep a reference to the data passed in
     the Event, they should make a copy because the underlying objects may be
     updated.
 
+    Every EventType has its own subclass of Event, which uses __slots__ so
+    that the many events created while playing stay small and cheap to
+    construct. EVENT_CLASSES maps from EventType to the subclass.
+
     Attributes:
       event_type: the type of event (one of the enum EventType)
-      <kwargs>: Everything passed in to kwargs in the constructor are turned into
-        attributes on the Event. For example, in the PAYING_OUT events, you can access
-        event.pot_winnings and event.net_profit
+      <fields>: The attributes specific to the type of event. For example, in
+        the PAYING_OUT events, you can access event.pot_winnings and
+        event.net_profit
 
     The expected attributes are documented in EventType above.
     """
-    def __init__(self, event_type, **kwargs):
-        self.event_type = event_type
-        for k, v in kwargs.items():
-            setattr(self, k, v)
+    __slots__ = ()
+
+    event_type = None
+    # Names of the attributes, in the order they appear in str()
+    _fields = ()
 
     def __str__(self):
-        args_strs = []
-        for key in sorted(self.__dict__.keys()):
-            if key == "event_type":
-                continue
-            args_strs.append("{}={}".format(key, getattr(self, key)))
-        return "Event({}, {})".format(self.event_type, ", ".join(args_strs))
+        return "Event({}, {})".format(
+            self.event_type,
+            ", ".join("{}={}".format(f, getattr(self, f)) for f in self._fields))
+
+
+class PlayerAddedEvent(Event):
+    __slots__ = _fields = ("player",)
+    event_type = EventType.PLAYER_ADDED
+
+    def __init__(self, player):
+        self.player = player
+
+
+class PlayerRemovedEvent(Event):
+    __slots__ = _fields = ("player",)
+    event_type = EventType.PLAYER_REMOVED
+
+    def __init__(self, player):
+        self.player = player
+
+
+class WaitingForStartEvent(Event):
+    __slots__ = _fields = ()
+    event_type = EventType.WAITING_FOR_START
+
+
+class HandStartedEvent(Event):
+    __slots__ = _fields = ("players",)
+    event_type = EventType.HAND_STARTED
+
+    def __init__(self, players):
+        self.players = players
+
+
+class AnteEvent(Event):
+    __slots__ = _fields = ("amount", "player_indices")
+    event_type = EventType.ANTE
+
+    def __init__(self, amount, player_indices):
+        self.amount = amount
+        self.player_indices = player_indices
+
+
+class HoleCardsDealtEvent(Event):
+    __slots__ = _fields = ("cards",)
+    event_type = EventType.HOLE_CARDS_DEALT
+
+    def __init__(self, cards):
+        self.cards = cards
+
+
+class FlopDealtEvent(Event):
+    __slots__ = _fields = ("cards",)
+    event_type = EventType.FLOP_DEALT
+
+    def __init__(self, cards):
+        self.cards = cards
+
+
+class TurnDealtEvent(Event):
+    __slots__ = _fields = ("card",)
+    event_type = EventType.TURN_DEALT
+
+    def __init__(self, card):
+        self.card = card
+
+
+class RiverDealtEvent(Event):
+    __slots__ = _fields = ("card",)
+    event_type = EventType.RIVER_DEALT
+
+    def __init__(self, card):
+        self.card = card
+
+
+class ShowdownEvent(Event):
+    __slots__ = _fields = ("ranks", "winners")
+    event_type = EventType.SHOWDOWN
+
+    def __init__(self, ranks, winners):
+        self.ranks = ranks
+        self.winners = winners
+
+
+class PayingOutEvent(Event):
+    __slots__ = _fields = ("net_profit", "pot_winnings")
+    event_type = EventType.PAYING_OUT
+
+    def __init__(self, net_profit, pot_winnings):
+        self.net_profit = net_profit
+        self.pot_winnings = pot_winnings
+
+
+class ActionEvent(Event):
+    __slots__ = _fields = ("action",)
+    event_type = EventType.ACTION
+
+    def __init__(self, action):
+        self.action = action
+
+
+class ActionOnEvent(Event):
+    __slots__ = _fields = ("allowed", "hand_player")
+    event_type = EventType.ACTION_ON
+
+    def __init__(self, hand_player, allowed):
+        self.hand_player = hand_player
+        self.allowed = allowed
+
+
+EVENT_CLASSES = {cls.event_type: cls for cls in [
+    PlayerAddedEvent, PlayerRemovedEvent, WaitingForStartEvent,
+    HandStartedEvent, AnteEvent, HoleCardsDealtEvent, FlopDealtEvent,
+    TurnDealtEvent, RiverDealtEvent, ShowdownEvent, PayingOutEvent,
+    ActionEvent, ActionOnEvent]}
 
 
 def _shuffled_deck_factory():
@@ -191,6 +310,21 @@ def _next_valid_position(current_pos, valid_players):
     raise NotEnoughPlayersError()
 
 
+def _next_set_bit(current_pos, mask):
+    """Like _next_valid_position, but valid positions are the set bits of mask.
+
+    This is a bit scan instead of a walk around the table: first look for a
+    set bit above current_pos, then wrap around to the lowest set bit (which
+    may be current_pos itself).
+    """
+    higher = mask >> (current_pos + 1)
+    if higher:
+        return current_pos + (higher & -higher).bit_length()
+    if mask:
+        return (mask & -mask).bit_length() - 1
+    raise NotEnoughPlayersError()
+
+
 @enum.unique
 class ActionType(enum.Enum):
     CHECK = 0
@@ -254,6 +388,16 @@ class AllowedAction:
         """
         return action_type in self._action_map
 
+    def action_ranges(self):
+        """Returns the allowed action types with their value ranges.
+
+        Returns:
+          read-only view of (ActionType, range) pairs, as dict.items(). range
+          is (min, max) as from range_for_action, or None for action types
+          without an amount.
+        """
+        return self._action_map.items()
+
     def range_for_action(self, action_type):
         """Returns the value range for given action_type.
 
@@ -294,6 +438,39 @@ class AllowedAction:
                 raise ActionAmountError(action.amount, valid_min, valid_max)
 
 
+# Layout of the Hand state buffer (see Hand.state_view). These are the offsets
+# of the fields that don't depend on the number of seats; state_layout gives
+# all of them.
+STATE_BUTTON = 0
+STATE_ACTION_ON = 1
+STATE_NUM_ACTIONS = 2
+STATE_LIVE_MASK = 3
+STATE_POT = 4
+STATE_NUM_BOARD = 5
+STATE_BOARD = 6
+STATE_HOLE_CARDS = 11
+
+
+def state_layout(max_players):
+    """Describes the Hand state buffer for a table of max_players seats.
+
+    Returns:
+      dict of field name to (offset, number of elements)
+    """
+    return {
+        "button_pos": (STATE_BUTTON, 1),
+        "action_on": (STATE_ACTION_ON, 1),
+        "num_actions": (STATE_NUM_ACTIONS, 1),
+        "live_mask": (STATE_LIVE_MASK, 1),
+        "pot": (STATE_POT, 1),
+        "num_board": (STATE_NUM_BOARD, 1),
+        "board": (STATE_BOARD, 5),
+        "hole_cards": (STATE_HOLE_CARDS, 2 * max_players),
+        "stacks": (STATE_HOLE_CARDS + 2 * max_players, max_players),
+        "outlays": (STATE_HOLE_CARDS + 3 * max_players, max_players),
+    }
+
+
 class HandPlayer:
     """Controls the state of a player for one deal/pot."""
     def __init__(self, player):
@@ -326,6 +503,17 @@ class Hand:
       ranks: ranks of all hands present at showdown
       winners: list of winners
       pot_winnings: amount won from the pot
+
+    The numeric state of the hand is also kept up to date in a buffer of
+    int64, which state_view() gives without copying (see state_layout):
+      button_pos, action_on (-1 for None), number of actions in the current
+        betting round (blinds included, 0 outside one), live mask, pot
+        (without the current betting round), number of board cards
+      the 5 board card indices, -1 for cards not dealt yet
+      2 hole card indices per seat, -1 for empty seats and players without
+        cards
+      the stack of every seat, 0 for empty seats
+      the outlay of every seat in the current betting round, 0 outside one
     """
     def __init__(self, config, players, button_pos, deck_factory):
         """Creates the hand.
@@ -353,16 +541,138 @@ class Hand:
         self.action_on = None
         self.past_action = None
 
+        # Bit i is set when self.players[i] is still in the hand. These are
+        # maintained incrementally as hole cards are dealt and players fold so
+        # that the per action bookkeeping doesn't have to walk all the seats.
+        self._live_mask = 0
+        self._num_live = 0
+        # Bit i is set while self.players[i] is shared with a fork (see fork)
+        # and has to be copied before it is changed.
+        self._shared_players = 0
+        self._rebuild_state()
+
+    def _rebuild_state(self):
+        """Fills in the state buffer from scratch.
+
+        The buffer is otherwise updated as the hand changes; this is for
+        Hands which are put together some other way, like snapshot.restore.
+        """
+        num_seats = len(self.players)
+        self._stacks_at = STATE_HOLE_CARDS + 2 * num_seats
+        self._outlays_at = self._stacks_at + num_seats
+        state = array.array("q", bytes(8 * (self._outlays_at + num_seats)))
+        state[STATE_BUTTON] = self.button_pos
+        state[STATE_ACTION_ON] = -1 if self.action_on is None else self.action_on
+        state[STATE_LIVE_MASK] = self._live_mask
+        state[STATE_POT] = self.pot
+        state[STATE_NUM_BOARD] = len(self.board.cards)
+        for idx in range(5):
+            state[STATE_BOARD + idx] = -1
+        for idx, card in enumerate(self.board.cards):
+            state[STATE_BOARD + idx] = card.card_idx
+        for idx, p in enumerate(self.players):
+            state[STATE_HOLE_CARDS + 2 * idx] = -1
+            state[STATE_HOLE_CARDS + 2 * idx + 1] = -1
+            if p is None:
+                continue
+            if p.hole_cards is not None:
+                for offset, card in enumerate(p.hole_cards.cards):
+                    state[STATE_HOLE_CARDS + 2 * idx + offset] = card.card_idx
+            state[self._stacks_at + idx] = p.stack
+        if self.past_action is not None:
+            state[STATE_NUM_ACTIONS] = len(self.past_action)
+            state[self._outlays_at:] = array.array("q", self.current_outlay)
+        self._state = state
+        self._state_view = None
+
+    def state_view(self):
+        """Returns a read-only memoryview of the state buffer.
+
+        The view is of int64 (format "q") laid out as described in the class
+        docstring and by state_layout. It isn't a copy: it always shows the
+        current state of the hand, and the same view is returned each time.
+        With numpy, numpy.frombuffer(hand.state_view(), dtype=numpy.int64)
+        gives a read-only array which is also a view of the buffer.
+        """
+        if self._state_view is None:
+            self._state_view = memoryview(self._state).toreadonly()
+        return self._state_view
+
+    def __getstate__(self):
+        # A memoryview can't be pickled or copied; state_view() makes a new
+        # one for the copy when it's asked for.
+        state = self.__dict__.copy()
+        state["_state_view"] = None
+        return state
+
+    def _set_hole_cards(self, player_idx, hole_cards):
+        """Sets a player's hole cards (a cards.PlayerCards or None)."""
+        self._own_player(player_idx).hole_cards = hole_cards
+        at = STATE_HOLE_CARDS + 2 * player_idx
+        if hole_cards is None:
+            self._state[at] = -1
+            self._state[at + 1] = -1
+        else:
+            self._state[at] = hole_cards.cards[0].card_idx
+            self._state[at + 1] = hole_cards.cards[1].card_idx
+
+    def _set_stack(self, player_idx, stack):
+        self._own_player(player_idx).stack = stack
+        self._state[self._stacks_at + player_idx] = stack
+
+    def _clear_outlays(self):
+        state = self._state
+        for idx in range(self._outlays_at, len(state)):
+            state[idx] = 0
+
+    def fork(self):
+        """Returns a copy of the hand for trying out actions, e.g. in a search.
+
+        Acting and dealing on the copy don't affect this hand or the other way
+        around. Only the state that changes during the hand (pot, board,
+        betting round) is copied. The config, the cards and the deck order are
+        shared, as are ranks, winners and pot_winnings, which are only ever
+        replaced, not changed.
+
+        The HandPlayers are copied on write: both hands share them until one
+        of the hands changes a player, which then gets its own copy. Code
+        outside Hand must not change the HandPlayers of a forked hand.
+        """
+        other = Hand.__new__(Hand)
+        other.__dict__.update(self.__dict__)
+        other.deck = self.deck.fork()
+        other.players = self.players.copy()
+        shared = (1 << len(self.players)) - 1
+        self._shared_players = shared
+        other._shared_players = shared
+        other.board = cards.PlayerCards(self.board.cards)
+        other._state = self._state[:]
+        other._state_view = None
+        if self.past_action is not None:
+            other.past_action = self.past_action.copy()
+            other.current_outlay = self.current_outlay.copy()
+        return other
+
+    def _own_player(self, player_idx):
+        """Returns players[player_idx] after making sure it isn't shared."""
+        if self._shared_players >> player_idx & 1:
+            copied = HandPlayer.__new__(HandPlayer)
+            copied.__dict__.update(self.players[player_idx].__dict__)
+            self.players[player_idx] = copied
+            self._shared_players &= ~(1 << player_idx)
+        return self.players[player_idx]
+
     def ante(self):
         if self.config.ante == 0:
             return None
         num_players = sum(1 for p in self.players if p is not None)
         self.pot += num_players * self.config.ante
+        self._state[STATE_POT] = self.pot
         players_who_anted = []
         for pos, player in enumerate(self.players):
             if player is None:
                 continue
-            player.stack -= self.config.ante
+            self._set_stack(pos, player.stack - self.config.ante)
             players_who_anted.append(pos)
         return players_who_anted
 
@@ -372,8 +682,12 @@ class Hand:
         Returns:
           boolean array of length len(self.players)
         """
-        return [p is not None and p.hole_cards is not None
-                for p in self.players]
+        return [bool(self._live_mask >> idx & 1)
+                for idx in range(len(self.players))]
+
+    def num_live_players(self):
+        """Returns the number of players still in the hand."""
+        return self._num_live
 
     def is_betting_active(self):
         """Returns whether a betting round is in progress.
@@ -387,24 +701,48 @@ class Hand:
         if self.config.game_type == GameType.NO_BETTING:
             return
         assert self.config.game_type == GameType.LIMIT
-        self.action_on = _next_valid_position(self.button_pos, self.live_players())
+        self.action_on = _next_set_bit(self.button_pos, self._live_mask)
         self.past_action = []
         self.current_outlay = [0] * len(self.players)
+        self._state[STATE_ACTION_ON] = self.action_on
+        self._state[STATE_NUM_ACTIONS] = 0
+        # Running bookkeeping for the round so that checking whether the
+        # round is over doesn't need to rescan past_action or current_outlay.
+        # Bit i of _acted_mask is set once player i has acted (blinds don't
+        # count), _max_outlay is max(current_outlay) and _num_matched is the
+        # number of live players whose outlay equals _max_outlay.
+        self._acted_mask = 0
+        self._max_outlay = 0
+        self._num_matched = self._num_live
 
     def _has_acted(self, player_idx):
-        for a in self.past_action:
-            if a.action_type == ActionType.BLIND_BET:
-                continue
-            if a.player_idx == player_idx:
-                return True
-        return False
+        return bool(self._acted_mask >> player_idx & 1)
 
     def _equal_outlay(self):
-        live_outlay = [x for x, live in zip(self.current_outlay, self.live_players()) if live]
-        return max(live_outlay) == min(live_outlay)
+        return self._num_matched == self._num_live
 
     def _current_total_bet(self):
-        return max(self.current_outlay)
+        return self._max_outlay
+
+    def _add_outlay(self, player_idx, amount):
+        """Moves amount from the player's stack into their outlay."""
+        old_outlay = self.current_outlay[player_idx]
+        new_outlay = old_outlay + amount
+        if self._shared_players:
+            self._own_player(player_idx)
+        player = self.players[player_idx]
+        player.stack -= amount
+        self.current_outlay[player_idx] = new_outlay
+        state = self._state
+        state[self._stacks_at + player_idx] = player.stack
+        state[self._outlays_at + player_idx] = new_outlay
+        if old_outlay == self._max_outlay:
+            self._num_matched -= 1
+        if new_outlay > self._max_outlay:
+            self._max_outlay = new_outlay
+            self._num_matched = 1
+        elif new_outlay == self._max_outlay:
+            self._num_matched += 1
 
     def allowed_action(self):
         """Gets the allowed actions for the current player.
@@ -416,7 +754,7 @@ class Hand:
         if not self.is_betting_active():
             return allowed
 
-        current_bet = self._current_total_bet()
+        current_bet = self._max_outlay
         if current_bet == self.current_outlay[self.action_on]:
             allowed._action_map[ActionType.CHECK] = None
         else:
@@ -457,38 +795,52 @@ class Hand:
         if action.action_type == ActionType.CHECK:
             pass
         elif action.action_type == ActionType.BET or action.action_type == ActionType.BLIND_BET:
-            self.players[action.player_idx].stack -= action.amount
-            self.current_outlay[action.player_idx] += action.amount
+            self._add_outlay(action.player_idx, action.amount)
         elif action.action_type == ActionType.CALL:
-            amount = self._current_total_bet() - self.current_outlay[action.player_idx]
-            self.players[action.player_idx].stack -= amount
-            self.current_outlay[action.player_idx] += amount
+            amount = self._max_outlay - self.current_outlay[action.player_idx]
+            self._add_outlay(action.player_idx, amount)
         elif action.action_type == ActionType.RAISE:
-            total_amount = self._current_total_bet() - self.current_outlay[action.player_idx] + action.amount
-            self.players[action.player_idx].stack -= total_amount
-            self.current_outlay[action.player_idx] += total_amount
+            total_amount = self._max_outlay - self.current_outlay[action.player_idx] + action.amount
+            self._add_outlay(action.player_idx, total_amount)
         elif action.action_type == ActionType.FOLD:
-            self.players[action.player_idx].hole_cards = None
+            self._set_hole_cards(action.player_idx, None)
+            self._live_mask &= ~(1 << action.player_idx)
+            self._num_live -= 1
+            self._state[STATE_LIVE_MASK] = self._live_mask
+            if self.current_outlay[action.player_idx] == self._max_outlay:
+                self._num_matched -= 1
         else:
             raise ValueError("Did not understand action {}".format(action))
 
+        if action.action_type != ActionType.BLIND_BET:
+            self._acted_mask |= 1 << action.player_idx
         self.past_action.append(action)
 
-        self.action_on = _next_valid_position(self.action_on, self.live_players())
+        self.action_on = _next_set_bit(self.action_on, self._live_mask)
+        state = self._state
+        state[STATE_NUM_ACTIONS] += 1
+        state[STATE_ACTION_ON] = self.action_on
 
-        if (sum(self.live_players()) == 1 or
+        if (self._num_live == 1 or
             (self._has_acted(self.action_on) and self._equal_outlay())):
             self.pot += sum(self.current_outlay)
             # We can finish this betting round!
             self.action_on = None
             self.past_action = None
             self.current_outlay = None
+            state[STATE_ACTION_ON] = -1
+            state[STATE_NUM_ACTIONS] = 0
+            state[STATE_POT] = self.pot
+            self._clear_outlays()
 
     def deal_hole_cards(self):
-        for p in self.players:
+        for pos, p in enumerate(self.players):
             if p is None:
                 continue
-            p.hole_cards = cards.PlayerCards(self.deck.deal(2))
+            self._set_hole_cards(pos, cards.PlayerCards(self.deck.deal(2)))
+            self._live_mask |= 1 << pos
+            self._num_live += 1
+        self._state[STATE_LIVE_MASK] = self._live_mask
 
         self._start_betting_round()
         if self.config.blinds:
@@ -497,16 +849,23 @@ class Hand:
                                            action_type=ActionType.BLIND_BET,
                                            amount=blind))
 
+    def _deal_board(self, num_cards):
+        board = self.board.cards
+        for card in self.deck.deal(num_cards):
+            self._state[STATE_BOARD + len(board)] = card.card_idx
+            board.append(card)
+        self._state[STATE_NUM_BOARD] = len(board)
+
     def deal_flop(self):
-        self.board.cards.extend(self.deck.deal(3))
+        self._deal_board(3)
         self._start_betting_round()
 
     def deal_turn(self):
-        self.board.cards.extend(self.deck.deal(1))
+        self._deal_board(1)
         self._start_betting_round()
 
     def deal_river(self):
-        self.board.cards.extend(self.deck.deal(1))
+        self._deal_board(1)
         self._start_betting_round()
 
     def showdown(self):
@@ -525,7 +884,7 @@ class Hand:
         for idx in self.winners:
             amount_won = self.pot // len(self.winners)
             self.pot_winnings[idx] += amount_won
-            self.players[idx].stack += amount_won
+            self._set_stack(idx, self.players[idx].stack + amount_won)
 
         # Distribute the extra chips to the first person to act
         extra_chips = self.pot % len(self.winners)
@@ -533,17 +892,18 @@ class Hand:
             idx = (self.button_pos + offset) % self.config.max_players
             if idx in self.winners:
                 self.pot_winnings[idx] += extra_chips
-                self.players[idx].stack += extra_chips
+                self._set_stack(idx, self.players[idx].stack + extra_chips)
                 break
 
     def early_win(self):
-        live = self.live_players()
-        if sum(live) != 1:
-            raise ValueError("Not an early win with these players live: {}".format(live))
-        self.winners = [live.index(True)]
+        if self._num_live != 1:
+            raise ValueError("Not an early win with these players live: {}"
+                             .format(self.live_players()))
+        self.winners = [self._live_mask.bit_length() - 1]
         self.pot_winnings = [_none_or_func(lambda _: 0, p) for p in self.players]
         self.pot_winnings[self.winners[0]] += self.pot
-        self.players[self.winners[0]].stack += self.pot
+        self._set_stack(self.winners[0],
+                        self.players[self.winners[0]].stack + self.pot)
 
 
 @enum.unique
@@ -593,18 +953,24 @@ class Manager:
         self.button_pos = None
         self.state= GameState.WAITING_FOR_START
         self.current_hand = None
-        self._listeners = []
+        # Maps EventType to the list of listeners subscribed to it
+        self._listeners = {event_type: [] for event_type in EventType}
         # Can be overridden for unittests
         self._deck_factory = _shuffled_deck_factory
 
-    def add_listener(self, listener):
+    def add_listener(self, listener, event_types=None):
         """Adds an Event listener.
 
         Args:
           listener: The only requirement on listener is that it has a notify
                     method that accepts one positional Event argument.
+          event_types: iterable of EventType the listener is interested in.
+                       If None, the listener is notified of every event.
         """
-        self._listeners.append(listener)
+        if event_types is None:
+            event_types = EventType
+        for event_type in set(event_types):
+            self._listeners[event_type].append(listener)
 
     def add_player(self, player):
 
@@ -624,7 +990,8 @@ class Manager:
                 continue
             player.position = idx
             self.players[idx] = player
-            self._notify(Event(EventType.PLAYER_ADDED, player=player))
+            if self._is_listened(EventType.PLAYER_ADDED):
+                self._notify(PlayerAddedEvent(player=player))
             return idx
 
         raise GameFullError()
@@ -649,7 +1016,8 @@ class Manager:
         removed = self.players[player_idx]
         self.players[player_idx] = None
 
-        self._notify(Event(EventType.PLAYER_REMOVED, player=removed))
+        if self._is_listened(EventType.PLAYER_REMOVED):
+            self._notify(PlayerRemovedEvent(player=removed))
 
         return removed
 
@@ -676,15 +1044,14 @@ class Manager:
         elif self.state == GameState.PRE_DEAL:
             self.current_hand.deal_hole_cards()
             self.state = GameState.HOLE_CARDS_DEALT
-            events.append(Event(
-                EventType.HOLE_CARDS_DEALT,
-                cards=[_none_or_func(lambda p: p.hole_cards, p)
-                       for p in self.current_hand.players]))
-            if self.current_hand.is_betting_active():
+            if self._is_listened(EventType.HOLE_CARDS_DEALT):
+                events.append(HoleCardsDealtEvent(
+                    cards=[_none_or_func(lambda p: p.hole_cards, p)
+                           for p in self.current_hand.players]))
+            if (self.current_hand.is_betting_active() and
+                self._is_listened(EventType.ACTION)):
                 for blind_action in self.current_hand.past_action:
-                    events.append(Event(
-                        EventType.ACTION,
-                        action=blind_action))
+                    events.append(ActionEvent(action=blind_action))
             self._maybe_action_on(events)
 
         elif self.state == GameState.HOLE_CARDS_DEALT:
@@ -693,9 +1060,8 @@ class Manager:
             if not self._maybe_early_win(events):
                 self.current_hand.deal_flop()
                 self.state = GameState.FLOP_DEALT
-                events.append(Event(
-                    EventType.FLOP_DEALT,
-                    cards=self.current_hand.board))
+                if self._is_listened(EventType.FLOP_DEALT):
+                    events.append(FlopDealtEvent(cards=self.current_hand.board))
                 self._maybe_action_on(events)
 
         elif self.state == GameState.FLOP_DEALT:
@@ -704,9 +1070,8 @@ class Manager:
             if not self._maybe_early_win(events):
                 self.current_hand.deal_turn()
                 self.state = GameState.TURN_DEALT
-                events.append(Event(
-                    EventType.TURN_DEALT,
-                    card=self.current_hand.board.cards[-1]))
+                if self._is_listened(EventType.TURN_DEALT):
+                    events.append(TurnDealtEvent(card=self.current_hand.board.cards[-1]))
                 self._maybe_action_on(events)
 
         elif self.state == GameState.TURN_DEALT:
@@ -715,9 +1080,8 @@ class Manager:
             if not self._maybe_early_win(events):
                 self.current_hand.deal_river()
                 self.state = GameState.RIVER_DEALT
-                events.append(Event(
-                    EventType.RIVER_DEALT,
-                    card=self.current_hand.board.cards[-1]))
+                if self._is_listened(EventType.RIVER_DEALT):
+                    events.append(RiverDealtEvent(card=self.current_hand.board.cards[-1]))
                 self._maybe_action_on(events)
 
         elif self.state == GameState.RIVER_DEALT:
@@ -726,14 +1090,14 @@ class Manager:
             if not self._maybe_early_win(events):
                 self.current_hand.showdown()
                 self.state = GameState.SHOWDOWN
-                events.append(Event(
-                    EventType.SHOWDOWN,
-                    ranks=self.current_hand.ranks,
-                    winners=self.current_hand.winners))
+                if self._is_listened(EventType.SHOWDOWN):
+                    events.append(ShowdownEvent(
+                        ranks=self.current_hand.ranks,
+                        winners=self.current_hand.winners))
 
         elif self.state == GameState.SHOWDOWN:
             self.state = GameState.PAYING_OUT
-            events.append(self._handle_payouts())
+            self._handle_payouts(events)
 
         elif self.state == GameState.PAYING_OUT:
             self.current_hand = None
@@ -742,7 +1106,8 @@ class Manager:
                 self.state = GameState.PRE_DEAL
             else:
                 self.state = GameState.WAITING_FOR_START
-                events.append(Event(EventType.WAITING_FOR_START))
+                if self._is_listened(EventType.WAITING_FOR_START):
+                    events.append(WaitingForStartEvent())
         else:
             raise ValueError("Unknown state {}".format(self.state))
 
@@ -758,31 +1123,47 @@ class Manager:
 
         self.current_hand.act(action)
 
-        events = [Event(EventType.ACTION, action=action)]
+        events = []
+        if self._is_listened(EventType.ACTION):
+            events.append(ActionEvent(action=action))
         self._maybe_action_on(events)
 
         for e in events:
             self._notify(e)
 
     def _maybe_early_win(self, events):
-        if sum(self.current_hand.live_players()) != 1:
+        if self.current_hand.num_live_players() != 1:
             return False
         self.current_hand.early_win()
         self.state = GameState.PAYING_OUT
-        events.append(self._handle_payouts())
+        self._handle_payouts(events)
         return True
 
-    def _handle_payouts(self):
+    def _handle_payouts(self, events):
+        """Moves the hand results to the players and adds a PAYING_OUT event."""
         net_profit = [_none_or_func(lambda p: p.stack - p.initial_stack, p)
                       for p in self.current_hand.players]
         for p, net in zip(self.players, net_profit):
             if p is None or net is None:
                 continue
             p.stack += net
-        return Event(
-                EventType.PAYING_OUT,
+        if self._is_listened(EventType.PAYING_OUT):
+            events.append(PayingOutEvent(
                 net_profit=net_profit,
-                pot_winnings=self.current_hand.pot_winnings)
+                pot_winnings=self.current_hand.pot_winnings))
+
+    def advance_button(self):
+        """Moves the button to the next seated player.
+
+        The Manager doesn't move the button between hands itself, so call this
+        while PAYING_OUT for the next hand to start one seat on.
+
+        Raises:
+          WrongStateError if not PAYING_OUT
+        """
+        if self.state != GameState.PAYING_OUT:
+            raise WrongStateError(GameState.PAYING_OUT, self.state)
+        self._advance_button()
 
     def _advance_button(self):
         if self.button_pos is None:
@@ -804,25 +1185,35 @@ class Manager:
             raise ValueError("Can not create hand while one in progress")
         self.current_hand = Hand(
             self.config, self.players, self.button_pos, self._deck_factory)
-        events.append(Event(EventType.HAND_STARTED, players=self.current_hand.players))
+        if self._is_listened(EventType.HAND_STARTED):
+            events.append(HandStartedEvent(players=self.current_hand.players))
         players_who_anted = self.current_hand.ante()
-        if players_who_anted:
-            events.append(Event(EventType.ANTE,
-                                amount=self.config.ante,
-                                player_indices=players_who_anted))
+        if players_who_anted and self._is_listened(EventType.ANTE):
+            events.append(AnteEvent(amount=self.config.ante,
+                                    player_indices=players_who_anted))
         return events
 
     def _maybe_action_on(self, events):
         """If betting action, add ACTION_ON event to events."""
-        if not self.current_hand.is_betting_active():
+        if (not self.current_hand.is_betting_active() or
+            not self._is_listened(EventType.ACTION_ON)):
             return
-        events.append(Event(EventType.ACTION_ON,
-                            hand_player=self.current_hand.players[self.current_hand.action_on],
-                            allowed=self.current_hand.allowed_action()))
+        events.append(ActionOnEvent(
+            hand_player=self.current_hand.players[self.current_hand.action_on],
+            allowed=self.current_hand.allowed_action()))
+
 
+    def _is_listened(self, event_type):
+        """Returns whether any listener would be notified of event_type.
+
+        Events are only constructed when this is true so that a Manager with
+        no listeners (or none subscribed to event_type) doesn't pay for
+        building them.
+        """
+        return bool(self._listeners[event_type])
 
     def _notify(self, event):
-        for listener in self._listeners:
+        for listener in self._listeners[event.event_type]:
             listener.notify(event)
 
 
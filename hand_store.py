@@ -0,0 +1,407 @@
+"""A SQLite database of played hands that can be queried.
+
+HandStore keeps every hand with its players, actions and results, indexed
+so that hands can be looked up by player, date, pot size or the hand
+category shown down. HandStoreWriter is the listener that fills it from a
+game.Manager:
+
+  store = HandStore("hands.db")
+  writer = HandStoreWriter(manager, store)
+  manager.add_listener(writer, event_types=HandStoreWriter.EVENT_TYPES)
+  ...
+  store.flush()
+  store.showdowns("alice", min_rank=cards.HandRank.FLUSH)
+
+Hands are collected in memory and written batch_size at a time, each batch
+in one transaction with executemany, and the database is in WAL mode, so
+readers (e.g. another process running queries) don't block the writer. Call
+flush() before querying hands that may still be pending, and close() when
+done.
+
+A hand has a couple of dozen actions, so a row per action would make up
+most of the rows written. They are instead kept as one blob per hand, in the
+encoding of the actions of a history module record: the number of actions,
+then a byte per action, action_type << 4 | player_idx, followed by the
+amount as a varint if it has one.
+
+Tables:
+  players: player_id, name
+  hands: hand_id, table_id, started_at (seconds since the epoch), num_seats,
+    button_pos, ante, pot (total won), showdown (0/1), board (card indices,
+    one byte each), actions (blob, see above)
+  hand_players: hand_id, seat, player_id, initial_stack, hole_cards (two
+    card index bytes), net_profit, pot_winnings, hand_rank (the HandRank
+    value shown down, NULL if the seat didn't get to showdown), won (0/1)
+"""
+
+import sqlite3
+import time
+
+import cards
+import game
+import history
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+  player_id INTEGER PRIMARY KEY,
+  name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS hands (
+  hand_id INTEGER PRIMARY KEY,
+  table_id TEXT,
+  started_at REAL NOT NULL,
+  num_seats INTEGER NOT NULL,
+  button_pos INTEGER NOT NULL,
+  ante INTEGER NOT NULL,
+  pot INTEGER NOT NULL,
+  showdown INTEGER NOT NULL,
+  board BLOB NOT NULL,
+  actions BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS hand_players (
+  hand_id INTEGER NOT NULL,
+  seat INTEGER NOT NULL,
+  player_id INTEGER NOT NULL,
+  initial_stack INTEGER NOT NULL,
+  hole_cards BLOB,
+  net_profit INTEGER NOT NULL,
+  pot_winnings INTEGER NOT NULL,
+  hand_rank INTEGER,
+  won INTEGER NOT NULL,
+  PRIMARY KEY (hand_id, seat)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS hands_started_at ON hands (started_at);
+CREATE INDEX IF NOT EXISTS hands_pot ON hands (pot);
+CREATE INDEX IF NOT EXISTS hand_players_player
+  ON hand_players (player_id, hand_id);
+CREATE INDEX IF NOT EXISTS hand_players_showdown
+  ON hand_players (player_id, hand_rank) WHERE hand_rank IS NOT NULL;
+"""
+
+_INSERT_HAND = "INSERT INTO hands VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+_INSERT_HAND_PLAYER = ("INSERT INTO hand_players "
+                       "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)")
+
+_HAND_RANKS = {r.value: r for r in cards.HandRank}
+_NO_HAND = cards.HandRank.NO_HAND
+
+
+def _encode_actions(actions):
+    buf = bytearray()
+    history.put_actions(buf, actions)
+    return bytes(buf)
+
+
+class Showdown:
+    """One player's hand at a showdown, as returned by HandStore.showdowns.
+
+    Attributes:
+      hand_id: the hand
+      started_at: when the hand started, seconds since the epoch
+      seat: the player's seat
+      hand_rank: cards.HandRank they showed down
+      hole_cards: list of their two card indices (see deck.Card)
+      board: list of card indices of the community cards
+      won: whether they won at least part of the pot
+      net_profit: chips won minus chips put in
+    """
+    __slots__ = ("hand_id", "started_at", "seat", "hand_rank", "hole_cards",
+                 "board", "won", "net_profit")
+
+    def __init__(self, hand_id, started_at, seat, hand_rank, hole_cards,
+                 board, won, net_profit):
+        self.hand_id = hand_id
+        self.started_at = started_at
+        self.seat = seat
+        self.hand_rank = hand_rank
+        self.hole_cards = hole_cards
+        self.board = board
+        self.won = won
+        self.net_profit = net_profit
+
+    def __str__(self):
+        return "Showdown({})".format(", ".join(
+            "{}={}".format(f, getattr(self, f)) for f in self.__slots__))
+
+
+class HandStore:
+    """A SQLite database of hands (see the module docstring).
+
+    Attributes:
+      hands_written: number of hands written to the database by this store
+    """
+
+    def __init__(self, path, batch_size=1000):
+        """Opens (creating if needed) the database at path.
+
+        Args:
+          path: file name, or ":memory:"
+          batch_size: number of hands to collect before writing them
+        """
+        # Transactions are started and committed explicitly by flush()
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self.batch_size = batch_size
+        self.hands_written = 0
+        self._player_ids = dict(self._conn.execute(
+            "SELECT name, player_id FROM players"))
+        self._next_hand_id = self._conn.execute(
+            "SELECT COALESCE(MAX(hand_id), 0) + 1 FROM hands").fetchone()[0]
+        self._hands = []
+        self._hand_players = []
+        self._new_names = set()
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add_hand(self, record, names, net_profit, ranks=None,
+                 started_at=None, table_id=None):
+        """Queues a hand to be written.
+
+        Args:
+          record: history.HandRecord of the hand
+          names: name of the player in each seat, None for empty seats
+          net_profit: net profit of each seat as in the PAYING_OUT event
+          ranks: if the hand went to showdown, the ranks of every seat as in
+            the SHOWDOWN event
+          started_at: seconds since the epoch, default now
+          table_id: optional id of the table, stored as text
+
+        Returns:
+          the hand_id
+        """
+        hand_id = self._next_hand_id
+        self._next_hand_id += 1
+        if started_at is None:
+            started_at = time.time()
+        pot_winnings = record.pot_winnings
+        winners = record.winners
+        self._hands.append((
+            hand_id, None if table_id is None else str(table_id), started_at,
+            len(record.stacks), record.button_pos, record.ante,
+            sum(w for w in pot_winnings if w), int(record.showdown), bytes(record.board),
+            _encode_actions(record.actions)))
+
+        player_ids = self._player_ids
+        append_player = self._hand_players.append
+        for seat, stack in enumerate(record.stacks):
+            if stack is None:
+                continue
+            name = names[seat]
+            if name not in player_ids:
+                self._new_names.add(name)
+            hand_rank = None
+            if ranks is not None:
+                rank = ranks[seat][0]
+                if rank is not _NO_HAND:
+                    hand_rank = rank._value_
+            hole_cards = record.hole_cards[seat]
+            # The player name is swapped for its id in flush()
+            append_player((
+                hand_id, seat, name, stack,
+                None if hole_cards is None else bytes(hole_cards),
+                net_profit[seat], pot_winnings[seat], hand_rank,
+                int(seat in winners)))
+
+        if len(self._hands) >= self.batch_size:
+            self.flush()
+        return hand_id
+
+    def flush(self):
+        """Writes the queued hands in one transaction."""
+        if not self._hands:
+            return
+        conn = self._conn
+        # Only cached once committed, in case the transaction fails
+        player_ids = dict(self._player_ids)
+        conn.execute("BEGIN")
+        try:
+            if self._new_names:
+                conn.executemany("INSERT OR IGNORE INTO players (name) VALUES (?)",
+                                 [(name,) for name in self._new_names])
+                for name in self._new_names:
+                    player_ids[name] = conn.execute(
+                        "SELECT player_id FROM players WHERE name = ?",
+                        (name,)).fetchone()[0]
+            hand_players = [
+                (hand_id, seat, player_ids[name], stack, hole_cards, net,
+                 won_amount, hand_rank, won)
+                for hand_id, seat, name, stack, hole_cards, net, won_amount,
+                hand_rank, won in self._hand_players]
+            conn.executemany(_INSERT_HAND, self._hands)
+            conn.executemany(_INSERT_HAND_PLAYER, hand_players)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._player_ids = player_ids
+        self.hands_written += len(self._hands)
+        self._new_names.clear()
+        self._hands.clear()
+        self._hand_players.clear()
+
+    def num_hands(self):
+        """Returns the number of hands in the database."""
+        return self._conn.execute("SELECT COUNT(*) FROM hands").fetchone()[0]
+
+    def hand(self, hand_id):
+        """Returns (history.HandRecord, names) for a hand, or None.
+
+        names is the name of the player in each seat, None for empty seats.
+        """
+        row = self._conn.execute(
+            "SELECT num_seats, button_pos, ante, showdown, board, actions "
+            "FROM hands WHERE hand_id = ?", (hand_id,)).fetchone()
+        if row is None:
+            return None
+        num_seats, button_pos, ante, showdown, board, actions = row
+        seats = self._conn.execute(
+            "SELECT seat, name, initial_stack, hole_cards, pot_winnings, won "
+            "FROM hand_players JOIN players USING (player_id) "
+            "WHERE hand_id = ? ORDER BY seat", (hand_id,)).fetchall()
+        names = [None] * num_seats
+        stacks = [None] * num_seats
+        hole_cards = [None] * num_seats
+        pot_winnings = [None] * num_seats
+        winners = []
+        for seat, name, stack, cards_blob, won_amount, won in seats:
+            names[seat] = name
+            stacks[seat] = stack
+            hole_cards[seat] = None if cards_blob is None else list(cards_blob)
+            pot_winnings[seat] = won_amount
+            if won:
+                winners.append(seat)
+        record = history.HandRecord(
+            button_pos, stacks, ante, hole_cards, list(board),
+            history.get_actions(actions, 0)[0],
+            bool(showdown), winners, pot_winnings)
+        return record, names
+
+    def find_hands(self, player=None, since=None, until=None, min_pot=None,
+                   max_pot=None, showdown=None, table_id=None, limit=None):
+        """Returns the ids of the hands matching all the given conditions.
+
+        Args:
+          player: name of a player who was in the hand
+          since, until: range of started_at (inclusive, exclusive)
+          min_pot, max_pot: range of the pot (inclusive)
+          showdown: whether the hand went to showdown
+          table_id: the table the hand was played at
+          limit: maximum number of ids to return
+
+        Returns:
+          list of hand ids, in increasing order
+        """
+        joins = ""
+        order = "hand_id"
+        where = []
+        params = []
+        if player is not None:
+            # Walking the player's index in hand order lets LIMIT stop early
+            joins = " JOIN hand_players USING (hand_id)"
+            order = "hand_players.hand_id"
+            where.append("player_id = ?")
+            params.append(self._player_ids.get(player, -1))
+        for condition, value in [
+                ("started_at >= ?", since),
+                ("started_at < ?", until),
+                ("pot >= ?", min_pot),
+                ("pot <= ?", max_pot),
+                ("showdown = ?", None if showdown is None else int(showdown)),
+                ("table_id = ?", None if table_id is None else str(table_id))]:
+            if value is not None:
+                where.append(condition)
+                params.append(value)
+        sql = "SELECT hand_id FROM hands" + joins
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY " + order
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [hand_id for hand_id, in self._conn.execute(sql, params)]
+
+    def showdowns(self, player, min_rank=_NO_HAND, max_rank=None):
+        """Returns the player's showdowns with a hand category in a range.
+
+        Args:
+          player: name of the player
+          min_rank, max_rank: the range of cards.HandRank (inclusive), e.g.
+            min_rank=HandRank.FLUSH for flushes and better
+
+        Returns:
+          list of Showdown, in hand order
+        """
+        sql = ("SELECT hand_id, started_at, seat, hand_rank, hole_cards, "
+               "board, won, net_profit FROM hand_players "
+               "JOIN hands USING (hand_id) "
+               "WHERE player_id = ? AND hand_rank IS NOT NULL "
+               "AND hand_rank >= ?")
+        params = [self._player_ids.get(player, -1), min_rank.value]
+        if max_rank is not None:
+            sql += " AND hand_rank <= ?"
+            params.append(max_rank.value)
+        sql += " ORDER BY hand_id"
+        return [Showdown(hand_id, started_at, seat, _HAND_RANKS[rank],
+                         list(hole_cards), list(board), bool(won), net_profit)
+                for hand_id, started_at, seat, rank, hole_cards, board, won,
+                net_profit in self._conn.execute(sql, params)]
+
+    def player_totals(self, player):
+        """Returns (number of hands, total net profit) of the player."""
+        return self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(net_profit), 0) FROM hand_players "
+            "WHERE player_id = ?", (self._player_ids.get(player, -1),)).fetchone()
+
+
+class HandStoreWriter(history.HandRecorder):
+    """Listener which adds each finished hand of a Manager to a HandStore.
+
+    The records are put together by history.HandRecorder, and the names,
+    showdown ranks and net profits are taken from the events alongside.
+    """
+
+    def __init__(self, manager, store, table_id=None, clock=time.time):
+        """Initializes HandStoreWriter.
+
+        Args:
+          manager: game.Manager the writer will listen to
+          store: HandStore to add the hands to
+          table_id: id of the table to store with the hands
+          clock: function returning the time in seconds since the epoch,
+            called when each hand starts
+        """
+        super().__init__(manager, self._add_hand)
+        self.store = store
+        self.table_id = table_id
+        self._clock = clock
+        self._names = None
+        self._ranks = None
+        self._net_profit = None
+        self._started_at = None
+
+    def notify(self, event):
+        event_type = event.event_type
+        if event_type == game.EventType.HAND_STARTED:
+            self._names = [None if p is None else p.base_player.name
+                           for p in event.players]
+            self._ranks = None
+            self._started_at = self._clock()
+        elif event_type == game.EventType.SHOWDOWN:
+            self._ranks = event.ranks
+        elif event_type == game.EventType.PAYING_OUT:
+            self._net_profit = event.net_profit
+        super().notify(event)
+
+    def _add_hand(self, record):
+        self.store.add_hand(record, self._names, self._net_profit,
+                            self._ranks, self._started_at, self.table_id)
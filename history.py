@@ -0,0 +1,541 @@
+"""Compact binary hand histories.
+
+A hand history file is a header with the game.Configuration followed by one
+record per hand. Everything is written with buffered appends as the hands
+finish, so memory use doesn't grow with the length of the session (unlike
+game.RecordingListener).
+
+Integers are LEB128 varints (zigzag encoded when they may be negative) and
+cards are packed 6 bits each, so a typical limit hand takes well under 100
+bytes.
+
+File header:
+  magic b"MPHH", version byte
+  max_players, game_type, ante, number of blinds, blinds...,
+  limits flag (0/1) and if 1 the two limits
+
+Hand record:
+  record length (of the rest of the record)
+  flags: bits 0-2 number of board cards, bit 3 set if there was a showdown
+  button_pos
+  seat mask (bit i set if seat i has a player)
+  initial stack of each seated player (zigzag)
+  ante
+  hole cards of each seated player, then the board, 6 bits per card packed
+    into the smallest number of bytes
+  number of actions, then each action as one byte
+    (action_type << 4 | player_idx) followed by the amount if it has one
+  winner mask, then pot winnings of each winner
+"""
+
+import game
+
+MAGIC = b"MPHH"
+VERSION = 1
+
+_SHOWDOWN_FLAG = 0x08
+_ACTIONS_WITH_AMOUNT = frozenset([game.ActionType.BET.value,
+                                  game.ActionType.RAISE.value,
+                                  game.ActionType.BLIND_BET.value])
+_ACTION_TYPES = {a.value: a for a in game.ActionType}
+_CHECK = game.ActionType.CHECK.value
+_BLIND_BET = game.ActionType.BLIND_BET.value
+_CALL = game.ActionType.CALL.value
+_RAISE = game.ActionType.RAISE.value
+_FOLD = game.ActionType.FOLD.value
+
+
+class HandHistoryFormatError(Exception):
+    pass
+
+
+class HandRecord:
+    """Everything needed to replay and check one hand.
+
+    Attributes:
+      button_pos: integer button position
+      stacks: initial stack (before the ante) for each seat, None for empty seats
+      ante: amount of the ante
+      hole_cards: for each seat, list of two card indices (see deck.Card) or
+        None for empty seats
+      board: list of card indices of the community cards
+      actions: list of game.Action, including the blinds
+      showdown: whether the hand went to showdown
+      winners: list of the winning seats
+      pot_winnings: amount won for each seat, None for empty seats
+    """
+    __slots__ = ("button_pos", "stacks", "ante", "hole_cards", "board",
+                 "actions", "showdown", "winners", "pot_winnings")
+
+    def __init__(self, button_pos, stacks, ante=0, hole_cards=None, board=None,
+                 actions=None, showdown=False, winners=None, pot_winnings=None):
+        self.button_pos = button_pos
+        self.stacks = stacks
+        self.ante = ante
+        self.hole_cards = hole_cards if hole_cards is not None else [None] * len(stacks)
+        self.board = board if board is not None else []
+        self.actions = actions if actions is not None else []
+        self.showdown = showdown
+        self.winners = winners if winners is not None else []
+        self.pot_winnings = pot_winnings
+
+    def _key(self):
+        # game.Action doesn't define equality, so compare its contents.
+        actions = [(a.player_idx, a.action_type, getattr(a, "amount", None))
+                   for a in self.actions]
+        return (self.button_pos, self.stacks, self.ante, self.hole_cards,
+                self.board, actions, self.showdown, self.winners,
+                self.pot_winnings)
+
+    def __eq__(self, other):
+        return self._key() == other._key()
+
+    def __str__(self):
+        return "HandRecord({})".format(", ".join(
+            "{}={}".format(f, v) for f, v in zip(self.__slots__, self._key())))
+
+
+def put_varint(buf, value):
+    """Appends a non-negative int to buf (a bytearray) as a LEB128 varint."""
+    if value < 0x80:
+        buf.append(value)
+        return
+    while value >= 0x80:
+        buf.append((value & 0x7f) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def get_varint(data, pos):
+    """Reads a varint at data[pos], returns (value, new pos)."""
+    result = 0
+    shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        result |= (b & 0x7f) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+
+
+def zigzag(value):
+    """Maps an int to a non-negative one: 0, -1, 1, -2, ... to 0, 1, 2, 3, ..."""
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def unzigzag(value):
+    """Undoes zigzag."""
+    return value >> 1 if not value & 1 else -(value >> 1) - 1
+
+
+def encode_config(config):
+    """Returns the file header bytes for a game.Configuration."""
+    if config.max_players > 16:
+        # Player indices are stored in 4 bits
+        raise ValueError("At most 16 players supported, got {}".format(
+            config.max_players))
+    buf = bytearray(MAGIC)
+    buf.append(VERSION)
+    put_varint(buf, config.max_players)
+    put_varint(buf, config.game_type.value)
+    put_varint(buf, config.ante)
+    blinds = config.blinds or []
+    put_varint(buf, len(blinds))
+    for blind in blinds:
+        put_varint(buf, blind)
+    if config.limits is None:
+        buf.append(0)
+    else:
+        buf.append(1)
+        put_varint(buf, config.limits[0])
+        put_varint(buf, config.limits[1])
+    return bytes(buf)
+
+
+def decode_config(data, pos=0):
+    """Reads a file header.
+
+    Returns:
+      (game.Configuration, position after the header)
+    """
+    if bytes(data[pos:pos + len(MAGIC)]) != MAGIC:
+        raise HandHistoryFormatError("Not a hand history file")
+    pos += len(MAGIC)
+    if data[pos] != VERSION:
+        raise HandHistoryFormatError("Unsupported version {}".format(data[pos]))
+    pos += 1
+    max_players, pos = get_varint(data, pos)
+    game_type, pos = get_varint(data, pos)
+    ante, pos = get_varint(data, pos)
+    num_blinds, pos = get_varint(data, pos)
+    blinds = []
+    for _ in range(num_blinds):
+        blind, pos = get_varint(data, pos)
+        blinds.append(blind)
+    has_limits = data[pos]
+    pos += 1
+    limits = None
+    if has_limits:
+        low, pos = get_varint(data, pos)
+        high, pos = get_varint(data, pos)
+        limits = (low, high)
+    config = game.Configuration(max_players=max_players,
+                                game_type=game.GameType(game_type),
+                                ante=ante, blinds=blinds or None, limits=limits)
+    return config, pos
+
+
+def action_code(action):
+    """Returns the one byte code of a game.Action, action_type << 4 | player_idx.
+
+    Raises ValueError if the seat doesn't fit in the four bits.
+    """
+    if action.player_idx > 15:
+        raise ValueError("Seat {} doesn't fit in an action code".format(
+            action.player_idx))
+    return (action.action_type._value_ << 4) | action.player_idx
+
+
+def code_has_amount(code):
+    """Returns whether the action with this code is followed by an amount."""
+    return code >> 4 in _ACTIONS_WITH_AMOUNT
+
+
+def code_to_action(code, amount=None):
+    """Returns the game.Action for an action code and amount."""
+    return game.Action(code & 0x0f, _ACTION_TYPES[code >> 4], amount)
+
+
+def put_action(buf, action):
+    """Appends the action code and, if the action has one, the amount."""
+    code = action_code(action)
+    buf.append(code)
+    if code >> 4 in _ACTIONS_WITH_AMOUNT:
+        put_varint(buf, action.amount)
+
+
+def get_action(data, pos):
+    """Reads an action written by put_action, returns (action, new pos)."""
+    code = data[pos]
+    pos += 1
+    amount = None
+    if code >> 4 in _ACTIONS_WITH_AMOUNT:
+        amount, pos = get_varint(data, pos)
+    return game.Action(code & 0x0f, _ACTION_TYPES[code >> 4], amount), pos
+
+
+def put_actions(buf, actions):
+    """Appends the number of actions and the actions to buf."""
+    put_varint(buf, len(actions))
+    for action in actions:
+        # Enum.value and hashing an Enum are both slow enough to matter here,
+        # _value_ is the plain attribute behind value.
+        action_type = action.action_type._value_
+        player_idx = action.player_idx
+        if player_idx > 15:
+            raise ValueError("Seat {} doesn't fit in an action code".format(
+                player_idx))
+        buf.append((action_type << 4) | player_idx)
+        if action_type in _ACTIONS_WITH_AMOUNT:
+            put_varint(buf, action.amount)
+
+
+def get_actions(data, pos):
+    """Reads actions written by put_actions, returns (actions, new pos)."""
+    num_actions, pos = get_varint(data, pos)
+    actions = []
+    for _ in range(num_actions):
+        b = data[pos]
+        pos += 1
+        action_type = b >> 4
+        amount = None
+        if action_type in _ACTIONS_WITH_AMOUNT:
+            amount, pos = get_varint(data, pos)
+        actions.append(game.Action(b & 0x0f, _ACTION_TYPES[action_type], amount))
+    return actions, pos
+
+
+def encode_hand(record):
+    """Returns the bytes (a bytearray) for one HandRecord, including its length prefix."""
+    body = bytearray()
+    body.append(len(record.board) | (_SHOWDOWN_FLAG if record.showdown else 0))
+    body.append(record.button_pos)
+
+    seat_mask = 0
+    packed_cards = 0
+    num_cards = 0
+    for idx, stack in enumerate(record.stacks):
+        if stack is not None:
+            seat_mask |= 1 << idx
+    put_varint(body, seat_mask)
+    for stack in record.stacks:
+        if stack is not None:
+            put_varint(body, zigzag(stack))
+    put_varint(body, record.ante)
+
+    for idx, stack in enumerate(record.stacks):
+        if stack is None:
+            continue
+        first, second = record.hole_cards[idx]
+        packed_cards = (packed_cards << 12) | (first << 6) | second
+        num_cards += 2
+    for card_idx in record.board:
+        packed_cards = (packed_cards << 6) | card_idx
+        num_cards += 1
+    body += packed_cards.to_bytes((num_cards * 6 + 7) // 8, "big")
+
+    put_actions(body, record.actions)
+
+    winner_mask = 0
+    for idx in record.winners:
+        winner_mask |= 1 << idx
+    put_varint(body, winner_mask)
+    for idx in sorted(record.winners):
+        put_varint(body, record.pot_winnings[idx])
+
+    header = bytearray()
+    put_varint(header, len(body))
+    return header + body
+
+
+def decode_hand(data, max_players, pos=0):
+    """Reads one hand record (as written by encode_hand).
+
+    Args:
+      data: bytes like object
+      max_players: the Configuration.max_players of the hand
+      pos: position in data of the record
+
+    Returns:
+      (HandRecord, position after the record)
+    """
+    length, pos = get_varint(data, pos)
+    end = pos + length
+    flags = data[pos]
+    button_pos = data[pos + 1]
+    pos += 2
+    seat_mask, pos = get_varint(data, pos)
+    num_seats = max_players
+    seats = [idx for idx in range(num_seats) if seat_mask >> idx & 1]
+
+    stacks = [None] * num_seats
+    for idx in seats:
+        stack, pos = get_varint(data, pos)
+        stacks[idx] = unzigzag(stack)
+    ante, pos = get_varint(data, pos)
+
+    num_board = flags & 0x07
+    num_cards = 2 * len(seats) + num_board
+    num_bytes = (num_cards * 6 + 7) // 8
+    packed_cards = int.from_bytes(data[pos:pos + num_bytes], "big")
+    pos += num_bytes
+    card_idxs = [(packed_cards >> (6 * shift)) & 0x3f
+                 for shift in range(num_cards - 1, -1, -1)]
+    hole_cards = [None] * num_seats
+    for n, idx in enumerate(seats):
+        hole_cards[idx] = card_idxs[2 * n:2 * n + 2]
+    board = card_idxs[2 * len(seats):]
+
+    actions, pos = get_actions(data, pos)
+
+    winner_mask, pos = get_varint(data, pos)
+    pot_winnings = [None if s is None else 0 for s in stacks]
+    winners = []
+    idx = 0
+    while winner_mask >> idx:
+        if winner_mask >> idx & 1:
+            amount, pos = get_varint(data, pos)
+            winners.append(idx)
+            pot_winnings[idx] = amount
+        idx += 1
+
+    if pos != end:
+        raise HandHistoryFormatError("Bad record length")
+    return HandRecord(button_pos, stacks, ante, hole_cards, board, actions,
+                      bool(flags & _SHOWDOWN_FLAG), winners, pot_winnings), pos
+
+
+def net_profit(record):
+    """Returns the net profit of each seat in a HandRecord.
+
+    The records don't have the chips each player put in, so the betting
+    rounds are followed the same way game.Hand does: a round is over once
+    one player is left, or the next player to act has already acted and
+    every live player has put in the same amount.
+
+    Returns:
+      list with the pot winnings minus the ante and bets of each seat, None
+      for empty seats
+    """
+    stacks = record.stacks
+    num_seats = len(stacks)
+    live_mask = 0
+    for idx, stack in enumerate(stacks):
+        if stack is not None:
+            live_mask |= 1 << idx
+    num_live = bin(live_mask).count("1")
+    put_in = [0 if stack is None else record.ante for stack in stacks]
+    outlay = [0] * num_seats
+    # As in game.Hand, _num_matched is the number of live players whose
+    # outlay is max_outlay
+    max_outlay = 0
+    num_matched = num_live
+    acted_mask = 0
+    for action in record.actions:
+        idx = action.player_idx
+        action_type = action.action_type._value_
+        if action_type == _FOLD:
+            live_mask &= ~(1 << idx)
+            num_live -= 1
+            if outlay[idx] == max_outlay:
+                num_matched -= 1
+        elif action_type != _CHECK:
+            old_outlay = outlay[idx]
+            if action_type == _CALL:
+                new_outlay = max_outlay
+            elif action_type == _RAISE:
+                new_outlay = max_outlay + action.amount
+            else:
+                new_outlay = old_outlay + action.amount
+            outlay[idx] = new_outlay
+            if old_outlay == max_outlay:
+                num_matched -= 1
+            if new_outlay > max_outlay:
+                max_outlay = new_outlay
+                num_matched = 1
+            elif new_outlay == max_outlay:
+                num_matched += 1
+        if action_type != _BLIND_BET:
+            acted_mask |= 1 << idx
+        if num_live == 1 or (num_matched == num_live and
+                             acted_mask >> game._next_set_bit(idx, live_mask) & 1):
+            for i in range(num_seats):
+                put_in[i] += outlay[i]
+            outlay = [0] * num_seats
+            max_outlay = 0
+            num_matched = num_live
+            acted_mask = 0
+    return [None if stack is None else record.pot_winnings[idx] - put_in[idx]
+            for idx, stack in enumerate(stacks)]
+
+
+def read_hand_histories(f):
+    """Reads a whole hand history file.
+
+    Args:
+      f: binary file object or bytes
+
+    Returns:
+      (game.Configuration, generator of HandRecord)
+    """
+    data = f if isinstance(f, (bytes, bytearray, memoryview)) else f.read()
+    config, pos = decode_config(data)
+
+    def records(pos):
+        while pos < len(data):
+            record, pos = decode_hand(data, config.max_players, pos)
+            yield record
+
+    return config, records(pos)
+
+
+class HandRecorder:
+    """Listener which puts together a HandRecord for each hand of a Manager.
+
+    It needs the Manager to find the button and the winners, which aren't in
+    the events. Once a hand is paid out, its record is passed to the
+    on_record function.
+    """
+
+    EVENT_TYPES = [
+        game.EventType.HAND_STARTED,
+        game.EventType.ANTE,
+        game.EventType.HOLE_CARDS_DEALT,
+        game.EventType.FLOP_DEALT,
+        game.EventType.TURN_DEALT,
+        game.EventType.RIVER_DEALT,
+        game.EventType.ACTION,
+        game.EventType.SHOWDOWN,
+        game.EventType.PAYING_OUT,
+    ]
+
+    def __init__(self, manager, on_record):
+        """Initializes HandRecorder.
+
+        Args:
+          manager: game.Manager the recorder will listen to
+          on_record: function called with the HandRecord of each finished hand
+        """
+        self.manager = manager
+        self._on_record = on_record
+        self._record = None
+
+    def notify(self, event):
+        event_type = event.event_type
+        if event_type == game.EventType.ACTION:
+            self._record.actions.append(event.action)
+        elif event_type == game.EventType.HAND_STARTED:
+            self._record = HandRecord(
+                self.manager.current_hand.button_pos,
+                [None if p is None else p.initial_stack for p in event.players])
+        elif event_type == game.EventType.ANTE:
+            self._record.ante = event.amount
+        elif event_type == game.EventType.HOLE_CARDS_DEALT:
+            self._record.hole_cards = [
+                None if c is None else [card.card_idx for card in c.cards]
+                for c in event.cards]
+        elif event_type == game.EventType.FLOP_DEALT:
+            self._record.board = [card.card_idx for card in event.cards.cards]
+        elif (event_type == game.EventType.TURN_DEALT or
+              event_type == game.EventType.RIVER_DEALT):
+            self._record.board.append(event.card.card_idx)
+        elif event_type == game.EventType.SHOWDOWN:
+            self._record.showdown = True
+        elif event_type == game.EventType.PAYING_OUT:
+            self._record.winners = list(self.manager.current_hand.winners)
+            self._record.pot_winnings = list(event.pot_winnings)
+            self._on_record(self._record)
+            self._record = None
+
+
+class HandHistoryWriter(HandRecorder):
+    """Listener which streams each finished hand to a file as a HandRecord.
+
+    Use it as:
+
+      writer = HandHistoryWriter(manager, open(path, "ab"))
+      manager.add_listener(writer, event_types=HandHistoryWriter.EVENT_TYPES)
+
+    Records are only written once the hand is paid out. Call flush() (or
+    close the file) to make sure everything is on disk.
+    """
+
+    def __init__(self, manager, f, buffer_size=1 << 16):
+        """Initializes HandHistoryWriter.
+
+        Args:
+          manager: game.Manager the writer will listen to
+          f: binary file object to append to. If it is empty, the header is
+            written first.
+          buffer_size: bytes to collect before writing to f
+        """
+        super().__init__(manager, self.write)
+        self.hands_written = 0
+        self._file = f
+        self._buffer = bytearray()
+        self._buffer_size = buffer_size
+        if f.tell() == 0:
+            self._buffer += encode_config(manager.config)
+
+    def write(self, record):
+        """Appends a HandRecord."""
+        self._buffer += encode_hand(record)
+        self.hands_written += 1
+        if len(self._buffer) >= self._buffer_size:
+            self.flush()
+
+    def flush(self):
+        self._file.write(self._buffer)
+        self._buffer.clear()
+        self._file.flush()
@@ -0,0 +1,162 @@
+"""Simulated clients for load testing server.GameServer.
+
+run_load_test starts a GameServer in this process and connects
+num_tables * players_per_table SimulatedClients to it, each joining one
+table and playing with a simple random policy, then reports throughput:
+
+  python loadgen.py 200 6 10
+
+runs 200 six seat tables (1200 connections) for 10 seconds.
+"""
+
+import asyncio
+import json
+import random
+import sys
+import time
+
+import deck
+import game
+import server
+
+
+class SimulatedClient:
+    """A client which joins one table and acts whenever it is its turn.
+
+    Attributes:
+      seat: the seat it got, once joined
+      events: number of event messages received
+      actions: number of actions sent
+      errors: list of the error messages received
+    """
+
+    def __init__(self, table_id, name, stack=10**9, seed=None):
+        self.table_id = table_id
+        self.name = name
+        self.stack = stack
+        self.seat = None
+        self.events = 0
+        self.actions = 0
+        self.errors = []
+        self.joined = asyncio.get_running_loop().create_future()
+        self._rng = random.Random(seed)
+        self._writer = None
+
+    async def run(self, host, port, stop):
+        """Plays until the stop asyncio.Event is set or the server goes away."""
+        reader, self._writer = await asyncio.open_connection(host, port)
+        self._send({"type": "join", "table": self.table_id, "name": self.name,
+                    "stack": self.stack})
+        stop_task = asyncio.ensure_future(stop.wait())
+        try:
+            while True:
+                read = asyncio.ensure_future(reader.readline())
+                await asyncio.wait([read, stop_task],
+                                   return_when=asyncio.FIRST_COMPLETED)
+                if not read.done():
+                    read.cancel()
+                    break
+                line = read.result()
+                if not line:
+                    break
+                self._handle(json.loads(line))
+        finally:
+            stop_task.cancel()
+            self._writer.close()
+            if not self.joined.done():
+                self.joined.cancel()
+
+    def _send(self, message):
+        self._writer.write(server.encode_message(message))
+
+    def _handle(self, message):
+        kind = message["type"]
+        if kind == "event":
+            self.events += 1
+            if message["event"] == "ACTION_ON" and message["seat"] == self.seat:
+                self._act(message["allowed"])
+        elif kind == "joined":
+            self.seat = message["seat"]
+            self.joined.set_result(self.seat)
+        elif kind == "error":
+            self.errors.append(message["message"])
+
+    def _act(self, allowed):
+        r = self._rng.random()
+        message = {"type": "act", "table": self.table_id}
+        if r < 0.15 and ("RAISE" in allowed or "BET" in allowed):
+            action_type = "RAISE" if "RAISE" in allowed else "BET"
+            message["amount"] = allowed[action_type][0]
+        elif r < 0.3 and "CHECK" not in allowed:
+            action_type = "FOLD"
+        elif "CHECK" in allowed:
+            action_type = "CHECK"
+        else:
+            action_type = "CALL"
+        message["action"] = action_type
+        self._send(message)
+        self.actions += 1
+
+
+async def run_load_test(num_tables, players_per_table=6, duration=5.0,
+                        seed=None, config=None):
+    """Runs simulated clients against a local GameServer.
+
+    Returns:
+      dict with "connections", "hands", "hands_per_sec", "events" (received
+      by all clients), "events_per_sec", "actions", "errors" and
+      "slow_disconnects"
+    """
+    if config is None:
+        config = game.Configuration(
+            max_players=players_per_table, game_type=game.GameType.LIMIT,
+            limits=(10, 20), blinds=(5, 10))
+    rng = random.Random(seed)
+    game_server = server.GameServer()
+    for table_id in range(num_tables):
+        game_server.add_table(
+            table_id, config,
+            deck.shuffled_deck_factory(random.Random(rng.getrandbits(64))),
+            start_players=players_per_table)
+    await game_server.start()
+    stop = asyncio.Event()
+    clients = [SimulatedClient(table_id, "c{}_{}".format(table_id, idx),
+                               seed=rng.getrandbits(64))
+               for table_id in range(num_tables)
+               for idx in range(players_per_table)]
+    tasks = [asyncio.ensure_future(c.run("127.0.0.1", game_server.port, stop))
+             for c in clients]
+    await asyncio.gather(*(c.joined for c in clients))
+    hands_before = sum(t.hands_completed for t in game_server.host.tables.values())
+    events_before = sum(c.events for c in clients)
+    start = time.monotonic()
+    await asyncio.sleep(duration)
+    elapsed = time.monotonic() - start
+    hands = sum(t.hands_completed for t in game_server.host.tables.values()) - hands_before
+    events = sum(c.events for c in clients) - events_before
+    stop.set()
+    await asyncio.gather(*tasks)
+    await game_server.close()
+    return {
+        "connections": len(clients),
+        "hands": hands,
+        "hands_per_sec": hands / elapsed,
+        "events": events,
+        "events_per_sec": events / elapsed,
+        "actions": sum(c.actions for c in clients),
+        "errors": sum(len(c.errors) for c in clients),
+        "slow_disconnects": game_server.slow_disconnects,
+    }
+
+
+def main(argv):
+    num_tables = int(argv[0]) if argv else 100
+    players = int(argv[1]) if len(argv) > 1 else 6
+    duration = float(argv[2]) if len(argv) > 2 else 5.0
+    result = asyncio.run(run_load_test(num_tables, players, duration))
+    for key, value in result.items():
+        print("{:<18} {}".format(key, round(value, 1)))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,6 +1,9 @@
 #MAIN
+import contextlib
+import os
 import sys
 import random
+import time
 import deck
 import cards
 from PyQt5 import QtGui, QtCore
@@ -11,10 +14,11 @@ from PyQt5.QtCore import *
 from itertools import combinations
 
 
-#These are the widgets which will end up displaying all our cards.
-#We delete all these everytime a new hand is dealt
-global_c_count = 0
-card_widgets = []
+#These are the widgets which will end up displaying all our cards. They are
+#made once by create_card_widgets and reused for every hand.
+hole_card_widgets = []
+board_card_widgets = []
+star_widget = None
 
 plyr1 = [564,700]
 plyr2 = [300,600]
@@ -26,6 +30,8 @@ plyr7 = [975,355]
 plyr8 = [684,50]
 plyr9 = [444,50]
 all_plyr_coords = [plyr1,plyr2,plyr3,plyr4,plyr5,plyr6,plyr7,plyr8,plyr9]
+board_x = [414,489,564,639,714]
+board_y = 300
 
 plyr_cards = []
 comm_cards = []
@@ -34,6 +40,50 @@ plyr_ranks = []
 deck = deck.Deck()
 deck.shuffle()
 
+#Card images are cut out of the sprite sheet Images/Cards.png (see
+#scripts/cardmaker.py) once and kept, so dealing doesn't read from disk.
+#The sheet has a row per suit (clubs, spades, hearts, diamonds), each going
+#A,2,...,K. Cards are 72x96 with 1 pix between columns, 2 pix between rows
+#and 1 pix around the edge.
+CARD_WIDTH = 72
+CARD_HEIGHT = 96
+CARD_SHEET = "Images/Cards.png"
+#Row of the sheet for each deck.Suit value (clubs, diamonds, hearts, spades)
+sheet_rows = [0, 3, 2, 1]
+card_pixmaps = [None] * 52
+image_pixmaps = {}
+
+
+def image_pixmap(path):
+  #Loads an image the first time it's asked for
+  pixmap = image_pixmaps.get(path)
+  if pixmap is None:
+    pixmap = QPixmap(path)
+    image_pixmaps[path] = pixmap
+  return pixmap
+
+
+def card_pixmap(card):
+  #Returns the QPixmap for a deck.Card, cutting it out of the sheet if it
+  #isn't cached yet
+  pixmap = card_pixmaps[card.card_idx]
+  if pixmap is None:
+    rank_idx = card.card_idx % 13
+    #Aces are first in the sheet but last in deck.Card
+    column = 0 if rank_idx == 12 else rank_idx + 1
+    row = sheet_rows[card.card_idx // 13]
+    left = (column * (CARD_WIDTH + 1)) + 1
+    upper = 1 + row * (CARD_HEIGHT + 2)
+    pixmap = image_pixmap(CARD_SHEET).copy(left, upper, CARD_WIDTH, CARD_HEIGHT)
+    card_pixmaps[card.card_idx] = pixmap
+  return pixmap
+
+
+def load_card_pixmaps():
+  #Cuts out all 52 cards up front (needs the QApplication to exist)
+  for card in deck.our_deck:
+    card_pixmap(card)
+
 
 def best_player():
   return plyr_ranks.index(max(plyr_ranks))
@@ -43,26 +93,42 @@ def deal():
 	#print("Made it here!")
 	print(deck.deal_one())
 
+def create_card_widgets(MainWindow):
+  #Makes every label a hand can show up front: two cards per seat, the five
+  #board cards and the winner's star. Dealing only swaps their pixmaps and
+  #shows them, and reset_cards hides them again.
+  global star_widget
+  for coords in all_plyr_coords:
+    seat_widgets = []
+    for x_offset in [0, 36]:
+      label = QLabel(MainWindow)
+      label.setGeometry(coords[0]+x_offset,coords[1],CARD_WIDTH,CARD_HEIGHT)
+      label.hide()
+      seat_widgets.append(label)
+    hole_card_widgets.append(seat_widgets)
+  for x in board_x:
+    label = QLabel(MainWindow)
+    label.setGeometry(x,board_y,CARD_WIDTH,CARD_HEIGHT)
+    label.hide()
+    board_card_widgets.append(label)
+  star_widget = QLabel(MainWindow)
+  star_widget.setPixmap(image_pixmap("Images/Gold-Star.png"))
+  star_widget.hide()
+
+
+def show_card(label, card):
+  label.setPixmap(card_pixmap(card))
+  label.show()
+
+
 def deal_all_hole_cards(MainWindow):
-  global global_c_count
   for x in range(9):
     card_one = deck.deal_one()
     card_two = deck.deal_one()
     print(card_one)
     print(card_two)
-    card_widgets.append(QLabel(MainWindow))
-    card1im = QPixmap("Images/Cards/"+str(card_one)+".png")
-    card_widgets[global_c_count].setPixmap(card1im)
-    card_widgets[global_c_count].setGeometry(all_plyr_coords[x][0],all_plyr_coords[x][1],72,96)
-    card_widgets[global_c_count].show()
-    global_c_count += 1;
-    
-    card_widgets.append(QLabel(MainWindow))
-    card2im = QPixmap("Images/Cards/"+str(card_two)+".png")
-    card_widgets[global_c_count].setPixmap(card2im)
-    card_widgets[global_c_count].setGeometry(all_plyr_coords[x][0]+36,all_plyr_coords[x][1],72,96)
-    card_widgets[global_c_count].show()
-    global_c_count += 1
+    show_card(hole_card_widgets[x][0], card_one)
+    show_card(hole_card_widgets[x][1], card_two)
     plyr_cards.append([card_one,card_two])
   #print(plyr_cards)
 
@@ -74,24 +140,11 @@ def deal_hole_cards(MainWindow, plyr_coords):
   print(card_one)
   print(card_two)
 
-  labelc1 = QLabel(MainWindow)
-  labelc2 = QLabel(MainWindow)
-  card1im = QPixmap("Images/Cards/"+str(card_one)+".png")
-  card2im = QPixmap("Images/Cards/"+str(card_two)+".png")
-
-  labelc1.setPixmap(card1im)
-  #labelc1.move(600,700)
-  labelc1.setGeometry(plyr_coords[0],plyr_coords[1],72,96)
-  labelc1.show()
-
-  labelc2.setPixmap(card2im)
-  #labelc2.move(600,700)
-  labelc2.setGeometry(plyr_coords[0]+36,plyr_coords[1],72,96)
-  labelc2.show()
+  seat_widgets = hole_card_widgets[all_plyr_coords.index(plyr_coords)]
+  show_card(seat_widgets[0], card_one)
+  show_card(seat_widgets[1], card_two)
 
 def deal_flop_cards(MainWindow):
-  global global_c_count
-
   card_one = deck.deal_one()
   card_two = deck.deal_one()
   card_three = deck.deal_one()
@@ -102,51 +155,23 @@ def deal_flop_cards(MainWindow):
   comm_cards.append(card_two)
   comm_cards.append(card_three)
 
-  card_widgets.append(QLabel(MainWindow))
-  card_widgets.append(QLabel(MainWindow))
-  card_widgets.append(QLabel(MainWindow))
-  card1im = QPixmap("Images/Cards/"+str(card_one)+".png")
-  card2im = QPixmap("Images/Cards/"+str(card_two)+".png")
-  card3im = QPixmap("Images/Cards/"+str(card_three)+".png")
-  
-  card_widgets[global_c_count].setPixmap(card1im)
-  card_widgets[global_c_count].setGeometry(414,300,72,96)
-  card_widgets[global_c_count].show()
-
-  card_widgets[global_c_count+1].setPixmap(card2im)
-  card_widgets[global_c_count+1].setGeometry(489,300,72,96)
-  card_widgets[global_c_count+1].show()
-
-  card_widgets[global_c_count+2].setPixmap(card3im)
-  card_widgets[global_c_count+2].setGeometry(564,300,72,96)
-  card_widgets[global_c_count+2].show()
-  global_c_count += 3
+  show_card(board_card_widgets[0], card_one)
+  show_card(board_card_widgets[1], card_two)
+  show_card(board_card_widgets[2], card_three)
 
 def deal_turn_card(MainWindow):
-  global global_c_count
   card_one = deck.deal_one()
   print(card_one)
   comm_cards.append(card_one)
 
-  card_widgets.append(QLabel(MainWindow))
-  card1im = QPixmap("Images/Cards/"+str(card_one)+".png")
-  card_widgets[global_c_count].setPixmap(card1im)
-  card_widgets[global_c_count].setGeometry(639,300,72,96)
-  card_widgets[global_c_count].show()
-  global_c_count += 1
+  show_card(board_card_widgets[3], card_one)
 
 def deal_river_card(MainWindow):
-  global global_c_count
   card_one = deck.deal_one()
   print(card_one)
   comm_cards.append(card_one)
 
-  card_widgets.append(QLabel(MainWindow))
-  card1im = QPixmap("Images/Cards/"+str(card_one)+".png")
-  card_widgets[global_c_count].setPixmap(card1im)
-  card_widgets[global_c_count].setGeometry(714,300,72,96)
-  card_widgets[global_c_count].show()
-  global_c_count += 1
+  show_card(board_card_widgets[4], card_one)
 
   comm_hand = cards.PlayerCards(comm_cards)
   for x in plyr_cards:
@@ -156,30 +181,38 @@ def deal_river_card(MainWindow):
 
   best_plyr = best_player()
 
-  card_widgets.append(QLabel(MainWindow))
-  starim = QPixmap("Images/Gold-Star.png")
-  card_widgets[global_c_count].setPixmap(starim)
-  card_widgets[global_c_count].setGeometry(all_plyr_coords[best_plyr][0],all_plyr_coords[best_plyr][1]-105,100,100)
+  star_widget.setGeometry(all_plyr_coords[best_plyr][0],all_plyr_coords[best_plyr][1]-105,100,100)
   print("Player: " + str(best_plyr + 1))
-  card_widgets[global_c_count].show()
-  global_c_count += 1
+  star_widget.show()
 
 def reset_cards(MainWindow):
-  #reshuffle deck obviously and remove card images
-  global global_c_count
-  global_c_count = 0
+  #reshuffle deck obviously and hide the card images
   deck.shuffle()
-  for x in card_widgets:
-    x.hide()
-    x.destroy()
-  print("here1")
-  print(card_widgets)
-  print("here2")
-  card_widgets.clear()
+  for seat_widgets in hole_card_widgets:
+    for label in seat_widgets:
+      label.hide()
+  for label in board_card_widgets:
+    label.hide()
+  star_widget.hide()
   comm_cards.clear()
   plyr_ranks.clear()
   plyr_cards.clear()
-  print(card_widgets)
+
+def time_hands(MainWindow, num_hands=1000):
+  #Deals, draws and resets num_hands full hands and prints how long it took
+  start = time.perf_counter()
+  with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+    for x in range(num_hands):
+      deal_all_hole_cards(MainWindow)
+      deal_flop_cards(MainWindow)
+      deal_turn_card(MainWindow)
+      deal_river_card(MainWindow)
+      MainWindow.repaint()
+      reset_cards(MainWindow)
+      MainWindow.repaint()
+  elapsed = time.perf_counter() - start
+  print("{} hands in {:.3f} s, {:.3f} ms per hand".format(
+    num_hands, elapsed, elapsed / num_hands * 1000))
 
   
 
@@ -194,6 +227,7 @@ class MainWindow(QMainWindow):
     palette = QPalette()
     palette.setBrush(10,QBrush(sImage))
     self.setPalette(palette)
+    load_card_pixmaps()
 
     deal_button = QPushButton('Deal', self)
     deal_button.clicked.connect(deal)
@@ -230,6 +264,9 @@ class MainWindow(QMainWindow):
     reset.resize(120,75)
     reset.move(4,350)
     #deal_button.show()
+    #After the buttons so the cards are drawn over them, as they were when
+    #each card got a new label
+    create_card_widgets(self)
     self.show()
 
 if __name__ == "__main__":
@@ -249,4 +286,7 @@ if __name__ == "__main__":
   #while(1):
   #  print(random.randint(0,51))
   oMainWindow = MainWindow()
+  #python main.py time [num_hands] measures how long hands take to draw
+  if len(sys.argv) > 1 and sys.argv[1] == "time":
+    time_hands(oMainWindow, int(sys.argv[2]) if len(sys.argv) > 2 else 1000)
   app.exec_()
@@ -0,0 +1,275 @@
+"""Monte Carlo tree search bot for GameType.LIMIT.
+
+MCTSBot decides an action for the player to act in a game.Hand. It runs
+information set MCTS: every iteration deals the cards the bot can't see (the
+opponents' hole cards and the rest of the board) at random, then walks a tree
+of betting actions shared by all iterations, choosing actions with UCB1 for
+whoever is to act, and finishes the hand with a simple random rollout. The
+hand is played on a Hand.fork() with the engine's own allowed_action, act and
+showdown, so this is also a realistic workload for those.
+
+Searches run in parallel in a process pool, each with its own tree (root
+parallelization), and their statistics for the bot's actions are summed.
+"""
+
+import math
+import multiprocessing
+import random
+import time
+
+import cards
+import deck
+import game
+
+_CARDS = [deck.Card(idx) for idx in range(52)]
+# Order in which actions are tried, which only matters for reproducibility.
+_ACTION_ORDER = [game.ActionType.CHECK, game.ActionType.CALL,
+                 game.ActionType.BET, game.ActionType.RAISE,
+                 game.ActionType.FOLD]
+
+
+class _Node:
+    """Statistics for one sequence of actions.
+
+    value is the sum of the rewards of the player who made the last action of
+    the sequence.
+    """
+    __slots__ = ("children", "visits", "value")
+
+    def __init__(self):
+        self.children = {}
+        self.visits = 0
+        self.value = 0
+
+
+def _allowed_types(allowed):
+    return [t for t in _ACTION_ORDER if allowed.is_action_type_allowed(t)]
+
+
+def _make_action(allowed, action_type):
+    amount = None
+    if action_type == game.ActionType.BET or action_type == game.ActionType.RAISE:
+        amount = allowed.range_for_action(action_type)[0]
+    return game.Action(allowed.player_idx, action_type, amount)
+
+
+def _rollout_type(types, rng):
+    """Chooses an action for the rollout policy: mostly passive, never folding
+    when checking is free."""
+    r = rng.random()
+    if game.ActionType.CHECK in types:
+        if r < 0.7:
+            return game.ActionType.CHECK
+        return game.ActionType.BET if game.ActionType.BET in types else game.ActionType.RAISE
+    if r < 0.6:
+        return game.ActionType.CALL
+    if r < 0.8:
+        return game.ActionType.RAISE
+    return game.ActionType.FOLD
+
+
+def _deal_next(hand):
+    """Deals the next street or finishes the hand.
+
+    Returns:
+      whether the hand is over
+    """
+    if hand.num_live_players() == 1:
+        hand.early_win()
+        return True
+    num_board = len(hand.board)
+    if num_board == 0:
+        hand.deal_flop()
+    elif num_board == 3:
+        hand.deal_turn()
+    elif num_board == 4:
+        hand.deal_river()
+    else:
+        hand.showdown()
+        return True
+    return False
+
+
+def _determinize(hand, player_idx, unknown, rng):
+    """Returns a fork of hand with the cards player_idx can't see dealt at random.
+
+    Args:
+      unknown: list of deck.Card not visible to player_idx
+    """
+    forked = hand.fork()
+    rng.shuffle(unknown)
+    next_card = 0
+    for idx, p in enumerate(forked.players):
+        if idx == player_idx or p is None or p.hole_cards is None:
+            continue
+        forked._set_hole_cards(idx, cards.PlayerCards(
+            unknown[next_card:next_card + 2]))
+        next_card += 2
+    forked.deck = deck.Deck.__new__(deck.Deck)
+    forked.deck.our_deck = unknown[next_card:]
+    forked.deck.next_card_idx = 0
+    return forked
+
+
+def search(hand, time_budget=None, max_iterations=None, exploration=3.0,
+           seed=None):
+    """Runs MCTS for the player to act in hand.
+
+    Stops when either time_budget (seconds) or max_iterations is used up; at
+    least one of them must be given.
+
+    Args:
+      hand: game.Hand with betting active. It isn't changed.
+      exploration: UCB1 exploration constant, in units of the big bet
+      seed: seed for the random dealing and rollouts
+
+    Returns:
+      (number of iterations, dict of ActionType value to (visits, total
+      reward in chips)) for the actions of the player to act
+    """
+    if time_budget is None and max_iterations is None:
+        raise ValueError("One of time_budget and max_iterations is needed")
+    rng = random.Random(seed)
+    player_idx = hand.action_on
+    visible = set(c.card_idx for c in hand.players[player_idx].hole_cards.cards)
+    visible.update(c.card_idx for c in hand.board.cards)
+    unknown = [_CARDS[idx] for idx in range(52) if idx not in visible]
+    root_stacks = [None if p is None else p.stack for p in hand.players]
+    scale = exploration * hand.config.limits[1]
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+
+    root = _Node()
+    iterations = 0
+    while True:
+        if max_iterations is not None and iterations >= max_iterations:
+            break
+        # Checking the clock is cheap compared to an iteration
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        iterations += 1
+        sim = _determinize(hand, player_idx, unknown, rng)
+
+        # Selection and expansion: follow the tree until a new node is added
+        node = root
+        path = []
+        in_tree = True
+        done = False
+        while not done:
+            while sim.is_betting_active():
+                allowed = sim.allowed_action()
+                types = _allowed_types(allowed)
+                actor = allowed.player_idx
+                if in_tree:
+                    untried = [t for t in types if t._value_ not in node.children]
+                    if untried:
+                        action_type = rng.choice(untried)
+                        child = _Node()
+                        node.children[action_type._value_] = child
+                        in_tree = False
+                    else:
+                        log_visits = math.log(node.visits)
+                        best = None
+                        for t in types:
+                            c = node.children[t._value_]
+                            score = (c.value / c.visits +
+                                     scale * math.sqrt(log_visits / c.visits))
+                            if best is None or score > best:
+                                best = score
+                                action_type = t
+                        child = node.children[action_type._value_]
+                    path.append((child, actor))
+                    node = child
+                else:
+                    action_type = _rollout_type(types, rng)
+                sim.act(_make_action(allowed, action_type))
+            done = _deal_next(sim)
+
+        # Backpropagation
+        root.visits += 1
+        for node, actor in path:
+            node.visits += 1
+            node.value += sim.players[actor].stack - root_stacks[actor]
+
+    return iterations, {t: (c.visits, c.value) for t, c in root.children.items()}
+
+
+def _search_star(args):
+    return search(*args)
+
+
+class MCTSBot:
+    """Chooses actions for limit hands with parallel MCTS.
+
+    Use as:
+      with MCTSBot(time_budget=0.5) as bot:
+        action = bot.choose_action(manager.current_hand)
+    """
+
+    def __init__(self, time_budget=1.0, processes=None, exploration=3.0,
+                 seed=None):
+        """Initializes MCTSBot.
+
+        Args:
+          time_budget: seconds to search for each decision
+          processes: number of worker processes, default os.cpu_count(). With
+            1 the search runs in this process.
+          exploration: UCB1 exploration constant, in units of the big bet
+          seed: seed for the searches, None for random
+        """
+        self.time_budget = time_budget
+        self.exploration = exploration
+        self.last_iterations = 0
+        self._rng = random.Random(seed)
+        self._pool = None
+        if processes != 1:
+            self._pool = multiprocessing.get_context("spawn").Pool(processes)
+            self.processes = self._pool._processes
+        else:
+            self.processes = 1
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def search(self, hand, max_iterations=None):
+        """Runs the searches for the player to act in hand.
+
+        Args:
+          hand: game.Hand of GameType.LIMIT with betting active
+          max_iterations: optional limit per search on top of the time budget
+
+        Returns:
+          dict of ActionType to (visits, average reward in chips)
+        """
+        if hand.config.game_type != game.GameType.LIMIT:
+            raise ValueError("MCTSBot only plays GameType.LIMIT")
+        if not hand.is_betting_active():
+            raise ValueError("No one to act")
+        args = [(hand, self.time_budget, max_iterations, self.exploration,
+                 self._rng.getrandbits(64)) for _ in range(self.processes)]
+        if self._pool is None:
+            results = [search(*args[0])]
+        else:
+            results = self._pool.map(_search_star, args)
+        self.last_iterations = sum(iterations for iterations, _ in results)
+        totals = {}
+        for _, stats in results:
+            for t, (visits, value) in stats.items():
+                old_visits, old_value = totals.get(t, (0, 0))
+                totals[t] = (old_visits + visits, old_value + value)
+        return {game.ActionType(t): (visits, value / visits)
+                for t, (visits, value) in totals.items()}
+
+    def choose_action(self, hand, max_iterations=None):
+        """Returns the game.Action with the most visits for the player to act."""
+        stats = self.search(hand, max_iterations)
+        action_type = max(stats, key=lambda t: (stats[t][0], stats[t][1]))
+        return _make_action(hand.allowed_action(), action_type)
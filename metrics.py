@@ -0,0 +1,341 @@
+"""Metrics for the game loop, served in the Prometheus text format.
+
+A Registry holds counters, gauges and histograms with fixed buckets.
+instrument() adds timing and counting to a game.Manager,
+instrument_table_host() reports the queue depths of a TableHost, and
+MetricsServer serves a registry over HTTP from a background thread:
+
+  registry = metrics.Registry()
+  metrics.instrument(manager, registry)
+  server = metrics.MetricsServer(registry, port=9100)
+  ...
+  server.close()
+
+The metrics are updated without any locking: they are meant to be written
+by a single thread (the game loop) and only read by the server, which may
+then see a histogram's count and sum from slightly different moments. That
+is fine for scraping, and keeps the game loop from ever waiting on it.
+"""
+
+import bisect
+import http.server
+import threading
+import time
+
+import game
+
+# Latency buckets in seconds, from 1us to 1s
+DEFAULT_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4,
+                   5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 0.1, 1.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\")
+                         .replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class Counter:
+    """A count which only goes up."""
+    __slots__ = ("labels", "value")
+    type_name = "counter"
+
+    def __init__(self, labels):
+        self.labels = labels
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def samples(self, name):
+        yield name + "_total", self.labels, self.value
+
+
+class Gauge:
+    """A value which can go up and down, or be computed when scraped."""
+    __slots__ = ("labels", "value", "function")
+    type_name = "gauge"
+
+    def __init__(self, labels):
+        self.labels = labels
+        self.value = 0
+        self.function = None
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set_function(self, function):
+        """Makes the gauge report function() at each scrape.
+
+        function is called from the server's thread, so it should only read
+        things, like the length of a queue.
+        """
+        self.function = function
+
+    def samples(self, name):
+        value = self.value if self.function is None else self.function()
+        yield name, self.labels, value
+
+
+class Histogram:
+    """Counts of observations in fixed buckets, plus their sum.
+
+    Attributes:
+      buckets: sorted upper bounds of the buckets (+Inf is implicit)
+      counts: number of observations in each bucket, not cumulative; the
+        last element is for the +Inf bucket
+    """
+    __slots__ = ("labels", "buckets", "counts", "sum")
+    type_name = "histogram"
+
+    def __init__(self, labels, buckets=DEFAULT_BUCKETS):
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def count(self):
+        return sum(self.counts)
+
+    def samples(self, name):
+        counts = list(self.counts)
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            total += count
+            yield name + "_bucket", self.labels + (("le", _format_value(float(bound))),), total
+        yield name + "_sum", self.labels, self.sum
+        yield name + "_count", self.labels, total
+
+
+class Registry:
+    """A set of named metrics.
+
+    Metrics are created on first use with counter(), gauge() or
+    histogram(); asking again for the same name and labels gives the same
+    metric, so several Managers can share a registry.
+    """
+
+    def __init__(self):
+        # name -> (type, help, {labels tuple: metric})
+        self._families = {}
+
+    def _get(self, cls, name, help, labels, *args):
+        labels = tuple(sorted(labels.items())) if labels else ()
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = (cls, help, {})
+        elif family[0] is not cls:
+            raise ValueError("{} is already a {}".format(name, family[0].type_name))
+        metric = family[2].get(labels)
+        if metric is None:
+            metric = family[2][labels] = cls(labels, *args)
+        return metric
+
+    def counter(self, name, help="", labels=None):
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name, help="", labels=None):
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name, help="", labels=None, buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help, labels, buckets)
+
+    def render(self):
+        """Returns all the metrics in the Prometheus text format."""
+        lines = []
+        # Copy in case the game loop adds a metric while we're rendering
+        for name, (cls, help, metrics) in list(self._families.items()):
+            if help:
+                lines.append("# HELP {} {}".format(
+                    name, help.replace("\\", "\\\\").replace("\n", "\\n")))
+            lines.append("# TYPE {} {}".format(name, cls.type_name))
+            for metric in list(metrics.values()):
+                for sample_name, labels, value in metric.samples(name):
+                    lines.append("{}{} {}".format(
+                        sample_name, _format_labels(labels), _format_value(value)))
+        return "\n".join(lines) + "\n"
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer:
+    """Serves a Registry at /metrics from a daemon thread.
+
+    Attributes:
+      port: the port being served, useful when created with port=0
+    """
+
+    def __init__(self, registry, port=0, host="127.0.0.1"):
+        self._server = http.server.ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.registry = registry
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="metrics-server", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ManagerMetrics:
+    """The metrics instrument() keeps for Managers.
+
+    Attributes:
+      hands_started, hands_completed: Counter
+      act_seconds: Histogram of act() latency
+      proceed_seconds: dict of GameState to Histogram of proceed() latency,
+        by the state proceed() was called in
+      notify_seconds: Histogram of the time to notify the listeners of one
+        event
+      evaluator_calls: Counter of hands ranked at showdowns
+      errors: Counter of act() and proceed() calls that raised
+    """
+
+    def __init__(self, registry, buckets=DEFAULT_BUCKETS):
+        self.hands_started = registry.counter(
+            "mppoker_hands_started", "Hands started")
+        self.hands_completed = registry.counter(
+            "mppoker_hands_completed", "Hands paid out")
+        self.act_seconds = registry.histogram(
+            "mppoker_act_seconds", "Manager.act() latency", buckets=buckets)
+        self.proceed_seconds = {
+            state: registry.histogram(
+                "mppoker_proceed_seconds",
+                "Manager.proceed() latency by the state it was called in",
+                labels={"state": state.name}, buckets=buckets)
+            for state in game.GameState}
+        self.notify_seconds = registry.histogram(
+            "mppoker_notify_seconds", "Time to notify the listeners of an event",
+            buckets=buckets)
+        self.evaluator_calls = registry.counter(
+            "mppoker_evaluator_calls", "Hands ranked at showdowns")
+        self.errors = registry.counter(
+            "mppoker_errors", "act() and proceed() calls which raised")
+
+
+def instrument(manager, registry, buckets=DEFAULT_BUCKETS):
+    """Adds metrics to a game.Manager.
+
+    The Manager's start_game, act, proceed and _notify are wrapped on the
+    instance, so other Managers don't pay for it. Managers instrumented with
+    the same registry add to the same metrics.
+
+    Returns:
+      ManagerMetrics
+    """
+    m = ManagerMetrics(registry, buckets)
+    perf_counter = time.perf_counter
+    start_game = manager.start_game
+    act = manager.act
+    proceed = manager.proceed
+    notify = manager._notify
+    hands_started = m.hands_started
+    hands_completed = m.hands_completed
+    act_seconds = m.act_seconds
+    proceed_seconds = m.proceed_seconds
+    notify_seconds = m.notify_seconds
+
+    def timed_start_game():
+        start_game()
+        hands_started.value += 1
+
+    def timed_act(action):
+        start = perf_counter()
+        try:
+            act(action)
+        except Exception:
+            m.errors.value += 1
+            raise
+        act_seconds.observe(perf_counter() - start)
+
+    def timed_proceed():
+        state = manager.state
+        start = perf_counter()
+        try:
+            proceed()
+        except Exception:
+            m.errors.value += 1
+            raise
+        proceed_seconds[state].observe(perf_counter() - start)
+        new_state = manager.state
+        if new_state is game.GameState.PRE_DEAL:
+            hands_started.value += 1
+        elif new_state is game.GameState.PAYING_OUT:
+            hands_completed.value += 1
+        elif new_state is game.GameState.SHOWDOWN:
+            m.evaluator_calls.value += sum(
+                1 for p in manager.current_hand.players
+                if p is not None and p.hole_cards is not None)
+
+    def timed_notify(event):
+        start = perf_counter()
+        notify(event)
+        notify_seconds.observe(perf_counter() - start)
+
+    manager.start_game = timed_start_game
+    manager.act = timed_act
+    manager.proceed = timed_proceed
+    manager._notify = timed_notify
+    return m
+
+
+def instrument_table_host(host, registry):
+    """Adds gauges for the queues of a table_host.TableHost.
+
+    The gauges are read when scraped. The Managers of the tables can be
+    instrumented separately with instrument(table.manager, registry).
+    """
+    registry.gauge("mppoker_tables", "Tables in the host").set_function(
+        lambda: len(host.tables))
+    registry.gauge("mppoker_pending_actions",
+                   "Submitted actions waiting to be applied").set_function(
+        lambda: len(host._actions))
+    registry.gauge("mppoker_ready_tables",
+                   "Tables waiting for proceed()").set_function(
+        lambda: len(host._ready))
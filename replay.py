@@ -0,0 +1,250 @@
+"""Replays recorded hand histories through game.Manager and checks the results.
+
+This is a regression test for the engine: each history.HandRecord is played
+again on a fresh Manager with the recorded cards stacked in the deck and the
+recorded actions fed to act(), and the outcome is compared to what was
+recorded. Files are independent, so replay_files spreads them over worker
+processes.
+
+The replay Manager has no listeners, so no events are built; the results are
+read straight off the Hand. Run as:
+
+  python replay.py FILE...
+"""
+
+import multiprocessing
+import sys
+import time
+
+import deck
+import game
+import history
+
+
+class Mismatch:
+    """One difference between a recorded hand and its replay.
+
+    Attributes:
+      hand_idx: index of the hand in its file
+      field: what differed, e.g. "winners", "pot_winnings", "stacks", "error"
+      expected: the recorded value
+      actual: the value from the replay
+    """
+    __slots__ = ("hand_idx", "field", "expected", "actual")
+
+    def __init__(self, hand_idx, field, expected, actual):
+        self.hand_idx = hand_idx
+        self.field = field
+        self.expected = expected
+        self.actual = actual
+
+    def __str__(self):
+        return "hand {}: {} expected {} got {}".format(
+            self.hand_idx, self.field, self.expected, self.actual)
+
+
+class ReplayResult:
+    """Summary of replaying one file.
+
+    Attributes:
+      path: the file replayed
+      hands: number of hands replayed
+      num_mismatches: total number of mismatches found
+      mismatches: the first mismatches (up to the max_mismatches asked for)
+      elapsed: seconds spent replaying
+    """
+    __slots__ = ("path", "hands", "num_mismatches", "mismatches", "elapsed")
+
+    def __init__(self, path):
+        self.path = path
+        self.hands = 0
+        self.num_mismatches = 0
+        self.mismatches = []
+        self.elapsed = 0.0
+
+    def ok(self):
+        return self.num_mismatches == 0
+
+
+def deck_order(record):
+    """Returns the deck order (list of card indices) that deals record's cards.
+
+    Hole cards are dealt two at a time in seat order, then the board.
+    """
+    order = []
+    for cards in record.hole_cards:
+        if cards is not None:
+            order.extend(cards)
+    order.extend(record.board)
+    dealt = set(order)
+    order.extend(idx for idx in range(52) if idx not in dealt)
+    return order
+
+
+def _previous_seat(stacks, pos):
+    """Returns the seated position before pos, so that start_game's button
+    advance lands on pos."""
+    num_seats = len(stacks)
+    for offset in range(1, num_seats + 1):
+        idx = (pos - offset) % num_seats
+        if stacks[idx] is not None:
+            return idx
+
+
+def replay_hand(config, record):
+    """Plays one recorded hand on a new Manager.
+
+    Args:
+      config: game.Configuration the hand was played with
+      record: history.HandRecord
+
+    Returns:
+      (finished game.Hand, whether it went to showdown, list of final stacks
+      with None for empty seats)
+
+    Raises:
+      ValueError if the recorded actions run out or are left over, and
+      whatever game.Manager raises for an action it doesn't allow.
+    """
+    manager = game.Manager(config)
+    for idx, stack in enumerate(record.stacks):
+        if stack is not None:
+            manager.players[idx] = game.Player("seat{}".format(idx), stack)
+            manager.players[idx].position = idx
+    order = deck_order(record)
+    manager._deck_factory = lambda: deck.Deck(order)
+    manager.button_pos = _previous_seat(record.stacks, record.button_pos)
+    manager.start_game()
+
+    # The engine posts the blinds itself.
+    actions = [a for a in record.actions
+               if a.action_type != game.ActionType.BLIND_BET]
+    action_idx = 0
+    showdown = False
+    while manager.state != game.GameState.PAYING_OUT:
+        hand = manager.current_hand
+        if hand.is_betting_active():
+            if action_idx == len(actions):
+                raise ValueError("Recorded actions ran out")
+            manager.act(actions[action_idx])
+            action_idx += 1
+        else:
+            manager.proceed()
+            if manager.state == game.GameState.SHOWDOWN:
+                showdown = True
+    if action_idx != len(actions):
+        raise ValueError("{} recorded actions left over".format(
+            len(actions) - action_idx))
+    final_stacks = [None if p is None else p.stack for p in manager.players]
+    return manager.current_hand, showdown, final_stacks
+
+
+def check_hand(config, record, hand_idx=0):
+    """Replays record and returns (list of Mismatch, final stacks or None)."""
+    try:
+        hand, showdown, final_stacks = replay_hand(config, record)
+    except Exception as e:
+        return [Mismatch(hand_idx, "error", None, repr(e))], None
+    mismatches = []
+    if showdown != record.showdown:
+        mismatches.append(Mismatch(hand_idx, "showdown", record.showdown, showdown))
+    if sorted(hand.winners) != sorted(record.winners):
+        mismatches.append(Mismatch(hand_idx, "winners", record.winners, hand.winners))
+    if hand.pot_winnings != record.pot_winnings:
+        mismatches.append(Mismatch(hand_idx, "pot_winnings", record.pot_winnings,
+                                   hand.pot_winnings))
+    initial_total = sum(s for s in record.stacks if s is not None)
+    final_total = sum(s for s in final_stacks if s is not None)
+    if initial_total != final_total:
+        mismatches.append(Mismatch(hand_idx, "total_chips", initial_total,
+                                   final_total))
+    return mismatches, final_stacks
+
+
+def replay_records(config, records, result, max_mismatches=100):
+    """Replays an iterable of HandRecord from one table into result.
+
+    Besides each hand's own results, this checks that every player starts a
+    hand with the stack they finished the previous one with.
+    """
+    def add(mismatches):
+        result.num_mismatches += len(mismatches)
+        room = max_mismatches - len(result.mismatches)
+        if room > 0:
+            result.mismatches.extend(mismatches[:room])
+
+    previous_stacks = None
+    for hand_idx, record in enumerate(records):
+        mismatches, final_stacks = check_hand(config, record, hand_idx)
+        if previous_stacks is not None:
+            for before, after in zip(previous_stacks, record.stacks):
+                if before is not None and after is not None and before != after:
+                    mismatches.append(Mismatch(hand_idx, "stacks", before, after))
+                    break
+        add(mismatches)
+        previous_stacks = final_stacks
+        result.hands += 1
+    return result
+
+
+def replay_file(path, max_mismatches=100):
+    """Replays every hand in a hand history file.
+
+    Returns:
+      ReplayResult
+    """
+    result = ReplayResult(path)
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        config, records = history.read_hand_histories(f)
+        replay_records(config, records, result, max_mismatches)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def replay_files(paths, processes=None, max_mismatches=100):
+    """Replays hand history files, one file per task in a process pool.
+
+    Args:
+      paths: list of file names
+      processes: number of worker processes, default os.cpu_count(). With 1
+        the files are replayed in this process.
+      max_mismatches: limit on the mismatches kept per file
+
+    Returns:
+      generator of ReplayResult, in the order the files finish
+    """
+    if processes == 1:
+        for path in paths:
+            yield replay_file(path, max_mismatches)
+        return
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes) as pool:
+        yield from pool.imap_unordered(
+            _replay_file_star, [(path, max_mismatches) for path in paths])
+
+
+def _replay_file_star(args):
+    return replay_file(*args)
+
+
+def main(paths):
+    total_hands = 0
+    total_mismatches = 0
+    start = time.perf_counter()
+    for result in replay_files(paths):
+        total_hands += result.hands
+        total_mismatches += result.num_mismatches
+        print("{}: {} hands, {} mismatches, {:.0f} hands/sec".format(
+            result.path, result.hands, result.num_mismatches,
+            result.hands / result.elapsed if result.elapsed else 0.0))
+        for mismatch in result.mismatches:
+            print("  {}".format(mismatch))
+    elapsed = time.perf_counter() - start
+    print("total: {} hands, {} mismatches, {:.0f} hands/sec".format(
+        total_hands, total_mismatches, total_hands / elapsed if elapsed else 0.0))
+    return 1 if total_mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
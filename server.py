@@ -0,0 +1,389 @@
+"""TCP server which lets remote clients play at game.Manager tables.
+
+GameServer runs a table_host.TableHost and accepts connections on a TCP
+port. The protocol is newline delimited JSON objects in both directions.
+
+Client to server:
+  {"type": "join", "table": <table id>, "name": <str>, "stack": <int>}
+    takes the first free seat at the table. The table starts once
+    start_players are seated.
+  {"type": "act", "table": <table id>, "action": <ActionType name>,
+   "amount": <int, for BET and RAISE>}
+    acts for the client's seat. The action is checked with
+    AllowedAction.check_action before it is queued.
+  {"type": "watch", "table": <table id>}
+    follows the table's events as a spectator.
+
+Server to client:
+  {"type": "joined", "table": <table id>, "seat": <int>}
+  {"type": "watching", "table": <table id>}
+  {"type": "error", "message": <str>}
+  {"type": "event", "table": <table id>, "event": <EventType name>, ...}
+    every event of the tables the client sits at or watches, with the
+    fields given by event_to_json. Other players' hole cards are hidden.
+
+Each event is serialized once per view (see views.EventViews), not once per
+client.
+
+Writes never wait: each connection has a send queue which is flushed to the
+socket once per turn of the event loop, and a client which lets more than
+max_buffered bytes pile up in its socket buffer is disconnected. When a
+client disconnects its players are removed from their tables, and folded
+(or checked) whenever they are to act in a hand they were still in.
+
+loadgen.py has simulated clients for load testing.
+"""
+
+import asyncio
+import json
+
+import game
+import table_host
+import views
+import wire
+
+_PLAYER_ACTION_TYPES = {t.name: t for t in game.ActionType
+                        if t != game.ActionType.BLIND_BET}
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def _cards(player_cards):
+    card_strs = wire.CARD_STRS
+    return [card_strs[card.card_idx] for card in player_cards.cards]
+
+
+def _player(player):
+    return {"name": player.name, "stack": player.stack, "position": player.position}
+
+
+def action_to_json(action):
+    d = {"seat": action.player_idx, "type": action.action_type.name}
+    amount = getattr(action, "amount", None)
+    if amount is not None:
+        d["amount"] = amount
+    return d
+
+
+def event_to_json(event, seat=None):
+    """Returns a JSON serializable dict for event as seen from a seat.
+
+    Args:
+      seat: the seat of the recipient, whose hole cards are shown; everyone
+        else's are replaced by []. None hides them all.
+    """
+    event_type = event.event_type
+    d = {"event": event_type.name}
+    if (event_type == game.EventType.PLAYER_ADDED or
+        event_type == game.EventType.PLAYER_REMOVED):
+        d["player"] = _player(event.player)
+    elif event_type == game.EventType.HAND_STARTED:
+        d["players"] = [None if p is None else
+                        {"name": p.base_player.name, "stack": p.stack}
+                        for p in event.players]
+    elif event_type == game.EventType.ANTE:
+        d["amount"] = event.amount
+        d["player_indices"] = list(event.player_indices)
+    elif event_type == game.EventType.HOLE_CARDS_DEALT:
+        d["cards"] = [None if c is None else _cards(c) if idx == seat else []
+                      for idx, c in enumerate(event.cards)]
+    elif event_type == game.EventType.FLOP_DEALT:
+        d["cards"] = _cards(event.cards)
+    elif (event_type == game.EventType.TURN_DEALT or
+          event_type == game.EventType.RIVER_DEALT):
+        d["card"] = wire.CARD_STRS[event.card.card_idx]
+    elif event_type == game.EventType.SHOWDOWN:
+        d["ranks"] = [[rank[0].name] + list(rank[1:]) for rank in event.ranks]
+        d["winners"] = list(event.winners)
+    elif event_type == game.EventType.PAYING_OUT:
+        d["net_profit"] = list(event.net_profit)
+        d["pot_winnings"] = list(event.pot_winnings)
+    elif event_type == game.EventType.ACTION:
+        d["action"] = action_to_json(event.action)
+    elif event_type == game.EventType.ACTION_ON:
+        allowed = event.allowed
+        d["seat"] = allowed.player_idx
+        d["allowed"] = {t.name: None if r is None else list(r)
+                        for t, r in allowed.action_ranges()}
+    return d
+
+
+def encode_message(message):
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+def action_from_json(message, seat):
+    """Builds the game.Action for an "act" message from seat.
+
+    Raises:
+      ProtocolError if the message doesn't describe an action
+    """
+    try:
+        action_type = _PLAYER_ACTION_TYPES[message["action"]]
+    except KeyError:
+        raise ProtocolError("Unknown action {!r}".format(message.get("action")))
+    amount = message.get("amount")
+    if amount is not None and not isinstance(amount, int):
+        raise ProtocolError("Bad amount {!r}".format(amount))
+    try:
+        return game.Action(seat, action_type, amount)
+    except ValueError as e:
+        raise ProtocolError(str(e))
+
+
+class _Connection:
+    """One client: its stream and send queue and the seats it holds."""
+
+    def __init__(self, server, reader, writer):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        # table_id -> (seat, game.Player)
+        self.seats = {}
+        self.watching = set()
+        self.closed = False
+        self._outbox = []
+        self._loop = asyncio.get_running_loop()
+
+    def send(self, data):
+        """Queues bytes to be written on the next flush."""
+        if self.closed:
+            return
+        self._outbox.append(data)
+        if len(self._outbox) == 1:
+            self._loop.call_soon(self.flush)
+
+    def send_message(self, message):
+        self.send(encode_message(message))
+
+    def flush(self):
+        outbox = self._outbox
+        self._outbox = []
+        if not outbox or self.closed:
+            return
+        self.writer.write(b"".join(outbox))
+        if self.writer.transport.get_write_buffer_size() > self.server.max_buffered:
+            # The client isn't keeping up; waiting for it would hold up the
+            # tables, so let it go.
+            self.server.slow_disconnects += 1
+            self.close()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.writer.close()
+
+    async def serve(self):
+        try:
+            while not self.closed:
+                try:
+                    line = await self.reader.readline()
+                except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+                    break
+                if not line:
+                    break
+                try:
+                    self._handle(json.loads(line))
+                except (ProtocolError, game.InvalidActionError,
+                        table_host.UnknownTableError, game.GameFullError,
+                        ValueError, KeyError, TypeError) as e:
+                    self.send_message({"type": "error", "message": _describe(e)})
+        finally:
+            self.flush()
+            self.close()
+            self.server._disconnected(self)
+
+    def _handle(self, message):
+        if not isinstance(message, dict):
+            raise ProtocolError("Messages must be objects")
+        kind = message.get("type")
+        if kind == "join":
+            self.server._join(self, message["table"], str(message["name"]),
+                              int(message["stack"]))
+        elif kind == "act":
+            table_id = message["table"]
+            if table_id not in self.seats:
+                raise ProtocolError("Not seated at table {!r}".format(table_id))
+            seat = self.seats[table_id][0]
+            self.server._act(self, table_id, action_from_json(message, seat))
+        elif kind == "watch":
+            self.server._watch(self, message["table"])
+        else:
+            raise ProtocolError("Unknown message type {!r}".format(kind))
+
+
+def _describe(e):
+    if isinstance(e, table_host.UnknownTableError):
+        return "Unknown table {!r}".format(e.table_id)
+    if isinstance(e, game.GameFullError):
+        return "Table is full"
+    return "{}: {}".format(type(e).__name__, e)
+
+
+class _TableBroadcaster:
+    """Sends a table's events to the clients seated there and watching.
+
+    It subscribes to a views.ViewListener on the table's Manager.
+    """
+
+    def __init__(self, server, table_id):
+        self.server = server
+        self.table_id = table_id
+        # seat -> (game.Player, _Connection)
+        self.seats = {}
+        self.watchers = set()
+
+    def encode(self, event, seat):
+        message = {"type": "event", "table": self.table_id}
+        message.update(event_to_json(event, seat))
+        return encode_message(message)
+
+    def send(self, event_views):
+        for seat, (_, conn) in self.seats.items():
+            conn.send(event_views.for_seat(seat))
+        if self.watchers:
+            public = event_views.public
+            for conn in self.watchers:
+                conn.send(public)
+        event = event_views.event
+        if event.event_type == game.EventType.ACTION_ON:
+            seat = event.allowed.player_idx
+            entry = self.seats.get(seat)
+            if entry is None or entry[0] is not event.hand_player.base_player:
+                # Whoever is to act has left
+                self.server._act_for_absent(self.table_id, event.allowed)
+
+
+class GameServer:
+    """Hosts tables for clients connecting over TCP (see the module docstring).
+
+    Use as:
+      server = GameServer()
+      server.add_table("t1", config)
+      await server.start(port=9000)
+      ...
+      await server.close()
+
+    Attributes:
+      host: the table_host.TableHost running the tables
+      port: the port listened on, once started
+      max_buffered: bytes a client may have waiting in its socket buffer
+        before it is disconnected
+      slow_disconnects: number of clients disconnected for being too slow
+    """
+
+    def __init__(self, max_buffered=1 << 20, max_proceeds_per_pass=1000):
+        self.host = table_host.TableHost(max_proceeds_per_pass)
+        self.max_buffered = max_buffered
+        self.port = None
+        self.slow_disconnects = 0
+        self.connections = set()
+        self._broadcasters = {}
+        self._start_players = {}
+        self._server = None
+        self._host_task = None
+
+    def add_table(self, table_id, config, deck_factory=None, start_players=2):
+        """Adds a table for clients to join.
+
+        Args:
+          table_id: JSON serializable id, unique in this server
+          config: game.Configuration
+          deck_factory: optionally overrides the Manager's deck factory
+          start_players: number of seated players at which the game starts
+
+        Returns:
+          table_host.Table
+        """
+        table = self.host.add_table(table_id, config, deck_factory)
+        broadcaster = _TableBroadcaster(self, table_id)
+        view_listener = views.ViewListener(broadcaster.encode)
+        view_listener.subscribers.append(broadcaster.send)
+        table.manager.add_listener(view_listener)
+        self._broadcasters[table_id] = broadcaster
+        self._start_players[table_id] = start_players
+        return table
+
+    async def start(self, host="127.0.0.1", port=0):
+        self._host_task = asyncio.ensure_future(self.host.run())
+        self._server = await asyncio.start_server(self._accept, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """Stops accepting clients, disconnects everyone and stops the tables."""
+        self._server.close()
+        for conn in list(self.connections):
+            conn.flush()
+            conn.close()
+        await self._server.wait_closed()
+        self.host.stop()
+        await self._host_task
+
+    async def _accept(self, reader, writer):
+        conn = _Connection(self, reader, writer)
+        self.connections.add(conn)
+        await conn.serve()
+
+    def _join(self, conn, table_id, name, stack):
+        table = self.host._table(table_id)
+        if table_id in conn.seats:
+            raise ProtocolError("Already seated at table {!r}".format(table_id))
+        player = game.Player(name, stack)
+        seat = table.manager.add_player(player)
+        conn.seats[table_id] = (seat, player)
+        self._broadcasters[table_id].seats[seat] = (player, conn)
+        conn.send_message({"type": "joined", "table": table_id, "seat": seat})
+        manager = table.manager
+        if (manager.state == game.GameState.WAITING_FOR_START and
+            manager.num_players() >= self._start_players[table_id]):
+            self.host.start_table(table_id)
+
+    def _watch(self, conn, table_id):
+        self.host._table(table_id)
+        conn.watching.add(table_id)
+        self._broadcasters[table_id].watchers.add(conn)
+        conn.send_message({"type": "watching", "table": table_id})
+
+    def _act(self, conn, table_id, action):
+        hand = self.host._table(table_id).manager.current_hand
+        if hand is None:
+            raise game.ActionOutOfTurnError(action.player_idx, None)
+        hand.allowed_action().check_action(action)
+        future = self.host.submit_action(table_id, action)
+        future.add_done_callback(lambda f: self._act_done(conn, f))
+
+    def _act_done(self, conn, future):
+        if not future.cancelled() and future.exception() is not None:
+            conn.send_message({"type": "error",
+                               "message": _describe(future.exception())})
+
+    def _act_for_absent(self, table_id, allowed):
+        action_type = (game.ActionType.CHECK
+                       if allowed.is_action_type_allowed(game.ActionType.CHECK)
+                       else game.ActionType.FOLD)
+        future = self.host.submit_action(
+            table_id, game.Action(allowed.player_idx, action_type))
+        # Someone else may have acted for the seat already
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    def _disconnected(self, conn):
+        self.connections.discard(conn)
+        for table_id in conn.watching:
+            broadcaster = self._broadcasters.get(table_id)
+            if broadcaster is not None:
+                broadcaster.watchers.discard(conn)
+        for table_id, (seat, player) in conn.seats.items():
+            table = self.host.tables.get(table_id)
+            if table is None:
+                continue
+            del self._broadcasters[table_id].seats[seat]
+            manager = table.manager
+            if manager.players[seat] is player:
+                manager.remove_player(seat)
+            hand = manager.current_hand
+            if (hand is not None and hand.action_on == seat and
+                hand.players[seat].base_player is player):
+                self._act_for_absent(table_id, hand.allowed_action())
+        conn.seats.clear()
@@ -0,0 +1,327 @@
+"""Compact snapshots of a game.Manager's full state.
+
+snapshot(manager) returns bytes from which restore() builds an equivalent
+Manager: the configuration, the seated players, the button, the GameState and
+everything in the current Hand (deck order and position, the HandPlayers,
+board, pot, and the betting round's outlays and past_action). This is small
+and quick enough to take after every act(), so a table can be checkpointed
+and carried on in another process.
+
+Listeners and the deck factory are not part of the snapshot; add them again
+on the restored Manager.
+
+The body is a list of integers (zigzag LEB128 varints, see the history
+module) preceded by a block of raw bytes. Layout:
+  magic b"MPSS", version byte
+  length and bytes of the history.encode_config header
+  length and bytes of the raw block: the deck order (52 card indices) if
+    there is a hand, then the utf-8 player names
+  the integers, to the end:
+    state, button_pos (-1 for None), seat mask, and for each seated player
+      their stack and the length of their name
+    0 if there is no current hand, else 1 and the hand:
+      button_pos, seat mask of the hand's players, and for each of them the
+        flags (_SAME_PLAYER, _HAS_HOLE_CARDS), the name length and stack of
+        the base player unless it is the one in the Manager's seat,
+        initial_stack, stack and the two hole cards if any
+      pot, the deck's next_card_idx, number of board cards and the board,
+        action_on (-1 for None), live mask, number live
+      0 outside a betting round, else 1, the number of past actions and each
+        as action_type << 4 | player_idx followed by the amount if it has
+        one, the outlay of every seat, acted mask, max outlay, number matched
+      number of winners (-1 for None) and the winners
+      0 if pot_winnings is None, else 1 and pot_winnings of the hand's players
+      0 if ranks is None, else 1 and for every seat the length of its rank
+        list, the HandRank value and the other elements
+"""
+
+
+import cards
+import deck
+import game
+import history
+
+MAGIC = b"MPSS"
+VERSION = 1
+
+_SAME_PLAYER = 0x01
+_HAS_HOLE_CARDS = 0x02
+
+_GAME_STATES = {s.value: s for s in game.GameState}
+_HAND_RANKS = {r.value: r for r in cards.HandRank}
+_CARDS = [deck.Card(idx) for idx in range(52)]
+
+
+class SnapshotFormatError(Exception):
+    pass
+
+
+def _encode_ints(buf, ints):
+    """Appends each of ints to buf as a zigzag varint."""
+    append = buf.append
+    for value in ints:
+        value = value * 2 if value >= 0 else -value * 2 - 1
+        while value >= 0x80:
+            append((value & 0x7f) | 0x80)
+            value >>= 7
+        append(value)
+
+
+def _decode_ints(data):
+    """Returns the list of zigzag varints that make up data."""
+    ints = []
+    append = ints.append
+    value = 0
+    shift = 0
+    for b in data:
+        if b < 0x80:
+            value |= b << shift
+            append(value >> 1 if not value & 1 else -(value >> 1) - 1)
+            value = 0
+            shift = 0
+        else:
+            value |= (b & 0x7f) << shift
+            shift += 7
+    if shift:
+        raise SnapshotFormatError("Truncated snapshot")
+    return ints
+
+
+def snapshot(manager):
+    """Returns the bytes for the state of manager (see restore)."""
+    ints = [manager.state._value_,
+            -1 if manager.button_pos is None else manager.button_pos]
+    raw = bytearray()
+    names = []
+    players = manager.players
+    seat_mask = 0
+    for idx, p in enumerate(players):
+        if p is not None:
+            seat_mask |= 1 << idx
+    ints.append(seat_mask)
+    for p in players:
+        if p is not None:
+            name = str(p.name).encode()
+            names.append(name)
+            ints.append(p.stack)
+            ints.append(len(name))
+
+    hand = manager.current_hand
+    if hand is None:
+        ints.append(0)
+    else:
+        raw += bytes([card.card_idx for card in hand.deck.our_deck])
+        ints.append(1)
+        ints.append(hand.button_pos)
+        hand_mask = 0
+        for idx, hp in enumerate(hand.players):
+            if hp is not None:
+                hand_mask |= 1 << idx
+        ints.append(hand_mask)
+        for idx, hp in enumerate(hand.players):
+            if hp is None:
+                continue
+            flags = 0
+            if hp.base_player is players[idx]:
+                flags |= _SAME_PLAYER
+            if hp.hole_cards is not None:
+                flags |= _HAS_HOLE_CARDS
+            ints.append(flags)
+            if not flags & _SAME_PLAYER:
+                name = str(hp.base_player.name).encode()
+                names.append(name)
+                ints.append(len(name))
+                ints.append(hp.base_player.stack)
+            ints.append(hp.initial_stack)
+            ints.append(hp.stack)
+            if flags & _HAS_HOLE_CARDS:
+                for card in hp.hole_cards.cards:
+                    ints.append(card.card_idx)
+
+        ints.append(hand.pot)
+        ints.append(hand.deck.next_card_idx)
+        board = hand.board.cards
+        ints.append(len(board))
+        for card in board:
+            ints.append(card.card_idx)
+        ints.append(-1 if hand.action_on is None else hand.action_on)
+        ints.append(hand._live_mask)
+        ints.append(hand._num_live)
+
+        if hand.past_action is None:
+            ints.append(0)
+        else:
+            ints.append(1)
+            ints.append(len(hand.past_action))
+            for action in hand.past_action:
+                code = history.action_code(action)
+                ints.append(code)
+                if history.code_has_amount(code):
+                    ints.append(action.amount)
+            ints.extend(hand.current_outlay)
+            ints.append(hand._acted_mask)
+            ints.append(hand._max_outlay)
+            ints.append(hand._num_matched)
+
+        if hand.winners is None:
+            ints.append(-1)
+        else:
+            ints.append(len(hand.winners))
+            ints.extend(hand.winners)
+        if hand.pot_winnings is None:
+            ints.append(0)
+        else:
+            ints.append(1)
+            ints.extend(amount for amount in hand.pot_winnings
+                        if amount is not None)
+        if hand.ranks is None:
+            ints.append(0)
+        else:
+            ints.append(1)
+            for rank in hand.ranks:
+                ints.append(len(rank))
+                ints.append(rank[0]._value_)
+                ints.extend(rank[1:])
+
+    raw += b"".join(names)
+    buf = bytearray(MAGIC)
+    buf.append(VERSION)
+    config = history.encode_config(manager.config)
+    history.put_varint(buf, len(config))
+    buf += config
+    history.put_varint(buf, len(raw))
+    buf += raw
+    _encode_ints(buf, ints)
+    return bytes(buf)
+
+
+def restore(data):
+    """Builds a game.Manager from the bytes returned by snapshot().
+
+    Raises:
+      SnapshotFormatError if data isn't a snapshot.
+    """
+    data = memoryview(data)
+    if data[:len(MAGIC)] != MAGIC:
+        raise SnapshotFormatError("Not a Manager snapshot")
+    pos = len(MAGIC)
+    if data[pos] != VERSION:
+        raise SnapshotFormatError("Unsupported version {}".format(data[pos]))
+    pos += 1
+    config_length, pos = history.get_varint(data, pos)
+    config = history.decode_config(bytes(data[pos:pos + config_length]))[0]
+    pos += config_length
+    raw_length, pos = history.get_varint(data, pos)
+    raw = bytes(data[pos:pos + raw_length])
+    raw_pos = 0
+    try:
+        next_int = iter(_decode_ints(data[pos + raw_length:])).__next__
+        manager, raw_pos = _restore(config, raw, next_int)
+    except (StopIteration, IndexError, KeyError) as e:
+        raise SnapshotFormatError("Corrupt snapshot: {!r}".format(e))
+    try:
+        next_int()
+    except StopIteration:
+        return manager
+    raise SnapshotFormatError("Trailing data in snapshot")
+
+
+def _restore(config, raw, next_int):
+    num_seats = config.max_players
+    manager = game.Manager(config)
+    manager.state = _GAME_STATES[next_int()]
+    button_pos = next_int()
+    manager.button_pos = None if button_pos == -1 else button_pos
+    seat_mask = next_int()
+    seat_stacks = []
+    for idx in range(num_seats):
+        if seat_mask >> idx & 1:
+            seat_stacks.append((idx, next_int(), next_int()))
+
+    has_hand = next_int()
+    # The names come after the deck in raw
+    raw_pos = 52 if has_hand else 0
+    for idx, stack, name_length in seat_stacks:
+        player = game.Player(raw[raw_pos:raw_pos + name_length].decode(), stack)
+        raw_pos += name_length
+        player.position = idx
+        manager.players[idx] = player
+    if not has_hand:
+        return manager, raw_pos
+
+    # Hand.__init__ deals with creating a deck and its players, which we
+    # are about to replace, so build the Hand without it.
+    hand = game.Hand.__new__(game.Hand)
+    hand.config = config
+    hand._shared_players = 0
+    hand.button_pos = next_int()
+    hand_mask = next_int()
+    hand.players = [None] * num_seats
+    for idx in range(num_seats):
+        if not hand_mask >> idx & 1:
+            continue
+        flags = next_int()
+        if flags & _SAME_PLAYER:
+            base_player = manager.players[idx]
+        else:
+            name_length = next_int()
+            base_player = game.Player(
+                raw[raw_pos:raw_pos + name_length].decode(), next_int())
+            raw_pos += name_length
+            base_player.position = idx
+        hp = game.HandPlayer(base_player)
+        hp.initial_stack = next_int()
+        hp.stack = next_int()
+        if flags & _HAS_HOLE_CARDS:
+            hp.hole_cards = cards.PlayerCards([_CARDS[next_int()],
+                                               _CARDS[next_int()]])
+        hand.players[idx] = hp
+
+    hand.pot = next_int()
+    hand.deck = deck.Deck.__new__(deck.Deck)
+    hand.deck.next_card_idx = next_int()
+    hand.deck.our_deck = [_CARDS[idx] for idx in raw[:52]]
+    hand.board = cards.PlayerCards(
+        [_CARDS[next_int()] for _ in range(next_int())])
+    action_on = next_int()
+    hand.action_on = None if action_on == -1 else action_on
+    hand._live_mask = next_int()
+    hand._num_live = next_int()
+
+    if next_int():
+        hand.past_action = []
+        for _ in range(next_int()):
+            code = next_int()
+            amount = next_int() if history.code_has_amount(code) else None
+            hand.past_action.append(history.code_to_action(code, amount))
+        hand.current_outlay = [next_int() for _ in range(num_seats)]
+        hand._acted_mask = next_int()
+        hand._max_outlay = next_int()
+        hand._num_matched = next_int()
+    else:
+        hand.past_action = None
+        hand.current_outlay = None
+
+    num_winners = next_int()
+    if num_winners == -1:
+        hand.winners = None
+    else:
+        hand.winners = [next_int() for _ in range(num_winners)]
+    if next_int():
+        hand.pot_winnings = [None if hp is None else next_int()
+                             for hp in hand.players]
+    else:
+        hand.pot_winnings = None
+    if next_int():
+        hand.ranks = []
+        for _ in range(num_seats):
+            length = next_int()
+            rank = [_HAND_RANKS[next_int()]]
+            rank.extend(next_int() for _ in range(length - 1))
+            hand.ranks.append(rank)
+    else:
+        hand.ranks = None
+
+    hand._rebuild_state()
+    manager.current_hand = hand
+    return manager, raw_pos
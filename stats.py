@@ -0,0 +1,194 @@
+"""Running per seat statistics for a game.Manager.
+
+PlayerStats is a listener which keeps a fixed set of counters for every
+seat, updated as the events come in, so it can run for any number of hands
+in the same memory:
+
+  stats = PlayerStats(manager.config.max_players)
+  manager.add_listener(stats, event_types=PlayerStats.EVENT_TYPES)
+
+The statistics are by seat, not by player: if a seat changes hands, its
+counters carry on. The counters are integers in one array, so stats from
+several tables or worker processes can be sent around with snapshot() and
+added up with merge().
+
+Definitions:
+  VPIP: fraction of hands where the seat called, bet or raised before the
+    flop (posting a blind doesn't count)
+  PFR: fraction of hands where the seat bet or raised before the flop
+  aggression factor: (bets + raises) / calls, over all betting rounds
+  showdown win rate: fraction of the showdowns the seat was in where it won
+    at least part of the pot
+  net profit: total chips won minus chips put in
+"""
+
+import array
+import sys
+
+import cards
+import game
+
+MAGIC = b"MPST"
+VERSION = 1
+
+# The counters, each with one int64 per seat
+COUNTERS = ("hands", "vpip", "pfr", "aggressive", "calls", "showdowns",
+            "showdowns_won", "net_profit")
+_HANDS, _VPIP, _PFR, _AGGRESSIVE, _CALLS, _SHOWDOWNS, _SHOWDOWNS_WON, \
+    _NET_PROFIT = range(len(COUNTERS))
+
+_ACTION = game.EventType.ACTION
+_FLOP_DEALT = game.EventType.FLOP_DEALT
+_SHOWDOWN = game.EventType.SHOWDOWN
+_PAYING_OUT = game.EventType.PAYING_OUT
+_BET = game.ActionType.BET
+_RAISE = game.ActionType.RAISE
+_CALL = game.ActionType.CALL
+_NO_HAND = cards.HandRank.NO_HAND
+
+
+class StatsFormatError(Exception):
+    pass
+
+
+def _ratio(numerator, denominator):
+    return None if denominator == 0 else numerator / denominator
+
+
+class PlayerStats:
+    """Listener which counts per seat statistics (see the module docstring).
+
+    Attributes:
+      num_seats: number of seats counted
+      counts: array of int64, counter c of seat s at c * num_seats + s (c is
+        an index into COUNTERS)
+    """
+
+    EVENT_TYPES = [_ACTION, _FLOP_DEALT, _SHOWDOWN, _PAYING_OUT]
+
+    def __init__(self, num_seats):
+        self.num_seats = num_seats
+        self.counts = array.array("q", bytes(8 * len(COUNTERS) * num_seats))
+        # Seats which have called (_vpip_mask) and raised (_pfr_mask) before
+        # the flop in the current hand, as bit masks.
+        self._preflop = True
+        self._vpip_mask = 0
+        self._pfr_mask = 0
+
+    def notify(self, event):
+        event_type = event.event_type
+        if event_type is _ACTION:
+            action = event.action
+            action_type = action.action_type
+            if action_type is _BET or action_type is _RAISE:
+                self.counts[_AGGRESSIVE * self.num_seats + action.player_idx] += 1
+                if self._preflop:
+                    self._vpip_mask |= 1 << action.player_idx
+                    self._pfr_mask |= 1 << action.player_idx
+            elif action_type is _CALL:
+                self.counts[_CALLS * self.num_seats + action.player_idx] += 1
+                if self._preflop:
+                    self._vpip_mask |= 1 << action.player_idx
+        elif event_type is _FLOP_DEALT:
+            self._preflop = False
+        elif event_type is _SHOWDOWN:
+            counts = self.counts
+            for seat, rank in enumerate(event.ranks):
+                if rank[0] is not _NO_HAND:
+                    counts[_SHOWDOWNS * self.num_seats + seat] += 1
+            for seat in event.winners:
+                counts[_SHOWDOWNS_WON * self.num_seats + seat] += 1
+        elif event_type is _PAYING_OUT:
+            self._end_hand(event.net_profit)
+
+    def _end_hand(self, net_profit):
+        counts = self.counts
+        n = self.num_seats
+        vpip_mask = self._vpip_mask
+        pfr_mask = self._pfr_mask
+        for seat, net in enumerate(net_profit):
+            if net is None:
+                continue
+            counts[_HANDS * n + seat] += 1
+            counts[_NET_PROFIT * n + seat] += net
+            if vpip_mask >> seat & 1:
+                counts[_VPIP * n + seat] += 1
+            if pfr_mask >> seat & 1:
+                counts[_PFR * n + seat] += 1
+        self._preflop = True
+        self._vpip_mask = 0
+        self._pfr_mask = 0
+
+    def counter(self, name):
+        """Returns the list of the named counter (see COUNTERS) by seat."""
+        start = COUNTERS.index(name) * self.num_seats
+        return self.counts[start:start + self.num_seats].tolist()
+
+    def vpip(self):
+        """Returns VPIP by seat, None for seats with no hands."""
+        return list(map(_ratio, self.counter("vpip"), self.counter("hands")))
+
+    def pfr(self):
+        """Returns PFR by seat, None for seats with no hands."""
+        return list(map(_ratio, self.counter("pfr"), self.counter("hands")))
+
+    def aggression_factor(self):
+        """Returns the aggression factor by seat, None for seats with no calls."""
+        return list(map(_ratio, self.counter("aggressive"), self.counter("calls")))
+
+    def showdown_win_rate(self):
+        """Returns the showdown win rate by seat, None for seats with no
+        showdowns."""
+        return list(map(_ratio, self.counter("showdowns_won"),
+                        self.counter("showdowns")))
+
+    def net_profit(self):
+        return self.counter("net_profit")
+
+    def merge(self, other):
+        """Adds the counters of another PlayerStats (or a snapshot of one)."""
+        if isinstance(other, (bytes, bytearray, memoryview)):
+            other = PlayerStats.from_snapshot(other)
+        if other.num_seats != self.num_seats:
+            raise ValueError("Can't merge stats for {} seats into {} seats"
+                             .format(other.num_seats, self.num_seats))
+        counts = self.counts
+        for idx, value in enumerate(other.counts):
+            counts[idx] += value
+
+    def snapshot(self):
+        """Returns the counters as bytes, for from_snapshot or merge.
+
+        Only the finished hands are included, not the one being played.
+        Layout: magic b"MPST", version byte, number of seats byte, then the
+        counts as little endian int64.
+        """
+        counts = self.counts
+        if sys.byteorder != "little":
+            counts = array.array("q", counts)
+            counts.byteswap()
+        return MAGIC + bytes([VERSION, self.num_seats]) + counts.tobytes()
+
+    @classmethod
+    def from_snapshot(cls, data):
+        """Builds a PlayerStats from the bytes returned by snapshot().
+
+        Raises:
+          StatsFormatError if data isn't a snapshot.
+        """
+        data = bytes(data)
+        if data[:len(MAGIC)] != MAGIC:
+            raise StatsFormatError("Not a stats snapshot")
+        if len(data) < len(MAGIC) + 2:
+            raise StatsFormatError("Truncated stats snapshot")
+        version, num_seats = data[len(MAGIC):len(MAGIC) + 2]
+        if version != VERSION:
+            raise StatsFormatError("Unsupported version {}".format(version))
+        body = data[len(MAGIC) + 2:]
+        if len(body) != 8 * len(COUNTERS) * num_seats:
+            raise StatsFormatError("Stats snapshot has the wrong length")
+        stats = cls(num_seats)
+        stats.counts = array.array("q", body)
+        if sys.byteorder != "little":
+            stats.counts.byteswap()
+        return stats
@@ -0,0 +1,233 @@
+"""Hosts many game.Manager tables in one asyncio event loop.
+
+Each game.Manager is a standalone synchronous object. TableHost owns many of
+them and runs a single scheduler task which both applies the players'
+actions and calls proceed() on every table that can make progress, round
+robin, so that thousands of tables share one process.
+
+Players (or bots) find out it is their turn the usual way, with a listener on
+the table's Manager for EventType.ACTION_ON, and hand their action back with
+TableHost.submit_action or TableHost.act.
+"""
+
+import asyncio
+import collections
+import time
+
+import game
+
+
+class UnknownTableError(Exception):
+    def __init__(self, table_id):
+        self.table_id = table_id
+
+
+class Table:
+    """One table in a TableHost.
+
+    Attributes:
+      table_id: the id the table was added with
+      manager: the game.Manager for the table
+      hands_completed: number of hands that reached PAYING_OUT
+      start_time: time.monotonic() when the table was started, or None
+      error: the exception that stopped the table, or None
+    """
+    __slots__ = ("table_id", "manager", "hands_completed", "start_time",
+                 "error", "_scheduled")
+
+    def __init__(self, table_id, manager):
+        self.table_id = table_id
+        self.manager = manager
+        self.hands_completed = 0
+        self.start_time = None
+        self.error = None
+        self._scheduled = False
+
+    def can_proceed(self):
+        """Returns whether proceed() would make progress (not waiting on anyone)."""
+        if self.error is not None:
+            return False
+        if self.manager.state == game.GameState.WAITING_FOR_START:
+            return False
+        hand = self.manager.current_hand
+        return hand is None or not hand.is_betting_active()
+
+    def hands_per_sec(self, now=None):
+        if self.start_time is None:
+            return 0.0
+        if now is None:
+            now = time.monotonic()
+        elapsed = now - self.start_time
+        if elapsed <= 0:
+            return 0.0
+        return self.hands_completed / elapsed
+
+
+class TableHost:
+    """Multiplexes actions and proceed() for many tables through one event loop.
+
+    Tables are added and started with add_table and start_table. run() is the
+    scheduler; it has to be running (typically as a task) for anything to
+    happen. Each pass it applies every queued action and then calls proceed()
+    once on each table that can make progress.
+    """
+
+    def __init__(self, max_proceeds_per_pass=1000):
+        """Initializes TableHost.
+
+        Args:
+          max_proceeds_per_pass: limit of proceed() calls between checks for
+            new actions, so that a large number of busy tables doesn't starve
+            the players waiting on their actions.
+        """
+        self.max_proceeds_per_pass = max_proceeds_per_pass
+        self.tables = {}
+        self._ready = collections.deque()
+        self._actions = collections.deque()
+        self._wakeup = None
+        self._running = False
+        self._start_time = None
+
+    def add_table(self, table_id, config, deck_factory=None):
+        """Adds a table with a new game.Manager.
+
+        Args:
+          table_id: any hashable id, unique in this host
+          config: game.Configuration
+          deck_factory: optionally overrides the Manager's deck factory
+
+        Returns:
+          Table
+        """
+        if table_id in self.tables:
+            raise ValueError("Table {} already exists".format(table_id))
+        manager = game.Manager(config)
+        if deck_factory is not None:
+            manager._deck_factory = deck_factory
+        table = Table(table_id, manager)
+        self.tables[table_id] = table
+        return table
+
+    def remove_table(self, table_id):
+        """Removes a table. Any play in progress there is abandoned.
+
+        Returns:
+          Table
+        """
+        table = self._table(table_id)
+        del self.tables[table_id]
+        # It may still be in _ready; the scheduler skips tables not in the host.
+        return table
+
+    def start_table(self, table_id):
+        """Starts the game on a table (see game.Manager.start_game)."""
+        table = self._table(table_id)
+        table.manager.start_game()
+        table.start_time = time.monotonic()
+        self._schedule(table)
+
+    def submit_action(self, table_id, action):
+        """Queues an action for a table without waiting for it.
+
+        This is safe to call from a listener while the host is notifying.
+
+        Returns:
+          asyncio.Future that is done once the action is applied, with the
+          game.InvalidActionError (or other exception) if it failed.
+        """
+        table = self._table(table_id)
+        future = asyncio.get_running_loop().create_future()
+        self._actions.append((table, action, future))
+        self._wake()
+        return future
+
+    async def act(self, table_id, action):
+        """Applies an action on a table, raising if it isn't allowed."""
+        await self.submit_action(table_id, action)
+
+    def stats(self):
+        """Returns throughput numbers.
+
+        Returns:
+          dict with "tables" (number of tables), "hands" (total completed),
+          "hands_per_sec" (aggregate since run() started) and "per_table"
+          (dict of table_id to hands/sec).
+        """
+        now = time.monotonic()
+        total_hands = sum(t.hands_completed for t in self.tables.values())
+        if self._start_time is None or now <= self._start_time:
+            aggregate = 0.0
+        else:
+            aggregate = total_hands / (now - self._start_time)
+        return {
+            "tables": len(self.tables),
+            "hands": total_hands,
+            "hands_per_sec": aggregate,
+            "per_table": {table_id: t.hands_per_sec(now)
+                          for table_id, t in self.tables.items()},
+        }
+
+    async def run(self):
+        """Runs the scheduler until stop() is called."""
+        self._running = True
+        self._wakeup = asyncio.Event()
+        self._start_time = time.monotonic()
+        while self._running:
+            if not self._actions and not self._ready:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            self._apply_actions()
+            self._proceed_ready()
+            # Let other tasks (network, players) run between passes.
+            await asyncio.sleep(0)
+
+    def stop(self):
+        """Makes run() return after its current pass."""
+        self._running = False
+        self._wake()
+
+    def _table(self, table_id):
+        try:
+            return self.tables[table_id]
+        except KeyError:
+            raise UnknownTableError(table_id)
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _schedule(self, table):
+        if not table._scheduled and table.can_proceed():
+            table._scheduled = True
+            self._ready.append(table)
+            self._wake()
+
+    def _apply_actions(self):
+        actions = self._actions
+        while actions:
+            table, action, future = actions.popleft()
+            if future.cancelled():
+                continue
+            try:
+                table.manager.act(action)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(None)
+                self._schedule(table)
+
+    def _proceed_ready(self):
+        for _ in range(min(len(self._ready), self.max_proceeds_per_pass)):
+            table = self._ready.popleft()
+            table._scheduled = False
+            if self.tables.get(table.table_id) is not table or not table.can_proceed():
+                continue
+            try:
+                table.manager.proceed()
+            except Exception as e:
+                table.error = e
+                continue
+            if table.manager.state == game.GameState.PAYING_OUT:
+                table.hands_completed += 1
+            self._schedule(table)
@@ -0,0 +1,185 @@
+import asyncio
+import unittest
+
+import async_game
+import deck
+import game
+
+
+def in_order_deck_factory():
+    return deck.Deck()
+
+
+class SlowListener:
+    """Listener which takes a while with every event."""
+    def __init__(self, delay):
+        self.delay = delay
+        self.events = []
+
+    async def notify(self, event):
+        await asyncio.sleep(self.delay)
+        self.events.append(event)
+
+
+class AsyncManagerTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.async_manager = async_game.AsyncManager(game.Configuration())
+        self.async_manager.manager._deck_factory = in_order_deck_factory
+
+    async def asyncTearDown(self):
+        await self.async_manager.close()
+
+    def add_players(self, num):
+        for idx in range(num):
+            self.async_manager.add_player(game.Player("name{}".format(idx), 1000))
+
+    async def play_to_paying_out(self):
+        await self.async_manager.start_game()
+        while self.async_manager.manager.state != game.GameState.PAYING_OUT:
+            await self.async_manager.proceed()
+
+    async def play_calling_to_paying_out(self):
+        manager = self.async_manager.manager
+        await self.async_manager.start_game()
+        while manager.state != game.GameState.PAYING_OUT:
+            hand = manager.current_hand
+            if hand is not None and hand.is_betting_active():
+                allowed = hand.allowed_action()
+                await self.async_manager.act(game.Action(
+                    allowed.player_idx,
+                    game.ActionType.CALL
+                    if allowed.is_action_type_allowed(game.ActionType.CALL)
+                    else game.ActionType.CHECK))
+            else:
+                await self.async_manager.proceed()
+
+    async def test_events_delivered_in_order(self):
+        recorder = game.RecordingListener()
+        self.async_manager.add_listener(recorder)
+        self.add_players(2)
+        await self.play_to_paying_out()
+        await self.async_manager.drain()
+        self.assertEqual(
+            [game.EventType.PLAYER_ADDED,
+             game.EventType.PLAYER_ADDED,
+             game.EventType.HAND_STARTED,
+             game.EventType.HOLE_CARDS_DEALT,
+             game.EventType.FLOP_DEALT,
+             game.EventType.TURN_DEALT,
+             game.EventType.RIVER_DEALT,
+             game.EventType.SHOWDOWN,
+             game.EventType.PAYING_OUT],
+            [e.event_type for e in recorder.events])
+        self.assertEqual(0, self.async_manager.dropped(recorder))
+
+    async def test_event_types(self):
+        recorder = game.RecordingListener()
+        self.async_manager.add_listener(recorder, event_types=[game.EventType.SHOWDOWN])
+        self.add_players(2)
+        await self.play_to_paying_out()
+        await self.async_manager.drain()
+        self.assertEqual([game.EventType.SHOWDOWN],
+                         [e.event_type for e in recorder.events])
+
+    async def test_slow_listener_does_not_block(self):
+        slow = SlowListener(60)
+        self.async_manager.add_listener(slow)
+        self.add_players(2)
+        await asyncio.wait_for(self.play_to_paying_out(), timeout=5)
+        self.assertEqual([], slow.events)
+
+    async def test_drop(self):
+        slow = SlowListener(60)
+        self.async_manager.add_listener(slow, maxsize=2)
+        self.add_players(2)
+        await self.play_to_paying_out()
+        # The delivery task never got to run, so the first two events are
+        # queued and the rest are dropped.
+        self.assertEqual(7, self.async_manager.dropped(slow))
+        queued = self.async_manager._queues[0].events
+        self.assertEqual([game.EventType.PLAYER_ADDED, game.EventType.PLAYER_ADDED],
+                         [e.event_type for e in queued])
+
+    async def test_coalesce(self):
+        self.async_manager = async_game.AsyncManager(game.Configuration(
+            game_type=game.GameType.LIMIT, limits=(10, 20), blinds=(5, 10)))
+        recorder = game.RecordingListener()
+        self.async_manager.manager.add_listener(recorder)
+        slow = SlowListener(60)
+        self.async_manager.add_listener(slow, maxsize=2,
+                                        event_types=[game.EventType.HAND_STARTED,
+                                                     game.EventType.ACTION_ON,
+                                                     game.EventType.PAYING_OUT],
+                                        backpressure=async_game.Backpressure.COALESCE)
+        self.add_players(3)
+        await self.play_calling_to_paying_out()
+        # Every ACTION_ON replaced the queued one. There was no queued
+        # PAYING_OUT to replace, and the HAND_STARTED wasn't dropped to make
+        # room for it, so it was dropped.
+        action_ons = [e for e in recorder.events
+                      if e.event_type == game.EventType.ACTION_ON]
+        queued = list(self.async_manager._queues[0].events)
+        self.assertEqual([game.EventType.HAND_STARTED, game.EventType.ACTION_ON],
+                         [e.event_type for e in queued])
+        self.assertIs(action_ons[-1], queued[1])
+        self.assertEqual(len(action_ons), self.async_manager.dropped(slow))
+
+    async def test_block(self):
+        slow = SlowListener(0.001)
+        self.async_manager.add_listener(slow, maxsize=1,
+                                        backpressure=async_game.Backpressure.BLOCK)
+        self.add_players(2)
+        await self.play_to_paying_out()
+        await self.async_manager.drain()
+        self.assertEqual(9, len(slow.events))
+        self.assertEqual(0, self.async_manager.dropped(slow))
+
+    async def test_run_in_executor(self):
+        recorder = game.RecordingListener()
+        self.async_manager.add_listener(recorder, run_in_executor=True)
+        self.add_players(2)
+        await self.async_manager.drain()
+        self.assertEqual(2, len(recorder.events))
+
+    async def test_listener_error(self):
+        class BadListener:
+            def notify(self, event):
+                raise RuntimeError("bad listener")
+        self.async_manager.add_listener(BadListener())
+        self.add_players(2)
+        with self.assertRaisesRegex(RuntimeError, "bad listener"):
+            await self.async_manager.drain()
+
+    async def test_blocking_listener_error(self):
+        class BadListener:
+            def __init__(self):
+                self.events = []
+
+            async def notify(self, event):
+                self.events.append(event)
+                if event.event_type == game.EventType.HAND_STARTED:
+                    raise RuntimeError("bad listener")
+        bad = BadListener()
+        self.async_manager.add_listener(bad, maxsize=1,
+                                        backpressure=async_game.Backpressure.BLOCK)
+        self.add_players(2)
+        # The game goes on once the listener is gone instead of waiting for
+        # room in its queue
+        await asyncio.wait_for(self.play_to_paying_out(), 5)
+        self.assertEqual(game.EventType.HAND_STARTED, bad.events[-1].event_type)
+        self.assertGreater(self.async_manager.dropped(bad), 0)
+        with self.assertRaisesRegex(RuntimeError, "bad listener"):
+            await self.async_manager.drain()
+
+    async def test_wrap_existing(self):
+        manager = game.Manager(game.Configuration())
+        async_manager = async_game.AsyncManager(manager=manager)
+        self.assertIs(manager, async_manager.manager)
+        with self.assertRaises(ValueError):
+            async_game.AsyncManager()
+        with self.assertRaises(ValueError):
+            async_game.AsyncManager(game.Configuration(), manager)
+
+
+if __name__ == '__main__':
+    unittest.main()
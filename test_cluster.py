@@ -0,0 +1,97 @@
+import asyncio
+import unittest
+
+import cluster
+import game
+import table_host
+
+
+class CheckCallBot:
+    """Cluster listener which checks or calls for every seat."""
+    def __init__(self, cluster):
+        self.cluster = cluster
+        self.paying_out = {}
+
+    def notify(self, table_id, event):
+        if event.event_type == game.EventType.PAYING_OUT:
+            self.paying_out.setdefault(table_id, []).append(event)
+        if event.event_type != game.EventType.ACTION_ON:
+            return
+        allowed = event.allowed
+        for action_type in [game.ActionType.CHECK, game.ActionType.CALL]:
+            if allowed.is_action_type_allowed(action_type):
+                self.cluster.submit_action(
+                    table_id, game.Action(allowed.player_idx, action_type))
+                return
+
+
+def limit_config():
+    return game.Configuration(max_players=3, game_type=game.GameType.LIMIT,
+                              limits=(10, 20), blinds=(5, 10))
+
+
+def players():
+    return [game.Player("name{}".format(idx), 1000) for idx in range(3)]
+
+
+class ShardOfTestCase(unittest.TestCase):
+    def test_stable(self):
+        self.assertEqual(cluster.shard_of("table1", 4), cluster.shard_of("table1", 4))
+        shards = set(cluster.shard_of("table{}".format(i), 4) for i in range(100))
+        self.assertEqual({0, 1, 2, 3}, shards)
+
+
+class ShardedClusterTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.cluster = cluster.ShardedCluster(num_workers=2)
+        await self.cluster.start()
+
+    async def asyncTearDown(self):
+        await self.cluster.close()
+
+    async def test_play(self):
+        bot = CheckCallBot(self.cluster)
+        self.cluster.add_listener(bot)
+        table_ids = ["table{}".format(i) for i in range(6)]
+        for table_id in table_ids:
+            await self.cluster.add_table(
+                table_id, limit_config(), players(), deck_seed=1,
+                event_types=[game.EventType.ACTION_ON, game.EventType.PAYING_OUT])
+            await self.cluster.start_table(table_id)
+
+        async def wait():
+            while (len(bot.paying_out) < len(table_ids) or
+                   min(len(e) for e in bot.paying_out.values()) < 3):
+                await asyncio.sleep(0.01)
+        await asyncio.wait_for(wait(), timeout=20)
+
+        for events in bot.paying_out.values():
+            for e in events:
+                self.assertEqual(0, sum(x for x in e.net_profit if x is not None))
+
+        stats = await self.cluster.stats()
+        self.assertEqual(6, stats["tables"])
+        self.assertGreaterEqual(stats["hands"], 18)
+        self.assertEqual(set(table_ids), set(stats["per_table"]))
+        self.assertEqual(2, len(stats["per_worker"]))
+
+    async def test_errors(self):
+        await self.cluster.add_table("t", limit_config(), players())
+        with self.assertRaises(ValueError):
+            await self.cluster.add_table("t", limit_config(), players())
+        with self.assertRaises(table_host.UnknownTableError):
+            await self.cluster.start_table("nope")
+        with self.assertRaises(game.ActionInWrongStateError):
+            await self.cluster.act("t", game.Action(0, game.ActionType.CHECK))
+
+        await self.cluster.add_table("empty", limit_config(), [])
+        with self.assertRaises(game.NotEnoughPlayersError):
+            await self.cluster.start_table("empty")
+
+        await self.cluster.remove_table("t")
+        with self.assertRaises(table_host.UnknownTableError):
+            await self.cluster.start_table("t")
+
+
+if __name__ == '__main__':
+    unittest.main()
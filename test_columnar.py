@@ -0,0 +1,129 @@
+import os
+import tempfile
+import unittest
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import history
+from test_replay import record_hands
+
+if np is not None:
+    import columnar
+
+
+@unittest.skipUnless(np is not None, "numpy is not installed")
+class ColumnarTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.config, cls.records = record_hands(250, 3, ante=1)
+        cls.data = history.encode_config(cls.config) + b"".join(
+            history.encode_hand(r) for r in cls.records)
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        history_path = os.path.join(self.dir.name, "hands.mphh")
+        with open(history_path, "wb") as f:
+            f.write(self.data)
+        self.path = os.path.join(self.dir.name, "columns")
+        self.assertEqual(250, columnar.export_history(history_path, self.path,
+                                                      chunk_size=100))
+        self.reader = columnar.ColumnReader(self.path)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def assertHand(self, columns, idx, record):
+        self.assertEqual(record.button_pos, columns["button_pos"][idx])
+        self.assertEqual(record.ante, columns["ante"][idx])
+        self.assertEqual([0 if s is None else s for s in record.stacks],
+                         list(columns["stacks"][idx]))
+        self.assertEqual(sum(1 << i for i, s in enumerate(record.stacks) if s is not None),
+                         columns["seat_mask"][idx])
+        self.assertEqual([[-1, -1] if c is None else c for c in record.hole_cards],
+                         columns["hole_cards"][idx].tolist())
+        self.assertEqual(record.board + [-1] * (5 - len(record.board)),
+                         columns["board"][idx].tolist())
+        self.assertEqual(record.showdown, columns["showdown"][idx])
+        self.assertEqual(sum(1 << i for i in record.winners), columns["winner_mask"][idx])
+        self.assertEqual([0 if w is None else w for w in record.pot_winnings],
+                         columns["pot_winnings"][idx].tolist())
+        self.assertEqual([0 if n is None else n for n in history.net_profit(record)],
+                         columns["net_profit"][idx].tolist())
+        self.assertEqual(history.HandRecord(0, [], actions=record.actions),
+                         history.HandRecord(0, [], actions=self.reader.actions(columns, idx)))
+
+    def test_export(self):
+        self.assertEqual(250, len(self.reader))
+        self.assertEqual(6, self.reader.config.max_players)
+        self.assertEqual(1, self.reader.config.ante)
+        chunks = list(self.reader.chunks())
+        self.assertEqual([0, 100, 200], [start for start, _ in chunks])
+        for start, chunk in chunks:
+            self.assertIsInstance(chunk["net_profit"], np.memmap)
+            for idx in range(len(chunk["button_pos"])):
+                self.assertHand(chunk, idx, self.records[start + idx])
+        # Chips only move between the players
+        total = sum(chunk["net_profit"].sum() for _, chunk in chunks)
+        self.assertEqual(0, total)
+
+    def test_read(self):
+        columns = self.reader.read(["board", "action_codes"], 90, 215)
+        self.assertEqual({"board", "action_codes", "action_offsets"}, set(columns))
+        self.assertEqual(125, len(columns["board"]))
+        self.assertEqual(0, columns["action_offsets"][0])
+        self.assertEqual(len(columns["action_codes"]), columns["action_offsets"][-1])
+        everything = self.reader.read(start=90, stop=215)
+        for idx in range(125):
+            self.assertHand(everything, idx, self.records[90 + idx])
+        self.assertEqual(250, len(self.reader.read(["showdown"])["showdown"]))
+        self.assertEqual(0, len(self.reader.read(["showdown"], 300)["showdown"]))
+        empty = self.reader.read(start=10, stop=5)
+        for name, array in empty.items():
+            # The same dtype and trailing shape as a non-empty result
+            self.assertEqual(everything[name].dtype, array.dtype)
+            self.assertEqual(everything[name].shape[1:], array.shape[1:])
+        self.assertEqual((0, 6, 2), empty["hole_cards"].shape)
+        self.assertEqual([0], empty["action_offsets"].tolist())
+        with self.assertRaises(ValueError):
+            self.reader.read(["nope"])
+
+    def test_filter(self):
+        # Hands where seat 0 was dealt a pair
+        def pocket_pair(chunk):
+            hole = chunk["hole_cards"][:, 0]
+            return (hole[:, 0] >= 0) & (hole[:, 0] % 13 == hole[:, 1] % 13)
+
+        expected = [idx for idx, r in enumerate(self.records)
+                    if r.hole_cards[0][0] % 13 == r.hole_cards[0][1] % 13]
+        self.assertTrue(expected)
+        result = self.reader.filter(pocket_pair)
+        self.assertEqual(expected, result["hand_idx"].tolist())
+        for n, idx in enumerate(expected):
+            self.assertHand(result, n, self.records[idx])
+        none = self.reader.filter(lambda chunk: np.zeros(len(chunk["ante"]), bool),
+                                  ["net_profit", "action_amounts"])
+        self.assertEqual((0, 6), none["net_profit"].shape)
+        self.assertEqual([0], none["action_offsets"].tolist())
+
+    def test_empty(self):
+        path = os.path.join(self.dir.name, "empty")
+        columnar.ColumnWriter(path, self.config).close()
+        reader = columnar.ColumnReader(path)
+        self.assertEqual(0, len(reader))
+        self.assertEqual([], list(reader.chunks()))
+        columns = reader.read()
+        self.assertEqual((0, 6), columns["stacks"].shape)
+        self.assertEqual(np.uint8, columns["action_codes"].dtype)
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            columnar.ColumnWriter(self.path, self.config)
+        with self.assertRaises(columnar.ColumnFormatError):
+            columnar.ColumnReader(self.dir.name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -92,6 +92,14 @@ class DeckTestCase(unittest.TestCase):
         self.assertEqual(deck.Card.from_str("Ac"), d.our_deck[0])
         self.assertEqual(deck.Card.from_str("As"), d.our_deck[1])
         self.assertEqual(deck.Card.from_str("Ad"), d.our_deck[2])
+
+    def test_fork(self):
+        d = deck.Deck()
+        d.deal(2)
+        forked = d.fork()
+        self.assertEqual("4c", str(forked.deal_one()))
+        self.assertEqual("5c", str(forked.deal_one()))
+        self.assertEqual("4c", str(d.deal_one()))
         
         
 if __name__ == '__main__':
@@ -1,9 +1,19 @@
+import contextlib
+import copy
+import pickle
+import random
 import unittest
+from unittest import mock
 
 import cards
 import deck
 import game
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 
 def in_order_deck_factory():
     return deck.Deck()
@@ -128,6 +138,29 @@ class AdvanceButtonTestCase(unittest.TestCase):
             self.manager._advance_button()
         self.assertIsNone(self.manager.button_pos)
 
+    def test_public(self):
+        with self.assertRaises(game.WrongStateError):
+            self.manager.advance_button()
+        self.manager.button_pos = 3
+        self.manager.state = game.GameState.PAYING_OUT
+        self.manager.advance_button()
+        self.assertEqual(7, self.manager.button_pos)
+
+
+class NextPositionTestCase(unittest.TestCase):
+    def test_next_set_bit_matches_list_version(self):
+        for mask in range(1 << 6):
+            valid_players = [bool(mask >> idx & 1) for idx in range(6)]
+            for current_pos in range(6):
+                if mask == 0:
+                    with self.assertRaises(game.NotEnoughPlayersError):
+                        game._next_set_bit(current_pos, mask)
+                    continue
+                self.assertEqual(
+                    game._next_valid_position(current_pos, valid_players),
+                    game._next_set_bit(current_pos, mask),
+                    (current_pos, valid_players))
+
 
 class MainStatesTestCase(unittest.TestCase):
     def setUp(self):
@@ -532,6 +565,104 @@ class MainStatesWithBettingTestCase(unittest.TestCase):
         self.assertEqual(990, self.manager.players[2].stack)
 
 
+class EventTestCase(unittest.TestCase):
+    def test_event_classes(self):
+        self.assertEqual(set(game.EventType), set(game.EVENT_CLASSES))
+        for event_type, cls in game.EVENT_CLASSES.items():
+            self.assertEqual(event_type, cls.event_type)
+            self.assertTrue(issubclass(cls, game.Event))
+            self.assertEqual(sorted(cls._fields), list(cls._fields))
+
+    def test_str(self):
+        self.assertEqual(
+            "Event(EventType.ANTE, amount=5, player_indices=[0, 2])",
+            str(game.AnteEvent(amount=5, player_indices=[0, 2])))
+        self.assertEqual(
+            "Event(EventType.WAITING_FOR_START, )",
+            str(game.WaitingForStartEvent()))
+
+    def test_slots(self):
+        event = game.ActionEvent(action=game.Action(0, game.ActionType.CHECK))
+        self.assertFalse(hasattr(event, "__dict__"))
+        with self.assertRaises(AttributeError):
+            event.other = 1
+
+
+class NoListenerTestCase(unittest.TestCase):
+    def test_no_events_built(self):
+        manager = game.Manager(game.Configuration(max_players=4,
+                                                  game_type=game.GameType.LIMIT,
+                                                  limits=[10,20],
+                                                  blinds=[5, 10],
+                                                  ante=1))
+        manager._deck_factory = in_order_deck_factory
+        with contextlib.ExitStack() as stack:
+            for cls in game.EVENT_CLASSES.values():
+                stack.enter_context(mock.patch.object(
+                    cls, "__init__", side_effect=AssertionError("Event built")))
+            for idx in range(3):
+                manager.add_player(game.Player("name{}".format(idx), 1000))
+            # Button will be advanced to 0
+            manager.button_pos = 2
+            manager.start_game()
+            manager.proceed()
+            check_call_all(manager)
+            while manager.state != game.GameState.PAYING_OUT:
+                manager.proceed()
+                check_call_all(manager)
+            removed = manager.remove_player(2)
+            manager.proceed()
+        self.assertEqual(game.GameState.PRE_DEAL, manager.state)
+        self.assertEqual(3000, removed.stack + sum(p.stack for p in manager.players if p is not None))
+
+
+class SubscriptionTestCase(unittest.TestCase):
+    def test_event_types(self):
+        manager = game.Manager(game.Configuration())
+        manager._deck_factory = in_order_deck_factory
+        everything = game.RecordingListener()
+        manager.add_listener(everything)
+        dealing = game.RecordingListener()
+        manager.add_listener(dealing, event_types=[game.EventType.FLOP_DEALT,
+                                                   game.EventType.TURN_DEALT,
+                                                   game.EventType.RIVER_DEALT])
+        nothing = game.RecordingListener()
+        manager.add_listener(nothing, event_types=[])
+
+        for idx in range(2):
+            manager.add_player(game.Player("name{}".format(idx), 1000))
+        manager.start_game()
+        while manager.state != game.GameState.PAYING_OUT:
+            manager.proceed()
+
+        self.assertEqual(
+            [game.EventType.PLAYER_ADDED,
+             game.EventType.PLAYER_ADDED,
+             game.EventType.HAND_STARTED,
+             game.EventType.HOLE_CARDS_DEALT,
+             game.EventType.FLOP_DEALT,
+             game.EventType.TURN_DEALT,
+             game.EventType.RIVER_DEALT,
+             game.EventType.SHOWDOWN,
+             game.EventType.PAYING_OUT],
+            [e.event_type for e in everything.events])
+        self.assertEqual(
+            [game.EventType.FLOP_DEALT,
+             game.EventType.TURN_DEALT,
+             game.EventType.RIVER_DEALT],
+            [e.event_type for e in dealing.events])
+        self.assertEqual([], nothing.events)
+
+    def test_unlistened_events_not_built(self):
+        manager = game.Manager(game.Configuration())
+        manager.add_listener(game.RecordingListener(),
+                             event_types=[game.EventType.PLAYER_ADDED])
+        with mock.patch.object(game.PlayerRemovedEvent, "__init__",
+                               side_effect=AssertionError("Event built")):
+            manager.add_player(game.Player("name0", 1000))
+            manager.remove_player(0)
+
+
 class AnteTestCase(unittest.TestCase):
     def setUp(self):
         self.manager = game.Manager(game.Configuration(ante=100))
@@ -733,6 +864,7 @@ class LimitBettingRoundTestCase(unittest.TestCase):
         self.assertEqual(500, self.manager.current_hand.pot)
         self.assertEqual([900, 800, None, 1000, 800], self.get_stacks())
         self.assertEqual([False, True, False, False, True], self.manager.current_hand.live_players())
+        self.assertEqual(2, self.manager.current_hand.num_live_players())
 
     def test_no_blinds_reraise(self):
         self.initialize(game.Configuration(
@@ -841,6 +973,255 @@ class LimitBettingRoundTestCase(unittest.TestCase):
             self.manager.act(game.Action(1, game.ActionType.RAISE, amount=999))
 
 
+class BettingBookkeepingTestCase(unittest.TestCase):
+    """Compares the running betting round bookkeeping with recomputing it."""
+
+    def assert_bookkeeping(self, hand):
+        live_outlay = [x for x, live in zip(hand.current_outlay, hand.live_players()) if live]
+        self.assertEqual(max(hand.current_outlay), hand._current_total_bet())
+        self.assertEqual(max(live_outlay) == min(live_outlay), hand._equal_outlay())
+        for idx in range(len(hand.players)):
+            acted = any(a.player_idx == idx and a.action_type != game.ActionType.BLIND_BET
+                        for a in hand.past_action)
+            self.assertEqual(acted, hand._has_acted(idx))
+
+    def test_random_hands(self):
+        rng = random.Random(42)
+        config = game.Configuration(
+            max_players=6, game_type=game.GameType.LIMIT, limits=(10, 20), blinds=(5, 10))
+        players = [game.Player("name{}".format(idx), 100000) for idx in range(6)]
+        players[3] = None
+        for button_pos in [0, 1, 2, 4, 5] * 20:
+            hand = game.Hand(config, players, button_pos, in_order_deck_factory)
+            for deal in [hand.deal_hole_cards, hand.deal_flop, hand.deal_turn, hand.deal_river]:
+                deal()
+                while hand.is_betting_active():
+                    self.assert_bookkeeping(hand)
+                    allowed = hand.allowed_action()
+                    action_type = rng.choice([a for a in game.ActionType
+                                              if allowed.is_action_type_allowed(a)])
+                    amount = None
+                    if action_type in [game.ActionType.BET, game.ActionType.RAISE]:
+                        amount = allowed.range_for_action(action_type)[0]
+                    hand.act(game.Action(allowed.player_idx, action_type, amount))
+                if hand.num_live_players() == 1:
+                    break
+
+
+class HandForkTestCase(unittest.TestCase):
+    def hand_state(self, hand):
+        return (
+            [(p.initial_stack, p.stack, p.hole_cards and str(p.hole_cards))
+             for p in hand.players if p is not None],
+            hand.pot, str(hand.board), hand.deck.next_card_idx, hand.action_on,
+            hand.live_players(),
+            hand.past_action and [(a.player_idx, a.action_type) for a in hand.past_action],
+            hand.past_action and list(hand.current_outlay),
+            hand.winners, hand.pot_winnings)
+
+    def play_out(self, hand, rng):
+        """Plays the rest of the hand with random actions."""
+        deals = [hand.deal_flop, hand.deal_turn, hand.deal_river, hand.showdown]
+        deals = deals[max(0, len(hand.board) - 2):]
+        while True:
+            while hand.is_betting_active():
+                allowed = hand.allowed_action()
+                action_type = rng.choice([a for a in game.ActionType
+                                          if allowed.is_action_type_allowed(a)])
+                amount = None
+                if action_type in [game.ActionType.BET, game.ActionType.RAISE]:
+                    amount = allowed.range_for_action(action_type)[0]
+                hand.act(game.Action(allowed.player_idx, action_type, amount))
+            if hand.num_live_players() == 1:
+                hand.early_win()
+                return
+            deal = deals.pop(0)
+            deal()
+            if deal == hand.showdown:
+                return
+
+    def test_fork_is_independent(self):
+        rng = random.Random(11)
+        config = game.Configuration(
+            max_players=6, game_type=game.GameType.LIMIT, limits=(10, 20), blinds=(5, 10))
+        players = [game.Player("name{}".format(idx), 1000) for idx in range(6)]
+        players[2] = None
+        for button_pos in [0, 1, 3, 4, 5] * 10:
+            deck_order = list(range(52))
+            rng.shuffle(deck_order)
+            hand = game.Hand(config, players, button_pos, lambda: deck.Deck(deck_order))
+            hand.deal_hole_cards()
+            for _ in range(rng.randrange(0, 10)):
+                if not hand.is_betting_active():
+                    break
+                allowed = hand.allowed_action()
+                hand.act(game.Action(allowed.player_idx, game.ActionType.CALL
+                                     if allowed.is_action_type_allowed(game.ActionType.CALL)
+                                     else game.ActionType.CHECK))
+            before = self.hand_state(hand)
+            forks = [hand.fork() for _ in range(3)]
+            self.assertEqual(before, self.hand_state(forks[0]))
+            seed = rng.random()
+            for forked in forks[:2]:
+                self.play_out(forked, random.Random(seed))
+            self.play_out(forks[2], rng)
+            # Forks don't change the original, and the same play gives the
+            # same result
+            self.assertEqual(before, self.hand_state(hand))
+            self.assertEqual(self.hand_state(forks[0]), self.hand_state(forks[1]))
+            self.assertIsNotNone(forks[0].winners)
+            # Playing the original the same way gives what the fork got
+            self.play_out(hand, random.Random(seed))
+            self.assertEqual(self.hand_state(forks[0]), self.hand_state(hand))
+        self.assertEqual([1000] * 5, [p.stack for p in players if p is not None])
+
+    def test_players_copied_on_write(self):
+        config = game.Configuration(
+            max_players=3, game_type=game.GameType.LIMIT, limits=(10, 20), blinds=(5, 10))
+        players = [game.Player("name{}".format(idx), 1000) for idx in range(3)]
+        hand = game.Hand(config, players, 0, in_order_deck_factory)
+        hand.deal_hole_cards()
+        forked = hand.fork()
+        self.assertEqual([True] * 3, [a is b for a, b in zip(hand.players, forked.players)])
+        self.assertIsNot(hand.deck, forked.deck)
+        self.assertIs(hand.deck.our_deck, forked.deck.our_deck)
+
+        forked.act(game.Action(0, game.ActionType.FOLD))
+        self.assertEqual([False, True, True],
+                         [a is b for a, b in zip(hand.players, forked.players)])
+        self.assertIsNone(forked.players[0].hole_cards)
+        self.assertIsNotNone(hand.players[0].hole_cards)
+
+        # The original copies on write too
+        hand.act(game.Action(0, game.ActionType.CALL))
+        self.assertEqual(990, hand.players[0].stack)
+        self.assertEqual(1000, forked.players[0].stack)
+        hand.act(game.Action(1, game.ActionType.CALL))
+        self.assertEqual(990, hand.players[1].stack)
+        self.assertEqual(995, forked.players[1].stack)
+        self.assertIs(hand.players[2], forked.players[2])
+
+
+class HandStateViewTestCase(unittest.TestCase):
+    def expected_state(self, hand):
+        """Builds the state buffer contents from the Hand's attributes."""
+        board = [c.card_idx for c in hand.board.cards]
+        state = [hand.button_pos,
+                 -1 if hand.action_on is None else hand.action_on,
+                 0 if hand.past_action is None else len(hand.past_action),
+                 sum(1 << idx for idx, live in enumerate(hand.live_players()) if live),
+                 hand.pot, len(board)]
+        state += board + [-1] * (5 - len(board))
+        for p in hand.players:
+            if p is None or p.hole_cards is None:
+                state += [-1, -1]
+            else:
+                state += [c.card_idx for c in p.hole_cards.cards]
+        state += [0 if p is None else p.stack for p in hand.players]
+        if hand.past_action is None:
+            state += [0] * len(hand.players)
+        else:
+            state += hand.current_outlay
+        return state
+
+    def make_hand(self, seed, ante=0):
+        rng = random.Random(seed)
+        config = game.Configuration(
+            max_players=6, game_type=game.GameType.LIMIT, ante=ante,
+            limits=(10, 20), blinds=(5, 10))
+        players = [game.Player("name{}".format(idx), 1000) for idx in range(6)]
+        players[4] = None
+        deck_order = list(range(52))
+        rng.shuffle(deck_order)
+        return game.Hand(config, players, 1, lambda: deck.Deck(deck_order)), rng
+
+    def play_checking(self, hand, rng):
+        """Plays the hand with random actions, checking the view at each step."""
+        view = hand.state_view()
+        for step in [hand.ante, hand.deal_hole_cards, hand.deal_flop,
+                     hand.deal_turn, hand.deal_river, hand.showdown]:
+            if hand.num_live_players() == 1:
+                hand.early_win()
+                break
+            step()
+            self.assertEqual(self.expected_state(hand), view.tolist())
+            while hand.is_betting_active():
+                allowed = hand.allowed_action()
+                action_type = rng.choice([a for a in game.ActionType
+                                          if allowed.is_action_type_allowed(a)])
+                amount = None
+                if action_type in [game.ActionType.BET, game.ActionType.RAISE]:
+                    amount = allowed.range_for_action(action_type)[0]
+                hand.act(game.Action(allowed.player_idx, action_type, amount))
+                self.assertEqual(self.expected_state(hand), view.tolist())
+        self.assertEqual(self.expected_state(hand), view.tolist())
+        self.assertIs(view, hand.state_view())
+
+    def test_view_follows_hand(self):
+        for seed in range(30):
+            hand, rng = self.make_hand(seed, ante=seed % 2)
+            self.play_checking(hand, rng)
+
+    def test_layout(self):
+        hand, _ = self.make_hand(0)
+        hand.deal_hole_cards()
+        view = hand.state_view()
+        layout = game.state_layout(6)
+        self.assertEqual(sum(length for _, length in layout.values()), len(view))
+        offset, length = layout["stacks"]
+        self.assertEqual([1000, 1000, 995, 990, 0, 1000],
+                         view[offset:offset + length].tolist())
+        offset, length = layout["outlays"]
+        self.assertEqual([0, 0, 5, 10, 0, 0], view[offset:offset + length].tolist())
+        offset, length = layout["hole_cards"]
+        self.assertEqual([-1, -1], view[offset + 8:offset + 10].tolist())
+        self.assertEqual("q", view.format)
+
+    def test_read_only(self):
+        hand, _ = self.make_hand(0)
+        view = hand.state_view()
+        with self.assertRaises(TypeError):
+            view[0] = 3
+
+    def test_fork_and_rebuild(self):
+        hand, _ = self.make_hand(1)
+        hand.deal_hole_cards()
+        hand.act(game.Action(5, game.ActionType.CALL))
+        before = hand.state_view().tolist()
+        forked = hand.fork()
+        self.assertEqual(before, forked.state_view().tolist())
+        forked.act(game.Action(0, game.ActionType.RAISE, 10))
+        forked.act(game.Action(1, game.ActionType.FOLD))
+        self.assertEqual(self.expected_state(forked), forked.state_view().tolist())
+        self.assertEqual(before, hand.state_view().tolist())
+
+        hand.__dict__.pop("_state")
+        hand._rebuild_state()
+        self.assertEqual(before, hand.state_view().tolist())
+
+    def test_pickle_and_deepcopy(self):
+        hand, _ = self.make_hand(3)
+        hand.deal_hole_cards()
+        before = hand.state_view().tolist()
+        for copied in [pickle.loads(pickle.dumps(hand)), copy.deepcopy(hand)]:
+            self.assertEqual(before, copied.state_view().tolist())
+            copied.act(game.Action(copied.action_on, game.ActionType.FOLD))
+            self.assertEqual(self.expected_state(copied),
+                             copied.state_view().tolist())
+            self.assertEqual(before, hand.state_view().tolist())
+
+    @unittest.skipUnless(np is not None, "needs numpy")
+    def test_numpy_view(self):
+        hand, _ = self.make_hand(2)
+        array = np.frombuffer(hand.state_view(), dtype=np.int64)
+        self.assertFalse(array.flags.writeable)
+        self.assertEqual(-1, array[game.STATE_ACTION_ON])
+        hand.deal_hole_cards()
+        # No copy: the array sees the hand change
+        self.assertEqual(hand.action_on, array[game.STATE_ACTION_ON])
+        self.assertEqual(hand.state_view().tolist(), array.tolist())
+
+
 class AllowedActionTestCase(unittest.TestCase):
     def initialize(self, config):
         self.manager = game.Manager(config)
@@ -890,6 +1271,10 @@ class AllowedActionTestCase(unittest.TestCase):
             allowed.range_for_action(game.ActionType.RAISE)
         self.assertEqual((10, 20), allowed.range_for_action(game.ActionType.BET))
         self.assertEqual((5, 5), allowed.range_for_action(game.ActionType.CALL))
+        self.assertEqual([(game.ActionType.CHECK, None),
+                          (game.ActionType.BET, (10, 20)),
+                          (game.ActionType.CALL, (5, 5))],
+                         list(allowed.action_ranges()))
 
         with self.assertRaises(game.ActionOutOfTurnError):
             allowed.check_action(game.Action(0, game.ActionType.CHECK))
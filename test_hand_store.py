@@ -0,0 +1,146 @@
+import io
+import os
+import random
+import sqlite3
+import tempfile
+import unittest
+
+import cards
+import game
+import hand_store
+import history
+from deck import shuffled_deck_factory
+from test_history import play_random_hands
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        self.now += 1
+        return self.now
+
+
+class ShowdownRecorder:
+    def __init__(self, manager):
+        self.manager = manager
+        self.showdowns = []
+
+    def notify(self, event):
+        names = [None if p is None else p.base_player.name
+                 for p in self.manager.current_hand.players]
+        for seat, rank in enumerate(event.ranks):
+            if rank[0] != cards.HandRank.NO_HAND:
+                self.showdowns.append((names[seat], rank[0], seat in event.winners))
+
+
+class HandStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "hands.db")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def play(self, store, num_hands, seed=1, num_players=5):
+        rng = random.Random(seed)
+        manager = game.Manager(game.Configuration(
+            max_players=6, game_type=game.GameType.LIMIT, ante=1,
+            limits=(10, 20), blinds=(5, 10)))
+        manager._deck_factory = shuffled_deck_factory(rng)
+        for idx in range(num_players):
+            manager.add_player(game.Player("name{}".format(idx), 10**6))
+        f = io.BytesIO()
+        history_writer = history.HandHistoryWriter(manager, f)
+        manager.add_listener(history_writer,
+                             event_types=history.HandHistoryWriter.EVENT_TYPES)
+        writer = hand_store.HandStoreWriter(manager, store, table_id=7,
+                                            clock=Clock())
+        manager.add_listener(writer, event_types=writer.EVENT_TYPES)
+        showdowns = ShowdownRecorder(manager)
+        manager.add_listener(showdowns, event_types=[game.EventType.SHOWDOWN])
+        manager.start_game()
+        play_random_hands(manager, num_hands, rng)
+        history_writer.flush()
+        _, records = history.read_hand_histories(f.getvalue())
+        return manager, list(records), showdowns.showdowns
+
+    def test_round_trip(self):
+        with hand_store.HandStore(self.path, batch_size=16) as store:
+            manager, records, _ = self.play(store, 50)
+            self.assertEqual(48, store.hands_written)
+            store.flush()
+            self.assertEqual(50, store.num_hands())
+            for hand_id, expected in enumerate(records, 1):
+                record, names = store.hand(hand_id)
+                self.assertEqual(expected, record, hand_id)
+                self.assertEqual(["name0", "name1", "name2", "name3", "name4", None],
+                                 names)
+            self.assertIsNone(store.hand(51))
+            for player in manager.players[:5]:
+                self.assertEqual((50, player.stack - 10**6),
+                                 store.player_totals(player.name))
+
+    def test_wal(self):
+        store = hand_store.HandStore(self.path)
+        self.play(store, 3)
+        store.close()
+        conn = sqlite3.connect(self.path)
+        self.assertEqual("wal", conn.execute("PRAGMA journal_mode").fetchone()[0])
+        self.assertEqual(3, conn.execute("SELECT COUNT(*) FROM hands").fetchone()[0])
+        conn.close()
+
+    def test_reopen(self):
+        with hand_store.HandStore(self.path) as store:
+            self.play(store, 5)
+        with hand_store.HandStore(self.path) as store:
+            self.play(store, 5, seed=2, num_players=6)
+            store.flush()
+            self.assertEqual(list(range(1, 11)), store.find_hands(player="name0"))
+            self.assertEqual(list(range(6, 11)), store.find_hands(player="name5"))
+            self.assertEqual(6, len(store._player_ids))
+
+    def test_showdowns(self):
+        with hand_store.HandStore(":memory:") as store:
+            _, records, expected = self.play(store, 200)
+            store.flush()
+            for name in ["name0", "name3", "nobody"]:
+                got = store.showdowns(name)
+                self.assertEqual([(rank, won) for n, rank, won in expected if n == name],
+                                 [(s.hand_rank, s.won) for s in got])
+                for s in got:
+                    record = records[s.hand_id - 1]
+                    self.assertTrue(record.showdown)
+                    self.assertEqual(record.hole_cards[s.seat], s.hole_cards)
+                    self.assertEqual(record.board, s.board)
+            flushes = store.showdowns("name0", min_rank=cards.HandRank.FLUSH)
+            self.assertEqual([r for n, r, _ in expected
+                              if n == "name0" and r.value >= cards.HandRank.FLUSH.value],
+                             [s.hand_rank for s in flushes])
+            pairs = store.showdowns("name0", min_rank=cards.HandRank.ONE_PAIR,
+                                    max_rank=cards.HandRank.ONE_PAIR)
+            self.assertTrue(pairs)
+            self.assertTrue(all(s.hand_rank == cards.HandRank.ONE_PAIR for s in pairs))
+
+    def test_find_hands(self):
+        with hand_store.HandStore(":memory:") as store:
+            _, records, _ = self.play(store, 40)
+            store.flush()
+            pots = [sum(w for w in r.pot_winnings if w) for r in records]
+            # The clock starts at 1001 and ticks once per hand
+            self.assertEqual(list(range(11, 21)),
+                             store.find_hands(since=1011, until=1021))
+            self.assertEqual([idx + 1 for idx, pot in enumerate(pots) if pot >= 60],
+                             store.find_hands(min_pot=60))
+            self.assertEqual([idx + 1 for idx, pot in enumerate(pots) if 20 <= pot <= 30],
+                             store.find_hands(min_pot=20, max_pot=30))
+            self.assertEqual([idx + 1 for idx, r in enumerate(records) if r.showdown],
+                             store.find_hands(showdown=True, table_id=7))
+            self.assertEqual([], store.find_hands(table_id=8))
+            self.assertEqual([1, 2, 3], store.find_hands(player="name1", limit=3))
+            self.assertEqual([], store.find_hands(player="nobody"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,208 @@
+import io
+import random
+import unittest
+
+import deck
+import game
+import history
+
+
+def play_random_hands(manager, num_hands, rng):
+    """Plays num_hands with random allowed actions."""
+    hands = 0
+    while hands < num_hands:
+        hand = manager.current_hand
+        if hand is not None and hand.is_betting_active():
+            allowed = hand.allowed_action()
+            action_type = rng.choice([a for a in game.ActionType
+                                      if allowed.is_action_type_allowed(a)])
+            amount = None
+            if action_type in [game.ActionType.BET, game.ActionType.RAISE]:
+                amount = allowed.range_for_action(action_type)[0]
+            manager.act(game.Action(allowed.player_idx, action_type, amount))
+            continue
+        manager.proceed()
+        if manager.state == game.GameState.PAYING_OUT:
+            hands += 1
+
+
+class VarintTestCase(unittest.TestCase):
+    def test_round_trip(self):
+        for value in [0, 1, 127, 128, 300, 2**32, 10**18]:
+            buf = bytearray()
+            history.put_varint(buf, value)
+            self.assertEqual((value, len(buf)), history.get_varint(buf, 0))
+        self.assertEqual(1, len(bytearray([0])))
+
+    def test_zigzag(self):
+        for value in [0, 1, -1, 2, -2, 1000, -1000]:
+            self.assertEqual(value, history.unzigzag(history.zigzag(value)))
+            self.assertGreaterEqual(history.zigzag(value), 0)
+
+
+class ActionCodecTestCase(unittest.TestCase):
+    def test_round_trip(self):
+        actions = [game.Action(15, game.ActionType.RAISE, 300),
+                   game.Action(0, game.ActionType.FOLD),
+                   game.Action(3, game.ActionType.BLIND_BET, 5)]
+        buf = bytearray()
+        for action in actions:
+            history.put_action(buf, action)
+        history.put_actions(buf, actions)
+        pos = 0
+        decoded = []
+        for _ in actions:
+            action, pos = history.get_action(buf, pos)
+            decoded.append(action)
+        decoded_list, pos = history.get_actions(buf, pos)
+        self.assertEqual(len(buf), pos)
+        for got in [decoded, decoded_list]:
+            self.assertEqual(
+                [(a.player_idx, a.action_type, getattr(a, "amount", None))
+                 for a in actions],
+                [(a.player_idx, a.action_type, getattr(a, "amount", None))
+                 for a in got])
+        self.assertEqual(0x3f, history.action_code(actions[0]))
+        self.assertTrue(history.code_has_amount(0x3f))
+        self.assertFalse(history.code_has_amount(history.action_code(actions[1])))
+
+    def test_seat_too_large(self):
+        action = game.Action(16, game.ActionType.CALL)
+        with self.assertRaises(ValueError):
+            history.action_code(action)
+        with self.assertRaises(ValueError):
+            history.put_action(bytearray(), action)
+        with self.assertRaises(ValueError):
+            history.put_actions(bytearray(), [action])
+
+
+class ConfigTestCase(unittest.TestCase):
+    def test_round_trip(self):
+        for config in [game.Configuration(),
+                       game.Configuration(max_players=6, game_type=game.GameType.LIMIT,
+                                          ante=3, blinds=[5, 10], limits=(10, 20))]:
+            data = history.encode_config(config)
+            decoded, pos = history.decode_config(data)
+            self.assertEqual(len(data), pos)
+            for attr in ["max_players", "game_type", "ante", "blinds"]:
+                self.assertEqual(getattr(config, attr), getattr(decoded, attr))
+            self.assertEqual(config.limits and tuple(config.limits), decoded.limits)
+
+    def test_errors(self):
+        with self.assertRaises(history.HandHistoryFormatError):
+            history.decode_config(b"XXXX\x01")
+        with self.assertRaises(history.HandHistoryFormatError):
+            history.decode_config(b"MPHH\x63")
+        with self.assertRaises(ValueError):
+            history.encode_config(game.Configuration(max_players=17))
+
+
+class HandRecordTestCase(unittest.TestCase):
+    def test_round_trip(self):
+        record = history.HandRecord(
+            button_pos=3,
+            stacks=[1000, None, -50, 10**9, None],
+            ante=1,
+            hole_cards=[[0, 51], None, [12, 13], [50, 49], None],
+            board=[1, 2, 3, 4, 5],
+            actions=[game.Action(0, game.ActionType.BLIND_BET, 5),
+                     game.Action(2, game.ActionType.BLIND_BET, 10),
+                     game.Action(3, game.ActionType.RAISE, 10),
+                     game.Action(0, game.ActionType.FOLD),
+                     game.Action(2, game.ActionType.CALL),
+                     game.Action(2, game.ActionType.CHECK),
+                     game.Action(3, game.ActionType.BET, 1000)],
+            showdown=True,
+            winners=[2, 3],
+            pot_winnings=[0, None, 20, 21, None])
+        data = history.encode_hand(record)
+        decoded, pos = history.decode_hand(data, 5)
+        self.assertEqual(len(data), pos)
+        self.assertEqual(record, decoded, "{}\n{}".format(record, decoded))
+
+
+class HandHistoryWriterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.rng = random.Random(7)
+        self.manager = game.Manager(game.Configuration(
+            max_players=6, game_type=game.GameType.LIMIT, limits=(10, 20), blinds=(5, 10)))
+        self.manager._deck_factory = deck.shuffled_deck_factory(self.rng)
+        for idx in range(6):
+            self.manager.add_player(game.Player("name{}".format(idx), 1000))
+        self.manager.button_pos = 5
+        self.recorder = game.RecordingListener()
+        self.manager.add_listener(self.recorder,
+                                  event_types=[game.EventType.PAYING_OUT])
+
+    def test_write_and_read(self):
+        f = io.BytesIO()
+        writer = history.HandHistoryWriter(self.manager, f, buffer_size=256)
+        self.manager.add_listener(writer, event_types=history.HandHistoryWriter.EVENT_TYPES)
+        self.manager.start_game()
+        play_random_hands(self.manager, 200, self.rng)
+        writer.flush()
+        self.assertEqual(200, writer.hands_written)
+
+        config, records = history.read_hand_histories(f.getvalue())
+        self.assertEqual(6, config.max_players)
+        self.assertEqual(game.GameType.LIMIT, config.game_type)
+        records = list(records)
+        self.assertEqual(200, len(records))
+
+        paid = [e for e in self.recorder.events
+                if e.event_type == game.EventType.PAYING_OUT]
+        for record, paying_out in zip(records, paid):
+            self.assertEqual(paying_out.pot_winnings, record.pot_winnings)
+            self.assertEqual(paying_out.net_profit, history.net_profit(record))
+            self.assertEqual(sum(x for x in record.pot_winnings if x is not None),
+                             sum(record.pot_winnings[idx] for idx in record.winners))
+            self.assertEqual(2, len(record.actions) - len(
+                [a for a in record.actions if a.action_type != game.ActionType.BLIND_BET]))
+            self.assertIn(len(record.board), [0, 3, 4, 5])
+        # The button is advanced from 5 to 0 on start_game
+        self.assertEqual(0, records[0].button_pos)
+        self.assertEqual([1000] * 6, records[0].stacks)
+
+        # Average size of a hand should be well under 100 bytes
+        header_size = len(history.encode_config(self.manager.config))
+        self.assertLess((len(f.getvalue()) - header_size) / 200, 100)
+
+    def test_net_profit(self):
+        rng = random.Random(11)
+        manager = game.Manager(game.Configuration(
+            max_players=5, game_type=game.GameType.LIMIT, ante=2,
+            limits=(10, 20), blinds=(5, 10)))
+        manager._deck_factory = deck.shuffled_deck_factory(rng)
+        for idx in range(3):
+            manager.add_player(game.Player("name{}".format(idx), 1000))
+        f = io.BytesIO()
+        writer = history.HandHistoryWriter(manager, f)
+        manager.add_listener(writer, event_types=history.HandHistoryWriter.EVENT_TYPES)
+        recorder = game.RecordingListener()
+        manager.add_listener(recorder, event_types=[game.EventType.PAYING_OUT])
+        manager.start_game()
+        play_random_hands(manager, 300, rng)
+        writer.flush()
+        _, records = history.read_hand_histories(f.getvalue())
+        self.assertEqual([e.net_profit for e in recorder.events],
+                         [history.net_profit(r) for r in records])
+
+    def test_append(self):
+        f = io.BytesIO()
+        writer = history.HandHistoryWriter(self.manager, f)
+        self.manager.add_listener(writer, event_types=history.HandHistoryWriter.EVENT_TYPES)
+        self.manager.start_game()
+        play_random_hands(self.manager, 3, self.rng)
+        writer.flush()
+        # A second writer on the same file continues it without a new header
+        writer2 = history.HandHistoryWriter(self.manager, f)
+        self.manager.add_listener(writer2, event_types=history.HandHistoryWriter.EVENT_TYPES)
+        play_random_hands(self.manager, 3, self.rng)
+        writer.flush()
+        writer2.flush()
+        _, records = history.read_hand_histories(f.getvalue())
+        self.assertEqual(3 + 3 + 3, len(list(records)))
+
+
+if __name__ == '__main__':
+    unittest.main()
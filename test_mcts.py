@@ -0,0 +1,99 @@
+import random
+import time
+import unittest
+
+import deck
+import game
+import mcts
+
+
+def make_hand(top_cards, num_players=6):
+    """Returns a limit hand with hole cards dealt, first to act at seat 3."""
+    config = game.Configuration(max_players=num_players, game_type=game.GameType.LIMIT,
+                                limits=(10, 20), blinds=(5, 10))
+    players = [game.Player("name{}".format(idx), 1000) for idx in range(num_players)]
+    hand = game.Hand(config, players, 0,
+                     lambda: deck.Deck.from_initial_cards_str(top_cards))
+    hand.deal_hole_cards()
+    return hand
+
+
+# Seat 3 gets the 7th and 8th cards
+ACES = "2c 7d 3h 9s 4c 8h Ac As"
+SEVEN_TWO = "Ac As Kh Ks Qc Qh 7d 2c"
+
+
+class SearchTestCase(unittest.TestCase):
+    def test_original_unchanged(self):
+        hand = make_hand(ACES)
+        before = [p.stack for p in hand.players] + [hand.pot, hand.action_on]
+        iterations, stats = mcts.search(hand, max_iterations=200, seed=1)
+        self.assertEqual(200, iterations)
+        self.assertEqual(before, [p.stack for p in hand.players] + [hand.pot, hand.action_on])
+        self.assertEqual("Ac As", str(hand.players[3].hole_cards))
+        # Every allowed action was tried and all iterations are accounted for
+        self.assertEqual({game.ActionType.CALL.value, game.ActionType.RAISE.value,
+                          game.ActionType.FOLD.value}, set(stats))
+        self.assertEqual(200, sum(visits for visits, _ in stats.values()))
+
+    def test_deterministic(self):
+        hand = make_hand(ACES)
+        self.assertEqual(mcts.search(hand, max_iterations=100, seed=5),
+                         mcts.search(hand, max_iterations=100, seed=5))
+
+    def test_time_budget(self):
+        hand = make_hand(ACES)
+        start = time.monotonic()
+        iterations, _ = mcts.search(hand, time_budget=0.2, seed=1)
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertGreater(iterations, 0)
+        with self.assertRaises(ValueError):
+            mcts.search(hand)
+
+    def test_after_flop(self):
+        hand = make_hand(ACES + " Ad 2h 3d Kd")
+        while hand.is_betting_active():
+            allowed = hand.allowed_action()
+            hand.act(game.Action(allowed.player_idx, game.ActionType.CALL
+                                 if allowed.is_action_type_allowed(game.ActionType.CALL)
+                                 else game.ActionType.CHECK))
+        hand.deal_flop()
+        _, stats = mcts.search(hand, max_iterations=100, seed=2)
+        self.assertIn(game.ActionType.CHECK.value, stats)
+        self.assertIn(game.ActionType.BET.value, stats)
+
+
+class MCTSBotTestCase(unittest.TestCase):
+    def test_in_process(self):
+        bot = mcts.MCTSBot(time_budget=10, processes=1, seed=1)
+        hand = make_hand(ACES)
+        action = bot.choose_action(hand, max_iterations=1500)
+        self.assertEqual(3, action.player_idx)
+        self.assertNotEqual(game.ActionType.FOLD, action.action_type)
+        self.assertEqual(1500, bot.last_iterations)
+
+        hand = make_hand(SEVEN_TWO)
+        action = bot.choose_action(hand, max_iterations=1500)
+        self.assertEqual(game.ActionType.FOLD, action.action_type)
+        hand.act(action)
+
+    def test_not_limit(self):
+        bot = mcts.MCTSBot(processes=1)
+        hand = make_hand(ACES)
+        hand.config = game.Configuration(max_players=6)
+        with self.assertRaises(ValueError):
+            bot.search(hand)
+
+    def test_process_pool(self):
+        with mcts.MCTSBot(time_budget=0.3, processes=2, seed=1) as bot:
+            hand = make_hand(ACES)
+            stats = bot.search(hand)
+            self.assertEqual(2, bot.processes)
+            self.assertEqual(bot.last_iterations,
+                             sum(visits for visits, _ in stats.values()))
+            action = bot.choose_action(hand)
+            hand.act(action)
+
+
+if __name__ == '__main__':
+    unittest.main()
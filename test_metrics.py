@@ -0,0 +1,124 @@
+import asyncio
+import unittest
+import urllib.error
+import urllib.request
+
+import game
+import metrics
+import table_host
+from test_history import play_random_hands
+from test_stats import make_manager
+
+
+class RegistryTestCase(unittest.TestCase):
+    def test_render(self):
+        registry = metrics.Registry()
+        registry.counter("requests", "Requests served").inc(3)
+        registry.gauge("depth", labels={"queue": 'a"b'}).set(7)
+        histogram = registry.histogram("latency", "Latency", buckets=(0.1, 1))
+        for value in [0.05, 0.1, 0.5, 2]:
+            histogram.observe(value)
+        self.assertEqual(
+            "# HELP requests Requests served\n"
+            "# TYPE requests counter\n"
+            "requests_total 3\n"
+            "# TYPE depth gauge\n"
+            'depth{queue="a\\"b"} 7\n'
+            "# HELP latency Latency\n"
+            "# TYPE latency histogram\n"
+            'latency_bucket{le="0.1"} 2\n'
+            'latency_bucket{le="1"} 3\n'
+            'latency_bucket{le="+Inf"} 4\n'
+            "latency_sum 2.65\n"
+            "latency_count 4\n",
+            registry.render())
+
+    def test_same_metric(self):
+        registry = metrics.Registry()
+        self.assertIs(registry.counter("c"), registry.counter("c"))
+        self.assertIsNot(registry.counter("c", labels={"a": 1}),
+                         registry.counter("c", labels={"a": 2}))
+        with self.assertRaises(ValueError):
+            registry.gauge("c")
+
+    def test_gauge_function(self):
+        registry = metrics.Registry()
+        items = [1, 2]
+        registry.gauge("items").set_function(lambda: len(items))
+        items.append(3)
+        self.assertIn("items 3\n", registry.render())
+
+
+class InstrumentTestCase(unittest.TestCase):
+    def test_manager(self):
+        manager, rng = make_manager(1)
+        registry = metrics.Registry()
+        m = metrics.instrument(manager, registry)
+        recorder = game.RecordingListener()
+        manager.add_listener(recorder)
+        manager.start_game()
+        play_random_hands(manager, 200, rng)
+
+        self.assertEqual(200, m.hands_completed.value)
+        self.assertEqual(200, m.hands_started.value)
+        actions = [e for e in recorder.events if e.event_type == game.EventType.ACTION
+                   and e.action.action_type != game.ActionType.BLIND_BET]
+        self.assertEqual(len(actions), m.act_seconds.count())
+        self.assertEqual(len(recorder.events), m.notify_seconds.count())
+        self.assertEqual(200, m.proceed_seconds[game.GameState.PRE_DEAL].count())
+        showdowns = [e for e in recorder.events
+                     if e.event_type == game.EventType.SHOWDOWN]
+        self.assertTrue(showdowns)
+        self.assertGreaterEqual(m.proceed_seconds[game.GameState.RIVER_DEALT].count(),
+                                len(showdowns))
+        self.assertEqual(sum(sum(1 for r in e.ranks if r[0] != game.cards.HandRank.NO_HAND)
+                             for e in showdowns), m.evaluator_calls.value)
+        self.assertGreater(m.act_seconds.sum, 0)
+
+        with self.assertRaises(game.InvalidActionError):
+            manager.act(game.Action(0, game.ActionType.RAISE, 1))
+        self.assertEqual(1, m.errors.value)
+
+    def test_shared_registry(self):
+        registry = metrics.Registry()
+        for seed in range(2):
+            manager, rng = make_manager(seed)
+            metrics.instrument(manager, registry)
+            manager.start_game()
+            play_random_hands(manager, 10, rng)
+        self.assertIn("mppoker_hands_completed_total 20\n", registry.render())
+
+    def test_table_host(self):
+        registry = metrics.Registry()
+        host = table_host.TableHost()
+        metrics.instrument_table_host(host, registry)
+        host.add_table(1, game.Configuration(max_players=2))
+        text = registry.render()
+        self.assertIn("mppoker_tables 1\n", text)
+        self.assertIn("mppoker_pending_actions 0\n", text)
+
+        async def submit():
+            host.submit_action(1, game.Action(0, game.ActionType.CHECK))
+            return registry.render()
+        self.assertIn("mppoker_pending_actions 1\n", asyncio.run(submit()))
+
+
+class MetricsServerTestCase(unittest.TestCase):
+    def test_scrape(self):
+        registry = metrics.Registry()
+        counter = registry.counter("hands")
+        with metrics.MetricsServer(registry) as server:
+            url = "http://127.0.0.1:{}/metrics".format(server.port)
+            counter.inc(5)
+            with urllib.request.urlopen(url, timeout=10) as response:
+                self.assertEqual(metrics.CONTENT_TYPE,
+                                 response.headers["Content-Type"])
+                self.assertIn("hands_total 5\n", response.read().decode())
+            with self.assertRaises(urllib.error.HTTPError) as cm:
+                urllib.request.urlopen(
+                    "http://127.0.0.1:{}/other".format(server.port), timeout=10)
+            self.assertEqual(404, cm.exception.code)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import io
+import os
+import random
+import tempfile
+import unittest
+
+import game
+import history
+import replay
+from deck import shuffled_deck_factory
+from test_history import play_random_hands
+
+
+def record_hands(num_hands, seed, max_players=6, ante=0):
+    """Plays random hands and returns (config, list of HandRecord)."""
+    rng = random.Random(seed)
+    manager = game.Manager(game.Configuration(
+        max_players=max_players, game_type=game.GameType.LIMIT, ante=ante,
+        limits=(10, 20), blinds=(5, 10)))
+    manager._deck_factory = shuffled_deck_factory(rng)
+    for idx in range(max_players - 1):
+        manager.add_player(game.Player("name{}".format(idx), 1000))
+    manager.button_pos = 0
+    f = io.BytesIO()
+    writer = history.HandHistoryWriter(manager, f)
+    manager.add_listener(writer, event_types=history.HandHistoryWriter.EVENT_TYPES)
+    manager.start_game()
+    play_random_hands(manager, num_hands, rng)
+    writer.flush()
+    config, records = history.read_hand_histories(f.getvalue())
+    return config, list(records)
+
+
+class DeckOrderTestCase(unittest.TestCase):
+    def test_order(self):
+        record = history.HandRecord(
+            button_pos=0, stacks=[100, None, 100],
+            hole_cards=[[10, 11], None, [20, 21]], board=[1, 2, 3, 4])
+        order = replay.deck_order(record)
+        self.assertEqual([10, 11, 20, 21, 1, 2, 3, 4], order[:8])
+        self.assertEqual(list(range(52)), sorted(order))
+
+
+class ReplayTestCase(unittest.TestCase):
+    def test_replay_matches(self):
+        config, records = record_hands(300, seed=3, ante=1)
+        self.assertTrue(any(r.showdown for r in records))
+        self.assertTrue(any(not r.showdown for r in records))
+        result = replay.replay_records(config, records, replay.ReplayResult("x"))
+        self.assertEqual(300, result.hands)
+        self.assertEqual([], [str(m) for m in result.mismatches])
+        self.assertTrue(result.ok())
+
+    def test_wrong_winnings(self):
+        config, records = record_hands(20, seed=4)
+        record = records[5]
+        winner = record.winners[0]
+        record.pot_winnings[winner] += 1
+        mismatches, _ = replay.check_hand(config, record, 5)
+        self.assertEqual(["pot_winnings"], [m.field for m in mismatches])
+        self.assertEqual(5, mismatches[0].hand_idx)
+
+    def test_wrong_winners(self):
+        config, records = record_hands(50, seed=5)
+        record = next(r for r in records if r.showdown and len(r.winners) == 1)
+        loser = next(idx for idx, cards in enumerate(record.hole_cards)
+                     if cards is not None and idx not in record.winners)
+        record.winners = [loser]
+        mismatches, _ = replay.check_hand(config, record)
+        self.assertEqual(["winners"], [m.field for m in mismatches])
+
+    def test_bad_actions(self):
+        config, records = record_hands(20, seed=6)
+        record = records[0]
+        del record.actions[-1]
+        mismatches, final_stacks = replay.check_hand(config, record)
+        self.assertEqual(["error"], [m.field for m in mismatches])
+        self.assertIsNone(final_stacks)
+
+        record = records[1]
+        record.actions.append(game.Action(0, game.ActionType.CHECK))
+        mismatches, _ = replay.check_hand(config, record)
+        self.assertEqual(["error"], [m.field for m in mismatches])
+
+    def test_stack_continuity(self):
+        config, records = record_hands(20, seed=7)
+        seat = next(idx for idx, s in enumerate(records[10].stacks) if s is not None)
+        records[10].stacks[seat] += 100
+        result = replay.replay_records(config, records, replay.ReplayResult("x"))
+        self.assertIn("stacks", [m.field for m in result.mismatches])
+        self.assertEqual(10, result.mismatches[0].hand_idx)
+
+    def test_max_mismatches(self):
+        config, records = record_hands(20, seed=8)
+        for record in records:
+            record.pot_winnings = [None] * len(record.stacks)
+        result = replay.replay_records(config, records, replay.ReplayResult("x"),
+                                       max_mismatches=3)
+        self.assertEqual(20, result.num_mismatches)
+        self.assertEqual(3, len(result.mismatches))
+
+
+class ReplayFilesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.paths = []
+        for seed in range(3):
+            config, records = record_hands(30, seed=seed)
+            path = os.path.join(self.tmpdir.name, "{}.mphh".format(seed))
+            with open(path, "wb") as f:
+                f.write(history.encode_config(config))
+                for record in records:
+                    f.write(history.encode_hand(record))
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_in_process(self):
+        results = list(replay.replay_files(self.paths, processes=1))
+        self.assertEqual(self.paths, [r.path for r in results])
+        self.assertEqual([30] * 3, [r.hands for r in results])
+        self.assertTrue(all(r.ok() for r in results))
+
+    def test_process_pool(self):
+        results = list(replay.replay_files(self.paths, processes=2))
+        self.assertEqual(sorted(self.paths), sorted(r.path for r in results))
+        self.assertEqual([30] * 3, [r.hands for r in results])
+        self.assertTrue(all(r.ok() for r in results))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,214 @@
+import asyncio
+import json
+import unittest
+
+import cards
+import deck
+import game
+import loadgen
+import server
+
+
+def limit_config(max_players=3):
+    return game.Configuration(max_players=max_players, game_type=game.GameType.LIMIT,
+                              limits=(10, 20), blinds=(5, 10))
+
+
+class Client:
+    """A raw protocol client for the tests."""
+
+    async def connect(self, port):
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+
+    def send(self, message):
+        self.writer.write(json.dumps(message).encode() + b"\n")
+
+    async def receive(self):
+        line = await asyncio.wait_for(self.reader.readline(), timeout=5)
+        return json.loads(line)
+
+    async def receive_until(self, predicate):
+        while True:
+            message = await self.receive()
+            if predicate(message):
+                return message
+
+    async def wait_for_turn(self, seat):
+        return await self.receive_until(
+            lambda m: m.get("event") == "ACTION_ON" and m["seat"] == seat)
+
+    def close(self):
+        self.writer.close()
+
+
+class EventToJsonTestCase(unittest.TestCase):
+    def test_hole_cards_hidden(self):
+        event = game.HoleCardsDealtEvent(cards=[
+            cards.PlayerCards.from_str("Ah Kd"), None,
+            cards.PlayerCards.from_str("2c 3c")])
+        self.assertEqual({"event": "HOLE_CARDS_DEALT", "cards": [["Ah", "Kd"], None, []]},
+                         server.event_to_json(event, 0))
+        self.assertEqual([[], None, ["2c", "3c"]], server.event_to_json(event, 2)["cards"])
+        self.assertEqual([[], None, []], server.event_to_json(event)["cards"])
+
+    def test_other_events(self):
+        self.assertEqual(
+            {"event": "ACTION", "action": {"seat": 1, "type": "RAISE", "amount": 10}},
+            server.event_to_json(game.ActionEvent(game.Action(1, game.ActionType.RAISE, 10))))
+        self.assertEqual(
+            {"event": "ACTION", "action": {"seat": 1, "type": "FOLD"}},
+            server.event_to_json(game.ActionEvent(game.Action(1, game.ActionType.FOLD))))
+        allowed = game.AllowedAction(2, {game.ActionType.CALL: (5, 5),
+                                         game.ActionType.FOLD: None})
+        self.assertEqual(
+            {"event": "ACTION_ON", "seat": 2, "allowed": {"CALL": [5, 5], "FOLD": None}},
+            server.event_to_json(game.ActionOnEvent(hand_player=None, allowed=allowed)))
+        self.assertEqual(
+            {"event": "TURN_DEALT", "card": "Ts"},
+            server.event_to_json(game.TurnDealtEvent(card=deck.Card.from_str("Ts"))))
+        self.assertEqual(
+            {"event": "SHOWDOWN", "ranks": [["ONE_PAIR", 14, 13], ["NO_HAND"]], "winners": [0]},
+            server.event_to_json(game.ShowdownEvent(
+                ranks=[[cards.HandRank.ONE_PAIR, 14, 13], [cards.HandRank.NO_HAND]],
+                winners=[0])))
+
+    def test_action_from_json(self):
+        action = server.action_from_json({"action": "BET", "amount": 10}, 3)
+        self.assertEqual((3, game.ActionType.BET, 10),
+                         (action.player_idx, action.action_type, action.amount))
+        for message in [{"action": "BLIND_BET", "amount": 5}, {"action": "X"},
+                        {"action": "BET"}, {"action": "CALL", "amount": 5},
+                        {"action": "BET", "amount": "5"}]:
+            with self.assertRaises(server.ProtocolError):
+                server.action_from_json(message, 0)
+
+
+class GameServerTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = server.GameServer()
+        self.server.add_table("t", limit_config(), deck_factory=deck.Deck)
+        await self.server.start()
+        self.clients = []
+
+    async def asyncTearDown(self):
+        for client in self.clients:
+            client.close()
+        await self.server.close()
+
+    async def join(self, name):
+        client = Client()
+        await client.connect(self.server.port)
+        self.clients.append(client)
+        client.send({"type": "join", "table": "t", "name": name, "stack": 1000})
+        joined = await client.receive_until(lambda m: m["type"] == "joined")
+        client.seat = joined["seat"]
+        return client
+
+    async def test_play(self):
+        first = await self.join("a")
+        second = await self.join("b")
+        self.assertEqual([0, 1], [first.seat, second.seat])
+        self.assertEqual(game.GameState.HOLE_CARDS_DEALT,
+                         self.server.host.tables["t"].manager.state)
+        # Each sees their own cards only
+        for client in [first, second]:
+            dealt = await client.receive_until(
+                lambda m: m.get("event") == "HOLE_CARDS_DEALT")
+            self.assertEqual(2, len(dealt["cards"][client.seat]))
+            self.assertEqual([], dealt["cards"][1 - client.seat])
+            self.assertIsNone(dealt["cards"][2])
+            self.assertEqual("t", dealt["table"])
+
+        hand = self.server.host.tables["t"].manager.current_hand
+        to_act = first if hand.action_on == first.seat else second
+        waiting = second if to_act is first else first
+        turn = await to_act.wait_for_turn(to_act.seat)
+        self.assertIn("CALL", turn["allowed"])
+
+        # Out of turn, and not allowed
+        waiting.send({"type": "act", "table": "t", "action": "CHECK"})
+        error = await waiting.receive_until(lambda m: m["type"] == "error")
+        self.assertIn("ActionOutOfTurnError", error["message"])
+        to_act.send({"type": "act", "table": "t", "action": "CHECK"})
+        error = await to_act.receive_until(lambda m: m["type"] == "error")
+        self.assertIn("ActionNotAllowedError", error["message"])
+
+        to_act.send({"type": "act", "table": "t", "action": "FOLD"})
+        paid = await waiting.receive_until(lambda m: m.get("event") == "PAYING_OUT")
+        self.assertEqual(5, paid["net_profit"][waiting.seat])
+
+    async def test_errors(self):
+        client = await self.join("a")
+        client.send({"type": "join", "table": "t", "name": "a", "stack": 1000})
+        self.assertIn("Already seated", (await client.receive())["message"])
+        client.send({"type": "join", "table": "nope", "name": "a", "stack": 1000})
+        self.assertIn("Unknown table", (await client.receive())["message"])
+        client.send({"type": "act", "table": "nope", "action": "CHECK"})
+        self.assertIn("Not seated", (await client.receive())["message"])
+        client.send({"type": "act", "table": "t", "action": "CHECK"})
+        self.assertEqual("error", (await client.receive())["type"])
+        client.send({"type": "dance"})
+        self.assertIn("Unknown message type", (await client.receive())["message"])
+        client.send([1])
+        self.assertEqual("error", (await client.receive())["type"])
+
+    async def test_disconnect_folds(self):
+        first = await self.join("a")
+        second = await self.join("b")
+        hand = self.server.host.tables["t"].manager.current_hand
+        leaving = first if hand.action_on == first.seat else second
+        staying = second if leaving is first else first
+        leaving.close()
+        self.clients.remove(leaving)
+        paid = await staying.receive_until(lambda m: m.get("event") == "PAYING_OUT")
+        self.assertGreater(paid["net_profit"][staying.seat], 0)
+        manager = self.server.host.tables["t"].manager
+        self.assertIsNone(manager.players[leaving.seat])
+
+    async def test_watch(self):
+        watcher = Client()
+        await watcher.connect(self.server.port)
+        self.clients.append(watcher)
+        watcher.send({"type": "watch", "table": "t"})
+        self.assertEqual({"type": "watching", "table": "t"}, await watcher.receive())
+        watcher.send({"type": "watch", "table": "nope"})
+        self.assertIn("Unknown table", (await watcher.receive())["message"])
+        await self.join("a")
+        await self.join("b")
+        dealt = await watcher.receive_until(lambda m: m.get("event") == "HOLE_CARDS_DEALT")
+        self.assertEqual([[], [], None], dealt["cards"])
+        watcher.close()
+        self.clients.remove(watcher)
+        broadcaster = self.server._broadcasters["t"]
+        while broadcaster.watchers:
+            await asyncio.sleep(0.01)
+
+    async def test_slow_client(self):
+        # Nothing may be left in the socket buffer, so the client is let go
+        # after the first write
+        self.server.max_buffered = -1
+        client = Client()
+        await client.connect(self.server.port)
+        self.clients.append(client)
+        client.send({"type": "join", "table": "t", "name": "a", "stack": 1000})
+        data = await asyncio.wait_for(client.reader.read(), timeout=5)
+        self.assertEqual(1, data.count(b"\n"))
+        self.assertEqual(1, self.server.slow_disconnects)
+        manager = self.server.host.tables["t"].manager
+        while manager.players[0] is not None:
+            await asyncio.sleep(0.01)
+        self.assertEqual(set(), self.server.connections)
+
+
+class LoadGenTestCase(unittest.TestCase):
+    def test_load(self):
+        result = asyncio.run(loadgen.run_load_test(
+            num_tables=5, players_per_table=4, duration=0.5, seed=1))
+        self.assertEqual(20, result["connections"])
+        self.assertGreater(result["hands"], 0)
+        self.assertGreater(result["events"], result["hands"])
+        self.assertEqual(0, result["errors"])
+
+
+if __name__ == '__main__':
+    unittest.main()
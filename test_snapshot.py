@@ -0,0 +1,153 @@
+import random
+import unittest
+
+import game
+import snapshot
+import test_stats
+
+
+def make_manager(seed, num_players=5):
+    return test_stats.make_manager(seed, num_players, ante=1, stack=1000)
+
+
+def random_step(manager, rng):
+    """Makes one random allowed action, or proceeds if nobody is to act."""
+    hand = manager.current_hand
+    if hand is not None and hand.is_betting_active():
+        allowed = hand.allowed_action()
+        action_type = rng.choice([a for a in game.ActionType
+                                  if allowed.is_action_type_allowed(a)])
+        amount = None
+        if action_type in [game.ActionType.BET, game.ActionType.RAISE]:
+            amount = allowed.range_for_action(action_type)[0]
+        manager.act(game.Action(allowed.player_idx, action_type, amount))
+    else:
+        manager.proceed()
+
+
+class SnapshotTestCase(unittest.TestCase):
+    def assertRoundTrip(self, manager):
+        data = snapshot.snapshot(manager)
+        restored = snapshot.restore(data)
+        self.assertEqual(data, snapshot.snapshot(restored))
+        if manager.current_hand is not None:
+            self.assertEqual(manager.current_hand.state_view().tolist(),
+                             restored.current_hand.state_view().tolist())
+        return restored
+
+    def test_waiting_for_start(self):
+        manager, _ = make_manager(1)
+        restored = self.assertRoundTrip(manager)
+        self.assertEqual(game.GameState.WAITING_FOR_START, restored.state)
+        self.assertEqual(0, restored.button_pos)
+        self.assertIsNone(restored.current_hand)
+        self.assertEqual(["name{}".format(i) for i in range(5)] + [None],
+                         [p and p.name for p in restored.players])
+        self.assertEqual([0, 1, 2, 3, 4], [p.position for p in restored.players[:5]])
+        self.assertEqual(10, restored.config.blinds[1])
+
+    def test_every_step(self):
+        manager, rng = make_manager(2)
+        manager.start_game()
+        states = set()
+        for _ in range(1000):
+            random_step(manager, rng)
+            states.add(manager.state)
+            self.assertRoundTrip(manager)
+        self.assertEqual(set(game.GameState) - {game.GameState.WAITING_FOR_START},
+                         states)
+
+    def test_restored_plays_on(self):
+        manager, rng = make_manager(3)
+        manager.start_game()
+        for _ in range(50):
+            for _ in range(rng.randrange(1, 20)):
+                random_step(manager, rng)
+            restored = snapshot.restore(snapshot.snapshot(manager))
+            self.assertIsNot(manager.players[0], restored.players[0])
+            # Play both to the end of the hand with the same choices
+            seed = rng.random()
+            for m in [manager, restored]:
+                step_rng = random.Random(seed)
+                while m.state != game.GameState.PAYING_OUT:
+                    random_step(m, step_rng)
+            self.assertEqual(manager.current_hand.winners,
+                             restored.current_hand.winners)
+            self.assertEqual(manager.current_hand.pot_winnings,
+                             restored.current_hand.pot_winnings)
+            self.assertEqual([p and p.stack for p in manager.players],
+                             [p and p.stack for p in restored.players])
+            self.assertEqual(snapshot.snapshot(manager), snapshot.snapshot(restored))
+
+    def test_restored_hand_players(self):
+        manager, _ = make_manager(4)
+        manager.start_game()
+        manager.proceed()
+        restored = self.assertRoundTrip(manager)
+        hand = restored.current_hand
+        for idx, hp in enumerate(hand.players):
+            if hp is None:
+                continue
+            self.assertIs(restored.players[idx], hp.base_player)
+            self.assertEqual(
+                [c.card_idx for c in manager.current_hand.players[idx].hole_cards.cards],
+                [c.card_idx for c in hp.hole_cards.cards])
+        self.assertEqual(manager.current_hand.deck.next_card_idx, hand.deck.next_card_idx)
+        self.assertEqual([c.card_idx for c in manager.current_hand.deck.our_deck],
+                         [c.card_idx for c in hand.deck.our_deck])
+        self.assertEqual(manager.current_hand.current_outlay, hand.current_outlay)
+        self.assertEqual([game.ActionType.BLIND_BET] * 2,
+                         [a.action_type for a in hand.past_action])
+
+    def test_player_replaced_mid_hand(self):
+        manager, _ = make_manager(5)
+        manager.start_game()
+        manager.proceed()
+        removed = manager.remove_player(3)
+        manager.add_player(game.Player("üñí", 50))
+        restored = self.assertRoundTrip(manager)
+        self.assertEqual("üñí", restored.players[3].name)
+        base_player = restored.current_hand.players[3].base_player
+        self.assertEqual(removed.name, base_player.name)
+        self.assertEqual(removed.stack, base_player.stack)
+
+    def test_negative_and_large_numbers(self):
+        manager, _ = make_manager(6, num_players=2)
+        manager.players[0].stack = -5
+        manager.players[1].stack = 10**15
+        manager.start_game()
+        manager.proceed()
+        restored = self.assertRoundTrip(manager)
+        self.assertEqual(-5, restored.current_hand.players[0].initial_stack)
+        self.assertEqual(manager.current_hand.players[1].stack,
+                         restored.current_hand.players[1].stack)
+        self.assertGreater(restored.current_hand.players[1].stack, 2**32)
+
+    def test_config(self):
+        manager, _ = make_manager(8)
+        first = snapshot.snapshot(manager)
+        manager.config.ante = 3
+        restored = snapshot.restore(snapshot.snapshot(manager))
+        self.assertEqual(3, restored.config.ante)
+        # Every restored Manager gets its own Configuration
+        other = snapshot.restore(first)
+        self.assertEqual(1, other.config.ante)
+        self.assertIsNot(other.config, snapshot.restore(first).config)
+
+    def test_errors(self):
+        manager, _ = make_manager(7)
+        manager.start_game()
+        manager.proceed()
+        data = snapshot.snapshot(manager)
+        with self.assertRaises(snapshot.SnapshotFormatError):
+            snapshot.restore(b"XXXX" + data[4:])
+        with self.assertRaises(snapshot.SnapshotFormatError):
+            snapshot.restore(data[:4] + b"\x63" + data[5:])
+        with self.assertRaises(snapshot.SnapshotFormatError):
+            snapshot.restore(data[:-3])
+        with self.assertRaises(snapshot.SnapshotFormatError):
+            snapshot.restore(data + b"\x00")
+
+
+if __name__ == '__main__':
+    unittest.main()
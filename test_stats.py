@@ -0,0 +1,166 @@
+import random
+import unittest
+
+import cards
+import game
+import stats
+from deck import shuffled_deck_factory
+from test_history import play_random_hands
+
+
+def make_manager(seed, num_players=4, ante=0, stack=10**6):
+    rng = random.Random(seed)
+    manager = game.Manager(game.Configuration(
+        max_players=6, game_type=game.GameType.LIMIT, ante=ante,
+        limits=(10, 20), blinds=(5, 10)))
+    manager._deck_factory = shuffled_deck_factory(rng)
+    for idx in range(num_players):
+        manager.add_player(game.Player("name{}".format(idx), stack))
+    manager.button_pos = 0
+    return manager, rng
+
+
+def expected_counts(events, num_seats):
+    """Computes the counters from a list of recorded events the slow way."""
+    counts = {name: [0] * num_seats for name in stats.COUNTERS}
+    hand_events = []
+    for event in events:
+        hand_events.append(event)
+        if event.event_type != game.EventType.PAYING_OUT:
+            continue
+        preflop = True
+        vpip = set()
+        pfr = set()
+        for e in hand_events:
+            if e.event_type == game.EventType.FLOP_DEALT:
+                preflop = False
+            elif e.event_type == game.EventType.ACTION:
+                action_type = e.action.action_type
+                seat = e.action.player_idx
+                if action_type in [game.ActionType.BET, game.ActionType.RAISE]:
+                    counts["aggressive"][seat] += 1
+                    if preflop:
+                        vpip.add(seat)
+                        pfr.add(seat)
+                elif action_type == game.ActionType.CALL:
+                    counts["calls"][seat] += 1
+                    if preflop:
+                        vpip.add(seat)
+            elif e.event_type == game.EventType.SHOWDOWN:
+                for seat, rank in enumerate(e.ranks):
+                    if rank != [cards.HandRank.NO_HAND]:
+                        counts["showdowns"][seat] += 1
+                        if seat in e.winners:
+                            counts["showdowns_won"][seat] += 1
+        for seat, net in enumerate(event.net_profit):
+            if net is None:
+                continue
+            counts["hands"][seat] += 1
+            counts["net_profit"][seat] += net
+            counts["vpip"][seat] += seat in vpip
+            counts["pfr"][seat] += seat in pfr
+        hand_events = []
+    return counts
+
+
+class PlayerStatsTestCase(unittest.TestCase):
+    def play(self, seed, num_hands):
+        manager, rng = make_manager(seed)
+        player_stats = stats.PlayerStats(manager.config.max_players)
+        recorder = game.RecordingListener()
+        manager.add_listener(player_stats, event_types=stats.PlayerStats.EVENT_TYPES)
+        manager.add_listener(recorder)
+        manager.start_game()
+        play_random_hands(manager, num_hands, rng)
+        return manager, player_stats, recorder
+
+    def test_counts(self):
+        manager, player_stats, recorder = self.play(1, 300)
+        expected = expected_counts(recorder.events, 6)
+        for name in stats.COUNTERS:
+            self.assertEqual(expected[name], player_stats.counter(name), name)
+        self.assertEqual([300] * 4 + [0, 0], player_stats.counter("hands"))
+        self.assertGreater(sum(player_stats.counter("showdowns")), 0)
+        self.assertEqual([p.stack - 10**6 for p in manager.players[:4]],
+                         player_stats.net_profit()[:4])
+        self.assertEqual(0, sum(player_stats.net_profit()))
+
+    def test_ratios(self):
+        _, player_stats, _ = self.play(2, 200)
+        vpip = player_stats.vpip()
+        pfr = player_stats.pfr()
+        self.assertEqual([None, None], vpip[4:])
+        self.assertEqual([None, None], player_stats.aggression_factor()[4:])
+        for seat in range(4):
+            self.assertLessEqual(pfr[seat], vpip[seat])
+            self.assertLessEqual(vpip[seat], 1)
+        self.assertEqual(player_stats.counter("vpip")[0] / 200, vpip[0])
+        for rate in player_stats.showdown_win_rate()[:4]:
+            self.assertTrue(0 <= rate <= 1)
+
+    def test_simple_hand(self):
+        manager = game.Manager(game.Configuration(
+            max_players=3, game_type=game.GameType.LIMIT,
+            limits=(10, 20), blinds=(5, 10)))
+        for idx in range(3):
+            manager.add_player(game.Player("name{}".format(idx), 1000))
+        player_stats = stats.PlayerStats(3)
+        manager.add_listener(player_stats, event_types=stats.PlayerStats.EVENT_TYPES)
+        manager.start_game()
+        manager.proceed()
+        # The small blind raises, the big blind calls, then both check down
+        button = manager.current_hand.button_pos
+        small_blind = (button + 1) % 3
+        big_blind = (button + 2) % 3
+        manager.act(game.Action(button, game.ActionType.FOLD))
+        manager.act(game.Action(small_blind, game.ActionType.RAISE, 10))
+        manager.act(game.Action(big_blind, game.ActionType.CALL))
+        while manager.state != game.GameState.PAYING_OUT:
+            hand = manager.current_hand
+            if hand.is_betting_active():
+                manager.act(game.Action(hand.action_on, game.ActionType.CHECK))
+            else:
+                manager.proceed()
+        by_seat = lambda values: [values[button], values[small_blind], values[big_blind]]
+        self.assertEqual([1, 1, 1], by_seat(player_stats.counter("hands")))
+        self.assertEqual([0, 1, 1], by_seat(player_stats.counter("vpip")))
+        self.assertEqual([0, 1, 0], by_seat(player_stats.counter("pfr")))
+        self.assertEqual([0, 1, 1], by_seat(player_stats.counter("showdowns")))
+        net_profit = by_seat(player_stats.net_profit())
+        self.assertEqual(0, net_profit[0])
+        self.assertEqual(0, sum(net_profit))
+        self.assertIn(net_profit[1], [-20, 0, 20])
+        self.assertEqual(len(manager.current_hand.winners),
+                         sum(player_stats.counter("showdowns_won")))
+
+    def test_snapshot_and_merge(self):
+        _, first, _ = self.play(3, 100)
+        _, second, _ = self.play(4, 150)
+        restored = stats.PlayerStats.from_snapshot(first.snapshot())
+        self.assertEqual(first.counts, restored.counts)
+
+        merged = stats.PlayerStats(6)
+        merged.merge(first.snapshot())
+        merged.merge(second)
+        for name in stats.COUNTERS:
+            self.assertEqual([a + b for a, b in zip(first.counter(name),
+                                                    second.counter(name))],
+                             merged.counter(name))
+        self.assertEqual([250] * 4 + [0, 0], merged.counter("hands"))
+
+        with self.assertRaises(ValueError):
+            merged.merge(stats.PlayerStats(3))
+
+    def test_snapshot_errors(self):
+        data = stats.PlayerStats(2).snapshot()
+        self.assertEqual(4 + 2 + 8 * len(stats.COUNTERS) * 2, len(data))
+        with self.assertRaises(stats.StatsFormatError):
+            stats.PlayerStats.from_snapshot(b"XXXX" + data[4:])
+        with self.assertRaises(stats.StatsFormatError):
+            stats.PlayerStats.from_snapshot(data[:4] + b"\x09" + data[5:])
+        with self.assertRaises(stats.StatsFormatError):
+            stats.PlayerStats.from_snapshot(data[:-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import asyncio
+import unittest
+
+import deck
+import game
+import table_host
+
+
+def in_order_deck_factory():
+    return deck.Deck()
+
+
+class CheckCallBot:
+    """Listener which checks or calls whenever the action is on anyone."""
+    def __init__(self, host, table_id):
+        self.host = host
+        self.table_id = table_id
+
+    def notify(self, event):
+        allowed = event.allowed
+        for action_type in [game.ActionType.CHECK, game.ActionType.CALL]:
+            if allowed.is_action_type_allowed(action_type):
+                self.host.submit_action(
+                    self.table_id, game.Action(allowed.player_idx, action_type))
+                return
+
+
+class TableHostTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.host = table_host.TableHost()
+        self.run_task = asyncio.create_task(self.host.run())
+
+    async def asyncTearDown(self):
+        self.host.stop()
+        await self.run_task
+
+    def add_table(self, table_id, config, num_players=3):
+        table = self.host.add_table(table_id, config, deck_factory=in_order_deck_factory)
+        for idx in range(num_players):
+            table.manager.add_player(game.Player("name{}".format(idx), 1000))
+        return table
+
+    async def wait_for_hands(self, num_hands):
+        async def wait():
+            while any(t.hands_completed < num_hands for t in self.host.tables.values()):
+                await asyncio.sleep(0)
+        await asyncio.wait_for(wait(), timeout=5)
+
+    async def test_no_betting_tables(self):
+        for table_id in range(10):
+            self.add_table(table_id, game.Configuration(ante=1))
+            self.host.start_table(table_id)
+        await self.wait_for_hands(3)
+        stats = self.host.stats()
+        self.assertEqual(10, stats["tables"])
+        self.assertGreaterEqual(stats["hands"], 30)
+        self.assertGreater(stats["hands_per_sec"], 0)
+        self.assertEqual(set(range(10)), set(stats["per_table"]))
+        for table in self.host.tables.values():
+            self.assertIsNone(table.error)
+            self.assertEqual(3000, sum(p.stack for p in table.manager.players if p is not None))
+
+    async def test_limit_tables_with_bots(self):
+        config = game.Configuration(max_players=3, game_type=game.GameType.LIMIT,
+                                    limits=(10, 20), blinds=(5, 10))
+        for table_id in ["a", "b"]:
+            table = self.add_table(table_id, config)
+            table.manager.add_listener(CheckCallBot(self.host, table_id),
+                                       event_types=[game.EventType.ACTION_ON])
+            self.host.start_table(table_id)
+        await self.wait_for_hands(5)
+        for table in self.host.tables.values():
+            self.assertIsNone(table.error)
+
+    async def test_waits_for_action(self):
+        config = game.Configuration(max_players=3, game_type=game.GameType.LIMIT,
+                                    limits=(10, 20), blinds=(5, 10))
+        table = self.add_table("t", config)
+        table.manager.button_pos = 2
+        self.host.start_table("t")
+        for _ in range(10):
+            await asyncio.sleep(0)
+        self.assertEqual(game.GameState.HOLE_CARDS_DEALT, table.manager.state)
+        self.assertEqual(0, table.manager.current_hand.action_on)
+
+        with self.assertRaises(game.ActionOutOfTurnError):
+            await self.host.act("t", game.Action(1, game.ActionType.CALL))
+        with self.assertRaises(game.ActionAmountError):
+            await self.host.act("t", game.Action(0, game.ActionType.RAISE, 1))
+        await self.host.act("t", game.Action(0, game.ActionType.FOLD))
+        await self.host.act("t", game.Action(1, game.ActionType.FOLD))
+        await self.wait_for_hands(1)
+
+    async def test_unknown_table(self):
+        with self.assertRaises(table_host.UnknownTableError):
+            self.host.start_table("nope")
+        with self.assertRaises(table_host.UnknownTableError):
+            await self.host.act("nope", game.Action(0, game.ActionType.CHECK))
+        self.add_table("t", game.Configuration())
+        with self.assertRaises(ValueError):
+            self.add_table("t", game.Configuration())
+
+    async def test_remove_table(self):
+        table = self.add_table("t", game.Configuration())
+        self.host.start_table("t")
+        self.assertIs(table, self.host.remove_table("t"))
+        for _ in range(10):
+            await asyncio.sleep(0)
+        self.assertEqual(0, table.hands_completed)
+        self.assertEqual({}, self.host.tables)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import copy
+import json
+import pickle
+import unittest
+
+import game
+import tracing
+from test_history import play_random_hands
+from test_stats import make_manager
+
+
+def contains(outer, inner):
+    return outer.start_ns <= inner.start_ns and inner.end_ns <= outer.end_ns
+
+
+class TraceTestCase(unittest.TestCase):
+    def traced_hands(self, num_hands, seed=1, capacity=1 << 16):
+        manager, rng = make_manager(seed)
+        manager.add_listener(game.RecordingListener())
+        tracer = tracing.Tracer(capacity)
+        tracing.trace(manager, tracer, tid=7)
+        manager.start_game()
+        play_random_hands(manager, num_hands, rng)
+        return manager, tracer
+
+    def test_nesting(self):
+        _, tracer = self.traced_hands(20)
+        spans = tracer.spans()
+        by_category = {}
+        for s in spans:
+            by_category.setdefault(s.category, []).append(s)
+            self.assertLessEqual(s.start_ns, s.end_ns)
+            self.assertEqual(7, s.tid)
+        hands = by_category["hand"]
+        streets = by_category["street"]
+        self.assertEqual(20, len(hands))
+        self.assertEqual(20, sum(1 for s in streets if s.name == "preflop"))
+        for street in streets:
+            self.assertEqual(1, sum(1 for h in hands if contains(h, street)))
+        # Every action and deal is in exactly one street
+        for s in by_category["action"] + by_category["deal"]:
+            if s.name == "deal_hole_cards":
+                # Dealt by the proceed() that starts the preflop street
+                self.assertTrue(any(contains(street, s) for street in streets
+                                    if street.name == "preflop"))
+                continue
+            self.assertEqual(1, sum(1 for street in streets if contains(street, s)),
+                             s)
+        actions = [s for s in by_category["action"] if s.name == "action"]
+        hand_acts = [s for s in by_category["action"] if s.name == "act"]
+        self.assertEqual(len(actions), len(hand_acts))
+        for outer, inner in zip(actions, hand_acts):
+            self.assertTrue(contains(outer, inner))
+        self.assertIn("type", actions[0].args)
+        notifies = by_category["notify"]
+        self.assertIn("ACTION", {s.name for s in notifies})
+        for s in notifies:
+            self.assertTrue(any(contains(h, s) for h in hands) or
+                            s.name in ["HAND_STARTED", "PAYING_OUT"], s)
+
+    def test_ring_buffer(self):
+        _, tracer = self.traced_hands(20, capacity=50)
+        spans = tracer.spans()
+        self.assertEqual(50, len(spans))
+        self.assertEqual(tracer.recorded - 50, tracer.dropped())
+        self.assertGreater(tracer.dropped(), 0)
+        # The most recent spans are kept, in the order they were recorded
+        _, unbounded = self.traced_hands(20)
+        self.assertEqual(unbounded.recorded, tracer.recorded)
+        self.assertEqual([(s.name, s.category) for s in unbounded.spans()[-50:]],
+                         [(s.name, s.category) for s in spans])
+        self.assertEqual("hand", spans[-1].name)
+        tracer.clear()
+        self.assertEqual([], tracer.spans())
+
+    def test_disabled(self):
+        manager, rng = make_manager(2)
+        tracer = tracing.Tracer()
+        tracer.enabled = False
+        tracing.trace(manager, tracer)
+        manager.start_game()
+        play_random_hands(manager, 5, rng)
+        self.assertEqual(0, tracer.recorded)
+        tracer.enabled = True
+        play_random_hands(manager, 5, rng)
+        self.assertGreater(tracer.recorded, 0)
+
+    def test_fork(self):
+        manager, rng = make_manager(3)
+        tracer = tracing.Tracer()
+        tracing.trace(manager, tracer)
+        manager.start_game()
+        play_random_hands(manager, 1, rng)
+        while not (manager.current_hand is not None and
+                   manager.current_hand.is_betting_active()):
+            manager.proceed()
+        hand = manager.current_hand
+        action_on = hand.action_on
+        past_action = hand.past_action.copy()
+        recorded = tracer.recorded
+        # Acting on a fork of a traced hand leaves the hand alone and isn't
+        # traced
+        forked = hand.fork()
+        forked.act(game.Action(action_on, game.ActionType.FOLD))
+        self.assertEqual(action_on, hand.action_on)
+        self.assertEqual(past_action, hand.past_action)
+        self.assertNotEqual(action_on, forked.action_on)
+        self.assertEqual(recorded, tracer.recorded)
+        self.assertNotIn("_tracer", forked.__dict__)
+        manager.act(game.Action(action_on, game.ActionType.FOLD))
+        self.assertEqual("act", tracer.spans()[-2].name)
+
+    def test_pickle(self):
+        manager, rng = make_manager(4)
+        tracer = tracing.Tracer()
+        tracing.trace(manager, tracer)
+        manager.start_game()
+        play_random_hands(manager, 1, rng)
+        while not (manager.current_hand is not None and
+                   manager.current_hand.is_betting_active()):
+            manager.proceed()
+        hand = manager.current_hand
+        self.assertIsInstance(hand, tracing.TracedHand)
+        hand.state_view()
+        recorded = tracer.recorded
+        for copied in [pickle.loads(pickle.dumps(hand)), copy.deepcopy(hand)]:
+            # Copies are plain, untraced Hands
+            self.assertIs(game.Hand, type(copied))
+            self.assertNotIn("_tracer", copied.__dict__)
+            self.assertEqual(hand.state_view().tolist(),
+                             copied.state_view().tolist())
+            copied.act(game.Action(copied.action_on, game.ActionType.FOLD))
+        self.assertEqual(recorded, tracer.recorded)
+        self.assertIsInstance(manager.current_hand, tracing.TracedHand)
+
+    def test_chrome_trace(self):
+        _, tracer = self.traced_hands(3)
+        trace = json.loads(json.dumps(tracer.to_chrome_trace(pid=1)))
+        events = trace["traceEvents"]
+        self.assertEqual(tracer.recorded, len(events))
+        for event in events:
+            self.assertEqual("X", event["ph"])
+            self.assertEqual(1, event["pid"])
+            self.assertEqual(7, event["tid"])
+            self.assertGreaterEqual(event["dur"], 0)
+        self.assertEqual("hand", events[0]["name"])
+        self.assertEqual(sorted(e["ts"] for e in events), [e["ts"] for e in events])
+
+
+if __name__ == '__main__':
+    unittest.main()
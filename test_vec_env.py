@@ -0,0 +1,89 @@
+import unittest
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import game
+if np is not None:
+    import vec_env
+
+
+@unittest.skipUnless(np is not None, "numpy is not installed")
+class VecEnvTestCase(unittest.TestCase):
+    def setUp(self):
+        self.env = vec_env.VecEnv(8, num_players=4, stack=500, seed=1)
+        self.obs = self.env.reset()
+
+    def test_observations(self):
+        self.assertEqual((8, 2), self.obs["hole_cards"].shape)
+        self.assertEqual(np.int8, self.obs["hole_cards"].dtype)
+        self.assertEqual((8, 4), self.obs["stacks"].shape)
+        self.assertEqual((8, vec_env.NUM_ACTIONS), self.obs["legal"].shape)
+        self.assertTrue(self.obs["legal"].all())
+        # Pre-flop with the blinds posted
+        self.assertTrue((self.obs["board"] == -1).all())
+        self.assertTrue((self.obs["outlays"].sum(axis=1) == 15).all())
+        self.assertTrue((self.obs["stacks"].sum(axis=1) == 4 * 500 - 15).all())
+        for idx, manager in enumerate(self.env.managers):
+            hand = manager.current_hand
+            self.assertEqual(hand.action_on, self.obs["action_on"][idx])
+            self.assertEqual([c.card_idx for c in hand.players[hand.action_on].hole_cards.cards],
+                             self.obs["hole_cards"][idx].tolist())
+
+    def test_arrays_reused(self):
+        board = self.obs["board"]
+        obs, _, _ = self.env.step([vec_env.CHECK_CALL] * 8)
+        self.assertIs(board, obs["board"])
+
+    def test_play(self):
+        total = np.zeros(4, dtype=np.int64)
+        num_done = 0
+        rng = np.random.default_rng(3)
+        for _ in range(300):
+            actions = rng.choice(vec_env.NUM_ACTIONS, size=8, p=[0.1, 0.7, 0.2])
+            obs, rewards, dones = self.env.step(actions)
+            # Rewards only where a hand finished and they add up to zero
+            self.assertTrue((rewards[~dones] == 0).all())
+            self.assertTrue((rewards.sum(axis=1) == 0).all())
+            total += rewards.sum(axis=0)
+            num_done += int(dones.sum())
+            # Every table has a new hand with someone to act
+            self.assertTrue(obs["legal"].all())
+            self.assertTrue(obs["live"][np.arange(8), obs["action_on"]].all())
+        self.assertEqual(num_done, self.env.hands_completed)
+        self.assertGreater(num_done, 50)
+        self.assertEqual(0, total.sum())
+
+    def test_fold_ends_hand(self):
+        # With four players, three folds end every hand
+        buttons = [m.button_pos for m in self.env.managers]
+        for _ in range(2):
+            _, _, dones = self.env.step([vec_env.FOLD] * 8)
+            self.assertFalse(dones.any())
+        _, rewards, dones = self.env.step(np.full(8, vec_env.FOLD))
+        self.assertTrue(dones.all())
+        # The big blind wins the small blind
+        self.assertTrue((np.sort(rewards, axis=1) == [-5, 0, 0, 5]).all())
+        # The next hand started with the button moved on
+        self.assertEqual([(b + 1) % 4 for b in buttons],
+                         [m.button_pos for m in self.env.managers])
+        self.assertEqual([game.GameState.HOLE_CARDS_DEALT] * 8,
+                         [m.state for m in self.env.managers])
+
+    def test_bad_actions(self):
+        with self.assertRaises(ValueError):
+            self.env.step([vec_env.FOLD] * 7)
+        with self.assertRaises(ValueError):
+            self.env.step([7] * 8)
+
+    def test_seeded(self):
+        other = vec_env.VecEnv(8, num_players=4, stack=500, seed=1)
+        other_obs = other.reset()
+        for name in vec_env.VecEnv.OBSERVATIONS:
+            self.assertTrue((self.obs[name] == other_obs[name]).all(), name)
+
+
+if __name__ == '__main__':
+    unittest.main()
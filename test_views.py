@@ -0,0 +1,79 @@
+import random
+import unittest
+
+import cards
+import game
+import server
+import views
+from deck import shuffled_deck_factory
+from test_history import play_random_hands
+
+
+def encode(event, seat):
+    return server.encode_message(server.event_to_json(event, seat))
+
+
+class EventViewsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+    def counting_encode(self, event, seat):
+        self.calls.append(seat)
+        return encode(event, seat)
+
+    def test_private_views(self):
+        event = game.HoleCardsDealtEvent(cards=[
+            cards.PlayerCards.from_str("Ah Kd"), None,
+            cards.PlayerCards.from_str("2c 3c")])
+        event_views = views.EventViews(event, self.counting_encode)
+        self.assertEqual([None, 0, 2], self.calls)
+        self.assertEqual(encode(event, None), event_views.public)
+        self.assertEqual(encode(event, 0), event_views.for_seat(0))
+        self.assertEqual(encode(event, 2), event_views.for_seat(2))
+        # Empty seats and spectators get the public view
+        self.assertIs(event_views.public, event_views.for_seat(1))
+        self.assertIs(event_views.public, event_views.for_seat(None))
+        self.assertNotIn(b"Ah", event_views.public)
+        self.assertNotIn(b"2c", event_views.for_seat(0))
+
+    def test_public_events(self):
+        event = game.ActionEvent(game.Action(1, game.ActionType.FOLD))
+        event_views = views.EventViews(event, self.counting_encode)
+        self.assertEqual([None], self.calls)
+        self.assertIsNone(event_views.private)
+        for seat in [None, 0, 1, 5]:
+            self.assertIs(event_views.public, event_views.for_seat(seat))
+
+    def test_same_as_per_recipient(self):
+        rng = random.Random(3)
+        manager = game.Manager(game.Configuration(
+            max_players=4, game_type=game.GameType.LIMIT,
+            limits=(10, 20), blinds=(5, 10)))
+        manager._deck_factory = shuffled_deck_factory(rng)
+        for idx in range(4):
+            manager.add_player(game.Player("name{}".format(idx), 10**6))
+        listener = views.ViewListener(self.counting_encode)
+        received = []
+        seats = [None, 0, 1, 2, 3]
+
+        def subscriber(event_views):
+            # Some events look at the live hand, so compare as they arrive
+            event = event_views.event
+            received.append(event)
+            self.assertEqual([encode(event, seat) for seat in seats],
+                             [event_views.for_seat(seat) for seat in seats])
+
+        listener.subscribers.append(subscriber)
+        recorder = game.RecordingListener()
+        manager.add_listener(listener)
+        manager.add_listener(recorder)
+        manager.start_game()
+        play_random_hands(manager, 10, rng)
+
+        self.assertEqual(recorder.events, received)
+        # One public view per event, and one private per seat with cards
+        self.assertEqual(len(received) + 40, len(self.calls))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import json
+import random
+import unittest
+
+import cards
+import game
+import server
+import wire
+from deck import shuffled_deck_factory
+from test_history import play_random_hands
+
+
+class WireTestCase(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        rng = random.Random(5)
+        manager = game.Manager(game.Configuration(
+            max_players=6, game_type=game.GameType.LIMIT, ante=1,
+            limits=(10, 20), blinds=(5, 10)))
+        manager._deck_factory = shuffled_deck_factory(rng)
+        manager.add_listener(self)
+        for idx in range(4):
+            manager.add_player(game.Player("näme{}".format(idx), 10**6))
+        manager.start_game()
+        play_random_hands(manager, 20, rng)
+        manager.remove_player(3)
+
+    def notify(self, event):
+        # Some events look at the live hand, so check them as they come
+        self.events.append(event.event_type)
+        for seat in [None, 0, 1, 2, 3, 4]:
+            expected = server.event_to_json(event, seat)
+            data = wire.encode_event(event, seat)
+            decoded, pos = wire.decode_event(data)
+            self.assertEqual(len(data), pos)
+            self.assertIs(type(event), type(decoded))
+            self.assertEqual(expected, server.event_to_json(decoded, seat))
+            self.assertEqual(
+                expected, server.event_to_json(
+                    wire.decode_event_json(wire.encode_event_json(event, seat)), seat))
+
+    def test_every_event_type(self):
+        self.assertEqual(set(game.EventType) - {game.EventType.WAITING_FOR_START},
+                         set(self.events))
+        event = game.WaitingForStartEvent()
+        self.assertIs(game.WaitingForStartEvent,
+                      type(wire.decode_event(wire.encode_event(event))[0]))
+        self.assertIs(game.WaitingForStartEvent,
+                      type(wire.decode_event_json(wire.encode_event_json(event))))
+
+    def test_hidden_cards(self):
+        event = game.HoleCardsDealtEvent(cards=[
+            cards.PlayerCards.from_str("Ah Kd"), None,
+            cards.PlayerCards.from_str("2c 3c")])
+        data = wire.encode_event(event, 2)
+        self.assertEqual(bytes([wire.VERSION, 5, 3, 0xfe, 0xff, 0, 1]), data)
+        self.assertEqual([1, 5, ["", None, "2c3c"]],
+                         json.loads(wire.encode_event_json(event, 2)))
+        decoded = wire.decode_event(data)[0]
+        self.assertEqual([0, None, 2], [None if c is None else len(c)
+                                        for c in decoded.cards])
+        self.assertEqual("2c 3c", str(decoded.cards[2]))
+
+    def test_action(self):
+        event = game.ActionEvent(game.Action(3, game.ActionType.RAISE, 300))
+        self.assertEqual(bytes([wire.VERSION, 11, 0x33, 0xac, 0x02]),
+                         wire.encode_event(event))
+        self.assertEqual("[1,11,51,300]", wire.encode_event_json(event))
+        event = game.ActionEvent(game.Action(2, game.ActionType.FOLD))
+        self.assertEqual(bytes([wire.VERSION, 11, 0x42]), wire.encode_event(event))
+        action = wire.decode_event_json("[1,11,66]").action
+        self.assertEqual((2, game.ActionType.FOLD), (action.player_idx, action.action_type))
+        event = game.ActionEvent(game.Action(17, game.ActionType.CALL))
+        with self.assertRaises(ValueError):
+            wire.encode_event(event)
+        with self.assertRaises(ValueError):
+            wire.encode_event_json(event)
+
+    def test_negative_stack(self):
+        player = game.Player("name", -50)
+        player.position = 2
+        events = [game.PlayerAddedEvent(player),
+                  game.HandStartedEvent([None, game.HandPlayer(player),
+                                         game.HandPlayer(game.Player("x", 7))])]
+        for event in events:
+            decoded = wire.decode_event(wire.encode_event(event))[0]
+            self.assertEqual(server.event_to_json(event),
+                             server.event_to_json(decoded))
+        self.assertEqual(-50, decoded.players[1].stack)
+
+    def test_stream(self):
+        events = [game.TurnDealtEvent(card=wire._CARDS[i]) for i in range(5)]
+        data = b"".join(wire.encode_event(e) for e in events)
+        self.assertEqual(list(range(5)),
+                         [e.card.card_idx for e in wire.decode_events(data)])
+
+    def test_errors(self):
+        data = wire.encode_event(game.ActionEvent(game.Action(3, game.ActionType.BET, 300)))
+        for bad in [b"", data[:-1], b"\x02" + data[1:], data[:1] + b"\x20" + data[2:],
+                    data[:2] + b"\x63" + data[3:]]:
+            with self.assertRaises(wire.WireFormatError):
+                wire.decode_event(bad)
+        for bad in ["", "[2,11,66]", "[1,13]", "[1,7,\"Xx\"]", "[1,11]", "{}", "[1,2,3]"]:
+            with self.assertRaises(wire.WireFormatError):
+                wire.decode_event_json(bad)
+
+
+if __name__ == '__main__':
+    unittest.main()
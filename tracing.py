@@ -0,0 +1,259 @@
+"""Span tracing of a game.Manager's hands, exportable to Chrome's trace viewer.
+
+trace(manager, tracer) records nested spans, with time.perf_counter_ns()
+timestamps, for what the Manager does:
+
+  hand: from the hand being created to it being paid out
+    street: preflop, flop, turn, river or showdown, from the proceed() that
+      deals it until the next street (or the payout)
+      deal_hole_cards, deal_flop, deal_turn, deal_river, showdown,
+        early_win: the Hand methods
+      action: Manager.act()
+        act: Hand.act()
+      notify: Manager._notify() of one event, named after the EventType
+
+Spans go into the Tracer's ring buffer, which keeps the most recent ones,
+and to_chrome_trace() turns them into trace event JSON for chrome://tracing
+or Perfetto:
+
+  tracer = tracing.Tracer()
+  tracing.trace(manager, tracer, tid=table_id)
+  ...
+  with open("trace.json", "w") as f:
+    json.dump(tracer.to_chrome_trace(), f)
+
+Like metrics.instrument, trace() wraps methods on the instances it is given,
+and gives their hands a traced subclass of game.Hand, so untraced Managers
+don't pay anything. A traced Manager whose Tracer is
+disabled (tracer.enabled = False) pays one attribute check per call.
+"""
+
+import os
+import time
+
+import game
+
+
+class Span:
+    """One finished span.
+
+    Attributes:
+      name: e.g. "flop" or "ACTION"
+      category: "hand", "street", "deal", "action" or "notify"
+      start_ns, end_ns: time.perf_counter_ns() at the start and end
+      tid: the tid the Manager was traced with
+      args: dict of extra details, or None
+    """
+    __slots__ = ("name", "category", "start_ns", "end_ns", "tid", "args")
+
+    def __init__(self, name, category, start_ns, end_ns, tid, args=None):
+        self.name = name
+        self.category = category
+        self.start_ns = start_ns
+        self.end_ns = end_ns
+        self.tid = tid
+        self.args = args
+
+    def __repr__(self):
+        return "Span({}, {}, {}, {})".format(
+            self.name, self.category, self.start_ns, self.end_ns)
+
+
+class Tracer:
+    """Ring buffer of the most recent spans.
+
+    Attributes:
+      enabled: spans are only recorded while this is true
+      capacity: number of spans kept
+      recorded: number of spans recorded since the last clear(), including
+        those which have been overwritten
+    """
+
+    def __init__(self, capacity=1 << 16):
+        self.enabled = True
+        self.capacity = capacity
+        self.recorded = 0
+        self._buffer = [None] * capacity
+
+    def record(self, name, category, start_ns, end_ns, tid, args=None):
+        self._buffer[self.recorded % self.capacity] = (
+            name, category, start_ns, end_ns, tid, args)
+        self.recorded += 1
+
+    def dropped(self):
+        """Returns the number of spans which have been overwritten."""
+        return max(0, self.recorded - self.capacity)
+
+    def clear(self):
+        self.recorded = 0
+        self._buffer = [None] * self.capacity
+
+    def spans(self):
+        """Returns the spans in the buffer, oldest recorded first."""
+        if self.recorded <= self.capacity:
+            entries = self._buffer[:self.recorded]
+        else:
+            split = self.recorded % self.capacity
+            entries = self._buffer[split:] + self._buffer[:split]
+        return [Span(*entry) for entry in entries]
+
+    def to_chrome_trace(self, pid=None):
+        """Returns the spans as a Chrome trace event format dict (see
+        json.dump) of complete ("X") events."""
+        if pid is None:
+            pid = os.getpid()
+        spans = self.spans()
+        # Parents before their children, which start at the same time
+        spans.sort(key=lambda s: (s.start_ns, -s.end_ns))
+        events = []
+        for s in spans:
+            event = {"name": s.name, "cat": s.category, "ph": "X",
+                     "ts": s.start_ns / 1000, "dur": (s.end_ns - s.start_ns) / 1000,
+                     "pid": pid, "tid": s.tid}
+            if s.args:
+                event["args"] = s.args
+            events.append(event)
+        return {"traceEvents": events, "displayTimeUnit": "ns"}
+
+
+# The street each state is reached by dealing
+_STREETS = {
+    game.GameState.HOLE_CARDS_DEALT: "preflop",
+    game.GameState.FLOP_DEALT: "flop",
+    game.GameState.TURN_DEALT: "turn",
+    game.GameState.RIVER_DEALT: "river",
+    game.GameState.SHOWDOWN: "showdown",
+}
+
+
+def _traced_method(name, category):
+    method = getattr(game.Hand, name)
+    now = time.perf_counter_ns
+
+    def traced(self, *args):
+        tracer = self._tracer
+        if not tracer.enabled:
+            return method(self, *args)
+        start = now()
+        result = method(self, *args)
+        tracer.record(name, category, start, now(), self._trace_tid)
+        return result
+    traced.__name__ = name
+    return traced
+
+
+def _new_hand():
+    return game.Hand.__new__(game.Hand)
+
+
+class TracedHand(game.Hand):
+    """A game.Hand whose methods record spans in the Tracer it was given.
+
+    trace() makes the Manager's hands TracedHands by setting their class,
+    rather than setting wrapped methods on the instances, because
+    Hand.fork() copies the instance's __dict__ and the wrappers would then
+    act on the original hand. Forks, copies and unpickled TracedHands are
+    plain Hands, so searches don't add spans either.
+    """
+
+    deal_hole_cards = _traced_method("deal_hole_cards", "deal")
+    deal_flop = _traced_method("deal_flop", "deal")
+    deal_turn = _traced_method("deal_turn", "deal")
+    deal_river = _traced_method("deal_river", "deal")
+    showdown = _traced_method("showdown", "deal")
+    early_win = _traced_method("early_win", "deal")
+    act = _traced_method("act", "action")
+
+    def fork(self):
+        other = game.Hand.fork(self)
+        del other._tracer
+        del other._trace_tid
+        return other
+
+    def __reduce__(self):
+        # Pickled (e.g. for MCTSBot's worker processes) and copied as a plain
+        # Hand, without the Tracer
+        state = self.__getstate__()
+        del state["_tracer"]
+        del state["_trace_tid"]
+        return _new_hand, (), state
+
+
+def trace(manager, tracer, tid=0):
+    """Records spans for manager in tracer (see the module docstring).
+
+    Args:
+      tid: the thread id for the spans in the Chrome trace, e.g. a table id,
+        so that each table gets its own track
+
+    Hands that are already in progress are traced from their next street.
+    """
+    now = time.perf_counter_ns
+    start_game = manager.start_game
+    act = manager.act
+    proceed = manager.proceed
+    notify = manager._notify
+    # The hand being traced, and the starts of the open hand and street
+    # spans. Street names are kept with their start.
+    state = {"hand": None, "hand_start": None, "street": None}
+
+    def new_hand(start):
+        hand = manager.current_hand
+        if hand is not None and hand is not state["hand"]:
+            state["hand"] = hand
+            state["hand_start"] = start
+            hand.__class__ = TracedHand
+            hand._tracer = tracer
+            hand._trace_tid = tid
+
+    def close(end):
+        street = state["street"]
+        if street is not None:
+            tracer.record(street[0], "street", street[1], end, tid)
+            state["street"] = None
+        if state["hand_start"] is not None:
+            tracer.record("hand", "hand", state["hand_start"], end, tid)
+            state["hand_start"] = None
+
+    def traced_start_game():
+        start = now()
+        start_game()
+        if tracer.enabled:
+            new_hand(start)
+
+    def traced_proceed():
+        if not tracer.enabled:
+            return proceed()
+        start = now()
+        proceed()
+        new_state = manager.state
+        if new_state in _STREETS:
+            street = state["street"]
+            if street is not None:
+                tracer.record(street[0], "street", street[1], start, tid)
+            state["street"] = (_STREETS[new_state], start)
+        elif new_state is game.GameState.PAYING_OUT:
+            close(now())
+        elif new_state is game.GameState.PRE_DEAL:
+            new_hand(start)
+
+    def traced_act(action):
+        if not tracer.enabled:
+            return act(action)
+        start = now()
+        act(action)
+        tracer.record("action", "action", start, now(), tid,
+                      {"seat": action.player_idx,
+                       "type": action.action_type.name})
+
+    def traced_notify(event):
+        if not tracer.enabled:
+            return notify(event)
+        start = now()
+        notify(event)
+        tracer.record(event.event_type.name, "notify", start, now(), tid)
+
+    manager.start_game = traced_start_game
+    manager.proceed = traced_proceed
+    manager.act = traced_act
+    manager._notify = traced_notify
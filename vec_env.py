@@ -0,0 +1,206 @@
+"""Vectorized limit hold'em environment for reinforcement learning.
+
+VecEnv steps a number of independent limit tables in lockstep. On every table
+all the seats are played by the agent: each step takes one action per table,
+for whichever player is to act there, and the observations describe the
+table from that player's point of view.
+
+Observations are preallocated numpy arrays which are overwritten in place by
+reset() and step(); copy them to keep them. Hands end and the next one starts
+automatically within step(); the hand's results are returned as that step's
+rewards. Every hand starts with all stacks reset to the starting stack and
+the button moved on.
+
+This module needs numpy.
+"""
+
+import random
+
+import numpy as np
+
+import deck
+import game
+
+# The discrete actions
+FOLD = 0
+CHECK_CALL = 1
+BET_RAISE = 2
+NUM_ACTIONS = 3
+
+
+class VecEnv:
+    """N limit tables stepped together.
+
+    Attributes (observations, one row per table):
+      hole_cards: int8 (N, 2) card indices of the player to act
+      board: int8 (N, 5) card indices of the board, -1 for cards not dealt
+      stacks: int64 (N, P) stacks in the hand, 0 for empty seats
+      outlays: int64 (N, P) amounts put in during the current betting round
+      pot: int64 (N,) the pot, not counting the current round's outlays
+      action_on: int8 (N,) seat of the player to act
+      live: bool (N, P) which seats are still in the hand
+      legal: bool (N, NUM_ACTIONS) which actions are allowed
+    """
+
+    OBSERVATIONS = ("hole_cards", "board", "stacks", "outlays", "pot",
+                    "action_on", "live", "legal")
+
+    def __init__(self, num_tables, num_players=6, stack=1000, limits=(10, 20),
+                 blinds=(5, 10), seed=None):
+        """Initializes VecEnv.
+
+        Args:
+          num_tables: number of tables N
+          num_players: players P at each table
+          stack: starting stack of every player in every hand
+          limits: the game.Configuration limits
+          blinds: the game.Configuration blinds
+          seed: seed for the decks and buttons, None for random
+        """
+        self.num_tables = num_tables
+        self.num_players = num_players
+        self.stack = stack
+        self.config = game.Configuration(
+            max_players=num_players, game_type=game.GameType.LIMIT,
+            limits=limits, blinds=blinds)
+        self.hands_completed = 0
+        self._rng = random.Random(seed)
+        self.managers = []
+        self._allowed = [None] * num_tables
+        # Per table, the hand last observed and a numpy view of its state
+        # buffer (see game.Hand.state_view)
+        self._hands = [None] * num_tables
+        self._states = [None] * num_tables
+        layout = game.state_layout(num_players)
+        self._slices = {name: slice(offset, offset + length)
+                        for name, (offset, length) in layout.items()}
+        self._seat_bits = 1 << np.arange(num_players, dtype=np.int64)
+
+        shape = (num_tables, num_players)
+        self.hole_cards = np.full((num_tables, 2), -1, dtype=np.int8)
+        self.board = np.full((num_tables, 5), -1, dtype=np.int8)
+        self.stacks = np.zeros(shape, dtype=np.int64)
+        self.outlays = np.zeros(shape, dtype=np.int64)
+        self.pot = np.zeros(num_tables, dtype=np.int64)
+        self.action_on = np.zeros(num_tables, dtype=np.int8)
+        self.live = np.zeros(shape, dtype=bool)
+        self.legal = np.zeros((num_tables, NUM_ACTIONS), dtype=bool)
+        self.rewards = np.zeros(shape, dtype=np.int64)
+        self.dones = np.zeros(num_tables, dtype=bool)
+
+    def observations(self):
+        """Returns a dict of the observation arrays (not copies)."""
+        return {name: getattr(self, name) for name in self.OBSERVATIONS}
+
+    def reset(self):
+        """Starts a new hand on every table.
+
+        Returns:
+          observations() dict
+        """
+        self.managers = []
+        for idx in range(self.num_tables):
+            manager = game.Manager(self.config)
+            manager._deck_factory = deck.shuffled_deck_factory(
+                random.Random(self._rng.getrandbits(64)))
+            for seat in range(self.num_players):
+                manager.add_player(game.Player("player{}".format(seat), self.stack))
+            # start_game moves the button on from here
+            manager.button_pos = self._rng.randrange(self.num_players)
+            manager.start_game()
+            self.managers.append(manager)
+            self._advance(idx, manager)
+            self._observe(idx, manager)
+        self.rewards.fill(0)
+        self.dones.fill(False)
+        return self.observations()
+
+    def step(self, actions):
+        """Applies one action on every table.
+
+        Args:
+          actions: sequence (or array) of N actions, FOLD, CHECK_CALL or
+            BET_RAISE, for the player to act on each table
+
+        Returns:
+          (observations() dict, rewards, dones). rewards is int64 (N, P) with
+          each player's net chips for tables where a hand finished on this
+          step, else 0. dones is bool (N,), True where a hand finished.
+
+        Raises:
+          game.InvalidActionError for an action that isn't legal
+        """
+        if len(actions) != self.num_tables:
+            raise ValueError("Expected {} actions, got {}".format(
+                self.num_tables, len(actions)))
+        if isinstance(actions, np.ndarray):
+            # Plain ints are much quicker to compare than numpy scalars
+            actions = actions.tolist()
+        self.rewards.fill(0)
+        self.dones.fill(False)
+        for idx, (manager, action) in enumerate(zip(self.managers, actions)):
+            manager.act(self._to_action(self._allowed[idx], action))
+            self._advance(idx, manager)
+            self._observe(idx, manager)
+        return self.observations(), self.rewards, self.dones
+
+    def _to_action(self, allowed, action):
+        if action == FOLD:
+            action_type = game.ActionType.FOLD
+        elif action == CHECK_CALL:
+            if allowed.is_action_type_allowed(game.ActionType.CHECK):
+                action_type = game.ActionType.CHECK
+            else:
+                action_type = game.ActionType.CALL
+        elif action == BET_RAISE:
+            if allowed.is_action_type_allowed(game.ActionType.BET):
+                action_type = game.ActionType.BET
+            else:
+                action_type = game.ActionType.RAISE
+            return game.Action(allowed.player_idx, action_type,
+                               allowed.range_for_action(action_type)[0])
+        else:
+            raise ValueError("Unknown action {}".format(action))
+        return game.Action(allowed.player_idx, action_type)
+
+    def _advance(self, idx, manager):
+        """Proceeds until someone has to act, finishing and starting hands."""
+        while True:
+            hand = manager.current_hand
+            if hand is not None and hand.is_betting_active():
+                return
+            if manager.state == game.GameState.PAYING_OUT:
+                # Auto-reset for the next hand
+                for player in manager.players:
+                    player.stack = self.stack
+                manager.advance_button()
+            manager.proceed()
+            if manager.state == game.GameState.PAYING_OUT:
+                self.rewards[idx] = [p.stack - self.stack for p in manager.players]
+                self.dones[idx] = True
+                self.hands_completed += 1
+
+    def _observe(self, idx, manager):
+        hand = manager.current_hand
+        if self._hands[idx] is not hand:
+            self._hands[idx] = hand
+            self._states[idx] = np.frombuffer(hand.state_view(), dtype=np.int64)
+        state = self._states[idx]
+        slices = self._slices
+        allowed = hand.allowed_action()
+        self._allowed[idx] = allowed
+        player_idx = allowed.player_idx
+        self.action_on[idx] = player_idx
+        hole_cards_at = game.STATE_HOLE_CARDS + 2 * player_idx
+        self.hole_cards[idx] = state[hole_cards_at:hole_cards_at + 2]
+        self.board[idx] = state[slices["board"]]
+        self.stacks[idx] = state[slices["stacks"]]
+        self.outlays[idx] = state[slices["outlays"]]
+        self.pot[idx] = state[game.STATE_POT]
+        self.live[idx] = state[game.STATE_LIVE_MASK] & self._seat_bits
+        self.legal[idx] = (
+            allowed.is_action_type_allowed(game.ActionType.FOLD),
+            allowed.is_action_type_allowed(game.ActionType.CHECK) or
+            allowed.is_action_type_allowed(game.ActionType.CALL),
+            allowed.is_action_type_allowed(game.ActionType.BET) or
+            allowed.is_action_type_allowed(game.ActionType.RAISE))
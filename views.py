@@ -0,0 +1,71 @@
+"""Per seat views of events, serialized once for broadcasting.
+
+Some events hold information that only some players may see: the
+HOLE_CARDS_DEALT event has every seat's cards. When an event is sent to many
+recipients, redacting and serializing it for each of them repeats the same
+work over and over. EventViews instead serializes the public view (seen by
+spectators and by everyone for events with nothing private) and one private
+view per seat with cards, once each, so that sending the event is only
+picking out the right bytes.
+
+The serialization is up to the encoder, a function (event, seat) -> bytes
+which should hide whatever seat (None for the public view) mustn't see,
+like server.event_to_json.
+
+ViewListener is an adapter for a game.Manager which builds the EventViews
+for every event and passes them on:
+
+  listener = ViewListener(encoder)
+  listener.subscribers.append(lambda views: ...)
+  manager.add_listener(listener)
+"""
+
+import game
+
+# Event types with a different view for each seat
+PRIVATE_EVENT_TYPES = frozenset([game.EventType.HOLE_CARDS_DEALT])
+
+
+class EventViews:
+    """The serialized views of one event.
+
+    Attributes:
+      event: the game.Event
+      public: bytes of the view for spectators
+      private: None if every seat sees the public view, else dict of seat to
+        the bytes of its view, for the seats with their own
+    """
+    __slots__ = ("event", "public", "private")
+
+    def __init__(self, event, encoder):
+        self.event = event
+        self.public = encoder(event, None)
+        self.private = None
+        if event.event_type in PRIVATE_EVENT_TYPES:
+            self.private = {seat: encoder(event, seat)
+                            for seat, cards in enumerate(event.cards)
+                            if cards is not None}
+
+    def for_seat(self, seat):
+        """Returns the bytes to send to seat (None for a spectator)."""
+        if self.private is None:
+            return self.public
+        return self.private.get(seat, self.public)
+
+
+class ViewListener:
+    """game.Manager listener which makes the EventViews of each event once.
+
+    Attributes:
+      encoder: function (event, seat) -> bytes
+      subscribers: functions called with each EventViews
+    """
+
+    def __init__(self, encoder):
+        self.encoder = encoder
+        self.subscribers = []
+
+    def notify(self, event):
+        event_views = EventViews(event, self.encoder)
+        for subscriber in self.subscribers:
+            subscriber(event_views)
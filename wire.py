@@ -0,0 +1,629 @@
+"""Compact wire encodings of game.Events.
+
+There are two encodings of every EventType, both versioned:
+
+  encode_event(event, seat=None) -> bytes, read back with decode_event
+  encode_event_json(event, seat=None) -> str, read back with decode_event_json
+
+seat is the recipient, whose hole cards are kept in HOLE_CARDS_DEALT;
+everyone else's are hidden (as with server.event_to_json). None hides them
+all.
+
+Decoding gives back an Event of the same class with the same contents,
+except that ACTION_ON events have a hand_player of None and the players of
+HAND_STARTED are new HandPlayers with only a name and a stack.
+
+Cards are written as their index (see deck.Card) in the binary encoding and
+as their two character string in the JSON one, both looked up in tables
+built once here rather than formatted for every event. Actions use the
+history module's action codec: one byte, action_type << 4 | player_idx,
+followed by the amount if the action type has one. Seats above 15 don't fit
+and encoding them raises ValueError.
+
+Binary layout: version byte, EventType value byte, then by event type
+(integers are LEB128 varints, "optional" ones are 0 for None and else one
+more than the zigzag encoded value, see the history module):
+  PLAYER_ADDED, PLAYER_REMOVED: name length and utf-8 bytes, zigzag
+    encoded stack, optional position
+  WAITING_FOR_START: nothing
+  HAND_STARTED: number of seats, seat mask, then for each seated player the
+    name length and utf-8 bytes, and the zigzag encoded stack
+  ANTE: amount, number of players and their indices (a byte each)
+  HOLE_CARDS_DEALT: number of seats, then for each one byte _EMPTY_SEAT,
+    _HIDDEN_CARDS, or the first card followed by a byte for the second
+  FLOP_DEALT: number of cards and a byte per card
+  TURN_DEALT, RIVER_DEALT: card byte
+  SHOWDOWN: number of seats, then for each the length of its rank list, the
+    HandRank value + 1 and a byte for each of the other elements; number of
+    winners and a byte per winner
+  PAYING_OUT: number of seats, optional net_profit of each, number of seats
+    (0 if pot_winnings is None), optional pot_winnings of each
+  ACTION: the action
+  ACTION_ON: seat, number of allowed action types, then for each a byte with
+    the ActionType value, plus _HAS_RANGE when it's followed by the range's
+    min and max
+
+The JSON encoding is a list: the version, the EventType value, then by
+event type:
+  PLAYER_ADDED, PLAYER_REMOVED: name, stack, position
+  WAITING_FOR_START: nothing
+  HAND_STARTED: list of null or [name, stack] for each seat
+  ANTE: amount, list of player indices
+  HOLE_CARDS_DEALT: list of null (empty seat), "" (hidden) or the two cards
+    run together ("AhKd") for each seat
+  FLOP_DEALT: the cards run together
+  TURN_DEALT, RIVER_DEALT: the card
+  SHOWDOWN: list of the rank lists, with the HandRank value first; list of
+    winners
+  PAYING_OUT: net_profit list, pot_winnings list
+  ACTION: action byte, then the amount if it has one
+  ACTION_ON: seat, then a list for each allowed action type: [ActionType
+    value] or [ActionType value, min, max]
+"""
+
+import json
+
+import cards
+import deck
+import game
+from history import (action_code, code_has_amount, code_to_action,
+                     get_action, get_varint, put_action, put_varint,
+                     unzigzag, zigzag)
+
+VERSION = 1
+
+_EMPTY_SEAT = 0xff
+_HIDDEN_CARDS = 0xfe
+_HAS_RANGE = 0x80
+
+# Lookup tables by card index
+CARD_STRS = [str(deck.Card(idx)) for idx in range(52)]
+_CARDS = [deck.Card(idx) for idx in range(52)]
+_CARD_IDXS = {s: idx for idx, s in enumerate(CARD_STRS)}
+
+_HAND_RANKS = {r.value: r for r in cards.HandRank}
+_ACTION_TYPES = {a.value: a for a in game.ActionType}
+_EVENT_CLASSES = [game.EVENT_CLASSES[t] for t in sorted(
+    game.EventType, key=lambda t: t.value)]
+
+
+class WireFormatError(Exception):
+    pass
+
+
+def _put_optional(buf, value):
+    if value is None:
+        buf.append(0)
+    else:
+        put_varint(buf, zigzag(value) + 1)
+
+
+def _get_optional(data, pos):
+    value, pos = get_varint(data, pos)
+    if not value:
+        return None, pos
+    return unzigzag(value - 1), pos
+
+
+def _put_str(buf, s):
+    data = s.encode()
+    put_varint(buf, len(data))
+    buf += data
+
+
+def _get_str(data, pos):
+    length, pos = get_varint(data, pos)
+    end = pos + length
+    if end > len(data):
+        raise IndexError(end)
+    return bytes(data[pos:end]).decode(), end
+
+
+def _player_cards(card_idxs):
+    # PlayerCards copies its argument
+    player_cards = cards.PlayerCards.__new__(cards.PlayerCards)
+    player_cards.cards = [_CARDS[idx] for idx in card_idxs]
+    return player_cards
+
+
+# Binary encoders, indexed by EventType value
+
+
+def _encode_player(buf, event, seat):
+    player = event.player
+    _put_str(buf, player.name)
+    put_varint(buf, zigzag(player.stack))
+    _put_optional(buf, player.position)
+
+
+def _encode_nothing(buf, event, seat):
+    pass
+
+
+def _encode_hand_started(buf, event, seat):
+    players = event.players
+    mask = 0
+    for idx, p in enumerate(players):
+        if p is not None:
+            mask |= 1 << idx
+    buf.append(len(players))
+    put_varint(buf, mask)
+    for p in players:
+        if p is not None:
+            _put_str(buf, p.base_player.name)
+            put_varint(buf, zigzag(p.stack))
+
+
+def _encode_ante(buf, event, seat):
+    put_varint(buf, event.amount)
+    buf.append(len(event.player_indices))
+    buf += bytes(event.player_indices)
+
+
+def _encode_hole_cards(buf, event, seat):
+    hole_cards = event.cards
+    buf.append(len(hole_cards))
+    for idx, player_cards in enumerate(hole_cards):
+        if player_cards is None:
+            buf.append(_EMPTY_SEAT)
+        elif idx != seat:
+            buf.append(_HIDDEN_CARDS)
+        else:
+            first, second = player_cards.cards
+            buf.append(first.card_idx)
+            buf.append(second.card_idx)
+
+
+def _encode_flop(buf, event, seat):
+    board = event.cards.cards
+    buf.append(len(board))
+    for card in board:
+        buf.append(card.card_idx)
+
+
+def _encode_card(buf, event, seat):
+    buf.append(event.card.card_idx)
+
+
+def _encode_showdown(buf, event, seat):
+    buf.append(len(event.ranks))
+    for rank in event.ranks:
+        buf.append(len(rank))
+        buf.append(rank[0]._value_ + 1)
+        buf += bytes(rank[1:])
+    buf.append(len(event.winners))
+    buf += bytes(event.winners)
+
+
+def _encode_paying_out(buf, event, seat):
+    buf.append(len(event.net_profit))
+    for value in event.net_profit:
+        _put_optional(buf, value)
+    pot_winnings = event.pot_winnings
+    if pot_winnings is None:
+        buf.append(0)
+        return
+    buf.append(len(pot_winnings))
+    for value in pot_winnings:
+        _put_optional(buf, value)
+
+
+def _encode_action(buf, event, seat):
+    put_action(buf, event.action)
+
+
+def _encode_action_on(buf, event, seat):
+    allowed = event.allowed
+    action_ranges = allowed.action_ranges()
+    buf.append(allowed.player_idx)
+    buf.append(len(action_ranges))
+    for action_type, value_range in action_ranges:
+        if value_range is None:
+            buf.append(action_type._value_)
+        else:
+            buf.append(action_type._value_ | _HAS_RANGE)
+            put_varint(buf, value_range[0])
+            put_varint(buf, value_range[1])
+
+
+_ENCODERS = [
+    _encode_player,       # PLAYER_ADDED
+    _encode_player,       # PLAYER_REMOVED
+    _encode_nothing,      # WAITING_FOR_START
+    _encode_hand_started,
+    _encode_ante,
+    _encode_hole_cards,
+    _encode_flop,
+    _encode_card,         # TURN_DEALT
+    _encode_card,         # RIVER_DEALT
+    _encode_showdown,
+    _encode_paying_out,
+    _encode_action,
+    _encode_action_on,
+]
+
+
+def encode_event(event, seat=None):
+    """Returns the binary encoding (bytes) of event as seen from seat."""
+    event_type = event.event_type._value_
+    buf = bytearray((VERSION, event_type))
+    _ENCODERS[event_type](buf, event, seat)
+    return bytes(buf)
+
+
+# Binary decoders, each (cls, data, pos) -> (event, pos)
+
+
+def _decode_player(cls, data, pos):
+    name, pos = _get_str(data, pos)
+    stack, pos = get_varint(data, pos)
+    position, pos = _get_optional(data, pos)
+    player = game.Player(name, unzigzag(stack))
+    player.position = position
+    return cls(player), pos
+
+
+def _decode_nothing(cls, data, pos):
+    return cls(), pos
+
+
+def _decode_hand_started(cls, data, pos):
+    count = data[pos]
+    mask, pos = get_varint(data, pos + 1)
+    players = [None] * count
+    for idx in range(count):
+        if mask >> idx & 1:
+            name, pos = _get_str(data, pos)
+            stack, pos = get_varint(data, pos)
+            players[idx] = game.HandPlayer(game.Player(name, unzigzag(stack)))
+    return cls(players), pos
+
+
+def _decode_ante(cls, data, pos):
+    amount, pos = get_varint(data, pos)
+    count = data[pos]
+    end = pos + 1 + count
+    return cls(amount, list(data[pos + 1:end])), end
+
+
+def _decode_hole_cards(cls, data, pos):
+    count = data[pos]
+    pos += 1
+    hole_cards = []
+    for _ in range(count):
+        b = data[pos]
+        pos += 1
+        if b == _EMPTY_SEAT:
+            hole_cards.append(None)
+        elif b == _HIDDEN_CARDS:
+            hole_cards.append(_player_cards(()))
+        else:
+            hole_cards.append(_player_cards((b, data[pos])))
+            pos += 1
+    return cls(hole_cards), pos
+
+
+def _decode_flop(cls, data, pos):
+    end = pos + 1 + data[pos]
+    return cls(_player_cards(data[pos + 1:end])), end
+
+
+def _decode_card(cls, data, pos):
+    return cls(_CARDS[data[pos]]), pos + 1
+
+
+def _decode_showdown(cls, data, pos):
+    count = data[pos]
+    pos += 1
+    ranks = []
+    for _ in range(count):
+        end = pos + 1 + data[pos]
+        rank = list(data[pos + 1:end])
+        rank[0] = _HAND_RANKS[rank[0] - 1]
+        ranks.append(rank)
+        pos = end
+    end = pos + 1 + data[pos]
+    return cls(ranks, list(data[pos + 1:end])), end
+
+
+def _decode_paying_out(cls, data, pos):
+    lists = []
+    for _ in range(2):
+        count = data[pos]
+        pos += 1
+        values = []
+        for _ in range(count):
+            value, pos = _get_optional(data, pos)
+            values.append(value)
+        lists.append(values)
+    net_profit, pot_winnings = lists
+    if not pot_winnings and net_profit:
+        pot_winnings = None
+    return cls(net_profit, pot_winnings), pos
+
+
+def _decode_action(cls, data, pos):
+    action, pos = get_action(data, pos)
+    return cls(action), pos
+
+
+def _decode_action_on(cls, data, pos):
+    seat = data[pos]
+    count = data[pos + 1]
+    pos += 2
+    action_map = {}
+    for _ in range(count):
+        b = data[pos]
+        pos += 1
+        value_range = None
+        if b & _HAS_RANGE:
+            low, pos = get_varint(data, pos)
+            high, pos = get_varint(data, pos)
+            value_range = (low, high)
+        action_map[_ACTION_TYPES[b & ~_HAS_RANGE]] = value_range
+    return cls(None, game.AllowedAction(seat, action_map)), pos
+
+
+_DECODERS = [
+    _decode_player,       # PLAYER_ADDED
+    _decode_player,       # PLAYER_REMOVED
+    _decode_nothing,      # WAITING_FOR_START
+    _decode_hand_started,
+    _decode_ante,
+    _decode_hole_cards,
+    _decode_flop,
+    _decode_card,         # TURN_DEALT
+    _decode_card,         # RIVER_DEALT
+    _decode_showdown,
+    _decode_paying_out,
+    _decode_action,
+    _decode_action_on,
+]
+
+
+def decode_event(data, pos=0):
+    """Reads one event written by encode_event.
+
+    Args:
+      data: bytes like object
+      pos: position in data of the event
+
+    Returns:
+      (game.Event, position after the event)
+
+    Raises:
+      WireFormatError if data doesn't hold an event of this version
+    """
+    try:
+        version = data[pos]
+        event_type = data[pos + 1]
+        if version != VERSION:
+            raise WireFormatError("Unsupported version {}".format(version))
+        if event_type >= len(_DECODERS):
+            raise WireFormatError("Unknown event type {}".format(event_type))
+        event, end = _DECODERS[event_type](
+            _EVENT_CLASSES[event_type], data, pos + 2)
+    except (IndexError, KeyError, ValueError) as e:
+        raise WireFormatError("Bad event: {!r}".format(e))
+    if end > len(data):
+        raise WireFormatError("Truncated event")
+    return event, end
+
+
+def decode_events(data):
+    """Returns the list of events in data, a run of encode_event outputs."""
+    events = []
+    pos = 0
+    while pos < len(data):
+        event, pos = decode_event(data, pos)
+        events.append(event)
+    return events
+
+
+# JSON encoders, indexed by EventType value. Each returns the fields after
+# the version and event type.
+
+
+def _json_player(event, seat):
+    player = event.player
+    return [player.name, player.stack, player.position]
+
+
+def _json_nothing(event, seat):
+    return []
+
+
+def _json_hand_started(event, seat):
+    return [[None if p is None else [p.base_player.name, p.stack]
+             for p in event.players]]
+
+
+def _json_ante(event, seat):
+    return [event.amount, list(event.player_indices)]
+
+
+def _json_hole_cards(event, seat):
+    hole_cards = []
+    for idx, player_cards in enumerate(event.cards):
+        if player_cards is None:
+            hole_cards.append(None)
+        elif idx != seat:
+            hole_cards.append("")
+        else:
+            first, second = player_cards.cards
+            hole_cards.append(CARD_STRS[first.card_idx] + CARD_STRS[second.card_idx])
+    return [hole_cards]
+
+
+def _json_flop(event, seat):
+    return ["".join([CARD_STRS[card.card_idx] for card in event.cards.cards])]
+
+
+def _json_card(event, seat):
+    return [CARD_STRS[event.card.card_idx]]
+
+
+def _json_showdown(event, seat):
+    return [[[rank[0]._value_] + rank[1:] for rank in event.ranks],
+            list(event.winners)]
+
+
+def _json_paying_out(event, seat):
+    pot_winnings = event.pot_winnings
+    return [list(event.net_profit),
+            None if pot_winnings is None else list(pot_winnings)]
+
+
+def _json_action(event, seat):
+    action = event.action
+    code = action_code(action)
+    if code_has_amount(code):
+        return [code, action.amount]
+    return [code]
+
+
+def _json_action_on(event, seat):
+    allowed = event.allowed
+    fields = [allowed.player_idx]
+    for action_type, value_range in allowed.action_ranges():
+        if value_range is None:
+            fields.append([action_type._value_])
+        else:
+            fields.append([action_type._value_, value_range[0], value_range[1]])
+    return fields
+
+
+_JSON_ENCODERS = [
+    _json_player,         # PLAYER_ADDED
+    _json_player,         # PLAYER_REMOVED
+    _json_nothing,        # WAITING_FOR_START
+    _json_hand_started,
+    _json_ante,
+    _json_hole_cards,
+    _json_flop,
+    _json_card,           # TURN_DEALT
+    _json_card,           # RIVER_DEALT
+    _json_showdown,
+    _json_paying_out,
+    _json_action,
+    _json_action_on,
+]
+
+_json_dumps = json.JSONEncoder(separators=(",", ":")).encode
+
+
+def encode_event_json(event, seat=None):
+    """Returns the JSON encoding (str) of event as seen from seat."""
+    event_type = event.event_type._value_
+    return _json_dumps([VERSION, event_type] +
+                       _JSON_ENCODERS[event_type](event, seat))
+
+
+# JSON decoders, each (cls, fields) -> event
+
+
+def _cards_from_str(s):
+    return _player_cards([_CARD_IDXS[s[i:i + 2]] for i in range(0, len(s), 2)])
+
+
+def _unjson_player(cls, fields):
+    name, stack, position = fields
+    player = game.Player(name, stack)
+    player.position = position
+    return cls(player)
+
+
+def _unjson_nothing(cls, fields):
+    if fields:
+        raise ValueError(fields)
+    return cls()
+
+
+def _unjson_hand_started(cls, fields):
+    players, = fields
+    return cls([None if p is None else game.HandPlayer(game.Player(p[0], p[1]))
+                for p in players])
+
+
+def _unjson_ante(cls, fields):
+    amount, player_indices = fields
+    return cls(amount, player_indices)
+
+
+def _unjson_hole_cards(cls, fields):
+    hole_cards, = fields
+    return cls([None if s is None else _cards_from_str(s) for s in hole_cards])
+
+
+def _unjson_flop(cls, fields):
+    board, = fields
+    return cls(_cards_from_str(board))
+
+
+def _unjson_card(cls, fields):
+    card, = fields
+    return cls(_CARDS[_CARD_IDXS[card]])
+
+
+def _unjson_showdown(cls, fields):
+    ranks, winners = fields
+    return cls([[_HAND_RANKS[rank[0]]] + rank[1:] for rank in ranks], winners)
+
+
+def _unjson_paying_out(cls, fields):
+    net_profit, pot_winnings = fields
+    return cls(net_profit, pot_winnings)
+
+
+def _unjson_action(cls, fields):
+    code = fields[0]
+    amount = fields[1] if len(fields) > 1 else None
+    return cls(code_to_action(code, amount))
+
+
+def _unjson_action_on(cls, fields):
+    seat = fields[0]
+    action_map = {}
+    for entry in fields[1:]:
+        action_map[_ACTION_TYPES[entry[0]]] = (
+            None if len(entry) == 1 else (entry[1], entry[2]))
+    return cls(None, game.AllowedAction(seat, action_map))
+
+
+_JSON_DECODERS = [
+    _unjson_player,       # PLAYER_ADDED
+    _unjson_player,       # PLAYER_REMOVED
+    _unjson_nothing,      # WAITING_FOR_START
+    _unjson_hand_started,
+    _unjson_ante,
+    _unjson_hole_cards,
+    _unjson_flop,
+    _unjson_card,         # TURN_DEALT
+    _unjson_card,         # RIVER_DEALT
+    _unjson_showdown,
+    _unjson_paying_out,
+    _unjson_action,
+    _unjson_action_on,
+]
+
+
+def decode_event_json(message):
+    """Reads an event written by encode_event_json.
+
+    Args:
+      message: the JSON string, or the list it decodes to
+
+    Raises:
+      WireFormatError if message isn't an event of this version
+    """
+    try:
+        if isinstance(message, (str, bytes)):
+            message = json.loads(message)
+        version, event_type = message[:2]
+        if version != VERSION:
+            raise WireFormatError("Unsupported version {}".format(version))
+        if not 0 <= event_type < len(_JSON_DECODERS):
+            raise WireFormatError("Unknown event type {}".format(event_type))
+        return _JSON_DECODERS[event_type](_EVENT_CLASSES[event_type], message[2:])
+    except (IndexError, KeyError, TypeError, ValueError) as e:
+        raise WireFormatError("Bad event: {!r}".format(e))